@@ -1,9 +1,19 @@
 from textx import textx_isinstance, get_metamodel
-import time
 import math
-from rich import print, pretty
+import operator
+import threading
+import asyncio
+from collections import ChainMap
+from rich import pretty
 from concurrent.futures import ThreadPoolExecutor
 from smauto.lib.types import List, Dict
+from smauto.lib.dependency import entity_dep, get_dependency_index, rest_dep
+from smauto.lib.clock import get_clock
+from smauto.lib.optimizer import fold_math, prune_unsatisfiable, relax_thresholds
+from smauto.lib.firing import FiringGate, FiringMode
+from smauto.lib.dispatch import build_interval_table
+from smauto.lib.condition import EVAL_FUNCTIONS
+from smauto.lib.log import get_logger
 
 pretty.install()
 
@@ -15,12 +25,26 @@ class AutomationState:
     EXITED_FAILURE = 3
 
 
+class EvaluationMode:
+    POLLING = "polling"
+    EVENTS = "events"
+
+
+class RetriggerPolicy:
+    QUEUE = "queue"
+    RESTART = "restart"
+    IGNORE = "ignore"
+
+
 class ExecutionContext(dict):
     """Holds intermediate values for Compute steps."""
     pass
 
 
 class Automation(object):
+    # Pending re-triggers kept by the "queue" retrigger policy.
+    MAX_QUEUED = 10
+
     def __init__(
         self,
         parent,
@@ -37,12 +61,26 @@ class Automation(object):
         stops,
         description="",
         steps=None,
+        polling=None,
+        evaluation=None,
+        retrigger=None,
+        fire=None,
+        hysteresis=None,
+        rearm=None,
     ):
         enabled = True if enabled is None else enabled
         continuous = True if continuous is None else continuous
         checkOnce = False if checkOnce is None else checkOnce
         freq = 1 if freq in (None, 0) else freq
         delay = 0 if not delay else delay
+        if polling is None:
+            # Event-driven evaluation needs entity / REST producers that call
+            # notify_entity_update / notify_rest_update, so it is opt-in.
+            polling = evaluation != EvaluationMode.EVENTS
+        retrigger = RetriggerPolicy.IGNORE if not retrigger else retrigger
+        fire = FiringMode.LEVEL if not fire else fire
+        hysteresis = 0 if not hysteresis else hysteresis
+        rearm = 0 if not rearm else rearm
         self.parent = parent
         self.name = name
         self.condition = condition
@@ -56,10 +94,99 @@ class Automation(object):
         self.starts = starts
         self.stops = stops
         self.time_between_activations = 5
-        self.state = AutomationState.IDLE
+        self._state = AutomationState.IDLE
+        self._dependents = {}
+        # Called with the automation when it is enabled or released from `after`.
+        self._activation_listeners = []
+        self._scheduler = None
         self.description = description
         self.delay = delay
+        self.polling = polling
+        self.retrigger = retrigger
+        self.fire = fire
+        self.hysteresis = hysteresis
+        self.rearm = rearm
+        self._gate = None
         self._rests_cache = None
+        self._wake = threading.Event()
+        self._wake_async = None
+        self._loop = None
+        self._condition_built = False
+        self._compiled_steps = []
+        self._pipeline_suspends = False
+        self._pipeline_task = None
+        self._queued = 0
+        self.outbox = None
+        self.pipeline_stats = {
+            "started": 0, "queued": 0, "restarted": 0, "ignored": 0, "dropped": 0,
+        }
+        self._next_deadline = None
+        self._waiting_for = None
+        self.lateness = None
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        if value == self._state:
+            return
+        self._state = value
+        for automation in list(self._dependents):
+            automation._dependency_changed()
+
+    def _dependency_changed(self):
+        """Called when an automation listed in `after` changes state."""
+        if self._waiting_for is None or self._state == AutomationState.RUNNING:
+            return
+        if self._dependencies_done():
+            self._activated()
+            # Released: evaluate now instead of at the next tick.
+            if self._scheduler is not None and self._loop is not None:
+                self._loop.call_soon_threadsafe(self._scheduler.poll_now, self)
+            else:
+                self.wake()
+
+    @property
+    def active(self):
+        """Enabled and not waiting for automations listed in `after`."""
+        return self.enabled and not self._waiting_for
+
+    def _activated(self):
+        for listener in list(self._activation_listeners):
+            listener(self)
+
+    @property
+    def event_driven(self):
+        """Re-evaluate on input changes instead of polling at freq."""
+        return not self.polling and bool(getattr(self.condition, "deps", None))
+
+    def wake(self):
+        """Request a condition re-evaluation (called by the dependency index)."""
+        self._wake.set()
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake_async.set)
+
+    def _wait_next(self):
+        if self.event_driven:
+            self._wake.wait()
+            self._wake.clear()
+        else:
+            # Absolute deadlines, so evaluation time does not add up as drift.
+            clock = get_clock()
+            now = clock.time()
+            if self._next_deadline is None or self._next_deadline < now:
+                self._next_deadline = now
+            self._next_deadline += 1 / self.freq
+            clock.sleep_sync(max(self._next_deadline - now, 0))
+
+    async def _wait_next_async(self):
+        if self.event_driven:
+            await self._wake_async.wait()
+            self._wake_async.clear()
+        else:
+            await get_clock().sleep(1 / self.freq)
 
     def evaluate_condition(self):
         if self.enabled:
@@ -83,19 +210,33 @@ class Automation(object):
             else:
                 messages[action.attribute.parent] = {action.attribute.name: value}
         for entity, message in messages.items():
+            self.publish(entity, message)
+
+    def publish(self, entity, message, force=False):
+        """Send through the outbox when one is attached, else publish directly."""
+        if self.outbox is not None:
+            self.outbox.write_message(entity, message, force)
+        else:
             entity.publisher.publish(message)
 
     def build_condition(self):
-        self.condition.build()
+        if not self._condition_built:
+            self.condition.build()
+            self._condition_built = True
 
     def print(self):
+        log = get_logger()
+        if not log.debug_enabled:
+            return
         after = f"\n".join([f"      - {dep.name}" for dep in self.after])
         starts = f"\n".join([f"      - {dep.name}" for dep in self.starts])
         stops = f"\n".join([f"      - {dep.name}" for dep in self.stops])
-        print(
-            f"[*] Automation <{self.name}>\n"
+        log.debug(
+            "automation.summary",
+            f"Automation <{self.name}>\n"
             f"    Condition: {self.condition.cond_lambda}\n"
             f"    Frequency: {self.freq} Hz\n"
+            f"    Event-driven: {self.event_driven}\n"
             f"    Continuoues: {self.continuous}\n"
             f"    CheckOnce: {self.checkOnce}\n"
             f"    Starts:\n"
@@ -143,6 +284,9 @@ class Automation(object):
         ns = mm.namespaces["condition"]
 
         def eval_expression(expr):
+            const = getattr(expr, "const_value", None)
+            if const is not None:
+                return const
             parts = getattr(expr, "op", None)
             parts = parts if isinstance(parts, list) else [parts]
             val = eval_term(parts[0])
@@ -158,6 +302,9 @@ class Automation(object):
             return val
 
         def eval_term(term):
+            const = getattr(term, "const_value", None)
+            if const is not None:
+                return const
             parts = getattr(term, "op", None)
             parts = parts if isinstance(parts, list) else [parts]
             val = eval_factor(parts[0])
@@ -194,29 +341,109 @@ class Automation(object):
 
         return eval_expression(node)
 
+    def _compile_math(self, node):
+        """Compile a MathExpression once into a callable ctx -> number.
+
+        Entity attributes and REST fields are resolved to direct accessors
+        and literal subtrees folded by fold_math() become constants.
+        """
+        ops = {
+            "+": operator.add,
+            "-": operator.sub,
+            "*": operator.mul,
+            "/": operator.truediv,
+        }
+
+        def compile_chain(parts):
+            first = compile_node(parts[0])
+            rest = [
+                (ops[parts[i]], compile_node(parts[i + 1]))
+                for i in range(1, len(parts), 2)
+            ]
+            if not rest:
+                return first
+            if len(rest) == 1:
+                (op, rhs), = rest
+                return lambda ctx: op(first(ctx), rhs(ctx))
+
+            def chain(ctx):
+                val = first(ctx)
+                for op, rhs in rest:
+                    val = op(val, rhs(ctx))
+                return val
+            return chain
+
+        def compile_node(n):
+            if isinstance(n, (int, float)):
+                const = float(n)
+                return lambda ctx: const
+            const = getattr(n, "const_value", None)
+            if const is not None:
+                return lambda ctx: const
+            cname = n.__class__.__name__
+            if cname in ("MathExpression", "MathTerm"):
+                parts = getattr(n, "op", None)
+                parts = parts if isinstance(parts, list) else [parts]
+                return compile_chain(parts)
+            if cname == "MathFactor":
+                operand = compile_node(getattr(n, "op"))
+                if getattr(n, "sign", None) == "-":
+                    return lambda ctx: -operand(ctx)
+                return operand
+            if cname == "MathOperand":
+                return compile_node(getattr(n, "op"))
+            if cname == "RestNumericRef":
+                fields = self._build_rests_mapping().get(n.source.name, {})
+                field = n.field
+                return lambda ctx: float(fields.get(field, None))
+            if hasattr(n, "parent") and hasattr(n, "name"):
+                entity = self.parent.entities_dict[n.parent.name]
+                attr_name = n.name
+                return lambda ctx: float(entity.attributes_dict[attr_name].value)
+            raise NotImplementedError("Unsupported operand in Compute expression.")
+
+        return compile_node(node)
+
     class DelayStepRt:
+        suspends = True
+
         def __init__(self, duration_sec):
             self.duration_sec = duration_sec
 
         def run(self, ctx, automation):
-            time.sleep(self.duration_sec)
+            get_clock().sleep_sync(self.duration_sec)
+
+        async def run_async(self, ctx, automation):
+            await get_clock().sleep(self.duration_sec)
 
     class ComputeStepRt:
-        def __init__(self, var_name, expr_node):
+        suspends = False
+
+        def __init__(self, var_name, expr_node, fn=None):
             self.var_name = var_name
             self.expr_node = expr_node
+            self.fn = fn
 
         def run(self, ctx, automation):
             try:
-                val = automation._eval_math(self.expr_node, ctx)
+                if self.fn is not None:
+                    val = self.fn(ctx)
+                else:
+                    val = automation._eval_math(self.expr_node, ctx)
                 ctx[self.var_name] = val
             except Exception as e:
-                print(f"[ERROR][Compute {self.var_name}] {e}")
+                get_logger().error("step.compute", "[Compute {var}] {error}", var=self.var_name, error=e)
+
+        async def run_async(self, ctx, automation):
+            self.run(ctx, automation)
 
     class StepActionRt:
-        def __init__(self, attribute, value):
+        suspends = False
+
+        def __init__(self, attribute, value, force=False):
             self.attribute = attribute
             self.value = value
+            self.force = force
 
         def run(self, ctx, automation):
             value = self.value
@@ -225,56 +452,94 @@ class Automation(object):
             elif type(value) is List:
                 value = value.print_item(value)
             entity = self.attribute.parent
-            entity.publisher.publish({self.attribute.name: value})
+            automation.publish(entity, {self.attribute.name: value}, self.force)
+
+        async def run_async(self, ctx, automation):
+            self.run(ctx, automation)
 
     class SwitchStepRt:
-        def __init__(self, cases, default_steps):
+        def __init__(self, cases, default_steps, deps=()):
             self.cases = cases
             self.default_steps = default_steps or []
-
-        def run(self, ctx, automation):
-            entities = automation.parent.entities_dict
-            rests = automation._build_rests_mapping()
-            locals_map = {"min": min, "max": max, "ctx": ctx}
-            locals_map.update(ctx)
-            for cond_code, steps in self.cases:
+            # Inputs read by the case conditions.
+            self.deps = frozenset(deps)
+            self._codes = [
+                (compile(src, "<switch case>", "eval"), steps)
+                for src, steps in cases
+            ]
+            self._table = build_interval_table([src for src, _ in cases])
+
+        def select(self, ctx, automation):
+            """Return the steps of the first matching case (or the default)."""
+            env = {
+                "entities": automation.parent.entities_dict,
+                "rests": automation._build_rests_mapping(),
+            }
+            locals_map = ChainMap(ctx, {"ctx": ctx}, EVAL_FUNCTIONS)
+            start = 0
+            table = self._table
+            if table is not None:
+                try:
+                    value = eval(table.subject, env, locals_map)
+                except Exception:
+                    # Let the cases report the error as before.
+                    value = None
+                if type(value) in (int, float, bool):
+                    idx = table.lookup(value)
+                    if idx is not None:
+                        return self._codes[idx][1]
+                    start = table.size
+            for cond_code, steps in self._codes[start:]:
                 try:
-                    ok = eval(
-                        cond_code,
-                        {"entities": entities, "rests": rests},
-                        locals_map,
-                    )
+                    ok = eval(cond_code, env, locals_map)
                 except Exception as e:
-                    print(f"[ERROR][Switch case] {e}")
+                    get_logger().error("step.switch", "[Switch case] {error}", error=e)
                     ok = False
                 if ok:
-                    for s in steps:
-                        s.run(ctx, automation)
-                    return
-            for s in self.default_steps:
+                    return steps
+            return self.default_steps
+
+        @property
+        def suspends(self):
+            branches = [steps for _, steps in self.cases] + [self.default_steps]
+            return any(getattr(s, "suspends", True) for steps in branches for s in steps)
+
+        def run(self, ctx, automation):
+            for s in self.select(ctx, automation):
                 s.run(ctx, automation)
 
+        async def run_async(self, ctx, automation):
+            for s in self.select(ctx, automation):
+                await s.run_async(ctx, automation)
+
     def _compile_steps(self):
         """Compile model steps (Delay/Compute/Switch/Action) to runtime objects."""
-        mm = get_metamodel(self.parent)
         compiled = []
 
         def compile_step(s):
+            if hasattr(s, "run_async"):
+                # Already a runtime step (e.g. built programmatically).
+                return s
             cname = s.__class__.__name__
             if cname == "DelayStep":
                 secs = self._duration_to_seconds(s.duration)
                 return Automation.DelayStepRt(secs)
             if cname == "ComputeStep":
-                return Automation.ComputeStepRt(s.var, s.expr)
+                fold_math(s.expr)
+                return Automation.ComputeStepRt(
+                    s.var, s.expr, self._compile_math(s.expr)
+                )
             if cname == "StepAction":
                 a = s
                 return Automation.StepActionRt(a.attribute, a.value)
             if cname == "SwitchStep":
                 cases = []
+                deps = set()
                 for c in s.cases:
                     cond = c.cond
                     cond.parent = self
                     cond.build()
+                    deps.update(cond.deps)
                     steps_rt = [compile_step(x) for x in c.steps]
                     cases.append((cond.cond_lambda, steps_rt))
                 default_rt = (
@@ -282,7 +547,7 @@ class Automation(object):
                     if hasattr(s, "default_steps")
                     else []
                 )
-                return Automation.SwitchStepRt(cases, default_rt)
+                return Automation.SwitchStepRt(cases, default_rt, deps)
             if hasattr(s, "attribute") and hasattr(s, "value"):
                 return Automation.StepActionRt(s.attribute, s.value)
             raise NotImplementedError(f"Unsupported step: {cname}")
@@ -291,68 +556,278 @@ class Automation(object):
             compiled.append(compile_step(s))
         return compiled
 
-    def start(self):
-        self.state = AutomationState.IDLE
+    def step_deps(self):
+        """Entity attributes and REST fields read by Compute and Switch steps."""
+        deps = set()
+
+        def math_deps(n):
+            cname = n.__class__.__name__
+            if cname in ("MathExpression", "MathTerm"):
+                parts = getattr(n, "op", None)
+                for part in parts if isinstance(parts, list) else [parts]:
+                    math_deps(part)
+            elif cname in ("MathFactor", "MathOperand"):
+                math_deps(getattr(n, "op"))
+            elif cname == "RestNumericRef":
+                deps.add(rest_dep(n.source.name, n.field))
+            elif not isinstance(n, (int, float, str)) and hasattr(n, "parent") and hasattr(n, "name"):
+                deps.add(entity_dep(n.parent.name, n.name))
+
+        def visit(s):
+            cname = s.__class__.__name__
+            if cname == "ComputeStep":
+                math_deps(s.expr)
+            elif isinstance(s, Automation.ComputeStepRt):
+                math_deps(s.expr_node)
+            elif cname == "SwitchStep":
+                for c in s.cases:
+                    if c.cond.cond_lambda is None:
+                        c.cond.parent = self
+                        c.cond.build()
+                    deps.update(c.cond.deps)
+                    for x in c.steps:
+                        visit(x)
+                for x in getattr(s, "default_steps", None) or ():
+                    visit(x)
+            elif isinstance(s, Automation.SwitchStepRt):
+                deps.update(s.deps)
+                for _, steps in s.cases:
+                    for x in steps:
+                        visit(x)
+                for x in s.default_steps:
+                    visit(x)
+
+        for s in self.steps:
+            visit(s)
+        return frozenset(deps)
+
+    def prepare(self):
+        """Build and register the automation. Returns False if it must not run."""
+        # A finished state restored from a checkpoint is kept.
+        if self.state == AutomationState.RUNNING:
+            self.state = AutomationState.IDLE
+        for dep in self.after:
+            dep._dependents[self] = None
         self.build_condition()
+        if not prune_unsatisfiable([self]):
+            return False
+        get_dependency_index().register(self)
         self.print()
-        print(f"[bold yellow][*] Executing Automation: {self.name}[/bold yellow]")
+        get_logger().info("automation.start", "Executing Automation: {name}", name=self.name)
+        self._gate = self._build_gate()
+        self._compiled_steps = self._compile_steps() if len(self.steps) > 0 else []
+        self._pipeline_suspends = any(getattr(s, "suspends", True) for s in self._compiled_steps)
+        return True
+
+    def _build_gate(self):
+        if self.fire == FiringMode.LEVEL and not self.hysteresis and not self.rearm:
+            return None
+        hold = None
+        if self.hysteresis:
+            src = relax_thresholds(self.condition.cond_lambda, self.hysteresis)
+            if src is None or src == self.condition.cond_lambda:
+                get_logger().warn(
+                    "automation.hysteresis",
+                    "Automation <{name}> has no numeric threshold to apply hysteresis to.",
+                    name=self.name,
+                )
+            else:
+                code = compile(src, "<condition hold>", "eval")
+                hold = lambda: self.condition.evaluate_code(code)
+        return FiringGate(self.fire, hold, self.rearm)
+
+    def _dependencies_done(self):
+        wait_for = [
+            dep.name
+            for dep in self.after
+            if dep.state == AutomationState.RUNNING
+        ]
+        if len(wait_for) == 0:
+            self.state = AutomationState.RUNNING
+        elif wait_for != self._waiting_for:
+            get_logger().info(
+                "automation.waiting",
+                "[{name}] Waiting for dependent automations to finish: {wait_for}",
+                name=self.name, wait_for=wait_for,
+            )
+        self._waiting_for = wait_for or None
+        return len(wait_for) == 0
+
+    def _check_trigger(self):
+        triggered, msg = self.evaluate_condition()
+        if self._gate is not None:
+            triggered = self._gate.update(triggered)
+        if triggered:
+            log = get_logger()
+            if log.info_enabled:
+                log.info(("automation.triggered", self.name), "Automation <{name}> Triggered!", name=self.name)
+                log.debug(
+                    "automation.condition", "Condition met: {cond}",
+                    cond=self.condition.cond_lambda,
+                )
+        return triggered
+
+    def _after_trigger(self):
+        self.state = AutomationState.EXITED_SUCCESS
+        for automation in self.starts:
+            automation.enable()
+        for automation in self.stops:
+            automation.disable()
+
+    def _after_check(self):
+        if self.checkOnce:
+            self.disable()
+            self.state = AutomationState.EXITED_SUCCESS
+
+    def _fire(self):
+        if self._compiled_steps:
+            ctx = ExecutionContext()
+            for s in self._compiled_steps:
+                s.run(ctx, self)
+        else:
+            self.trigger_actions()
+        self._after_trigger()
+
+    async def _fire_async(self):
+        if self._compiled_steps:
+            ctx = ExecutionContext()
+            for s in self._compiled_steps:
+                await s.run_async(ctx, self)
+        else:
+            self.trigger_actions()
+        self._after_trigger()
+
+    @property
+    def pipeline_running(self):
+        return self._pipeline_task is not None
+
+    def _start_pipeline(self):
+        self.pipeline_stats["started"] += 1
+        self._pipeline_task = asyncio.get_running_loop().create_task(
+            self._run_pipeline(), name=f"{self.name}:pipeline"
+        )
+
+    async def _run_pipeline(self):
+        try:
+            await self._fire_async()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            get_logger().error("automation.error", "{error}", error=e)
+        finally:
+            # A restarted pipeline finishes after its replacement started.
+            if asyncio.current_task() is self._pipeline_task:
+                self._pipeline_task = None
+                if self._queued > 0:
+                    self._queued -= 1
+                    self._start_pipeline()
+
+    def _dispatch(self):
+        """Run the steps of a trigger, honouring the retrigger policy.
+
+        Pipelines without Delay steps run inline. The others run as tasks, so
+        a Delay only parks its own pipeline on the loop's timer.
+        """
+        if not self._pipeline_suspends:
+            self._fire()
+            return
+        if self._pipeline_task is None:
+            self._start_pipeline()
+        elif self.retrigger == RetriggerPolicy.RESTART:
+            self.pipeline_stats["restarted"] += 1
+            self._pipeline_task.cancel()
+            self._start_pipeline()
+        elif self.retrigger == RetriggerPolicy.QUEUE:
+            if self._queued < self.MAX_QUEUED:
+                self._queued += 1
+                self.pipeline_stats["queued"] += 1
+            else:
+                self.pipeline_stats["dropped"] += 1
+        else:
+            self.pipeline_stats["ignored"] += 1
+
+    def tick(self):
+        """Evaluate the condition once and run the actions if triggered."""
+        triggered = self._check_trigger()
+        if triggered:
+            self._fire()
+        self._after_check()
+        return triggered
+
+    def poll(self):
+        """One scheduler tick (see smauto.lib.scheduler.TickScheduler).
+
+        Pipelines without Delay steps run inline, so the whole batch of due
+        automations is evaluated in one pass. While a delayed pipeline is
+        running, the condition is only evaluated if the retrigger policy can
+        act on the result.
+        """
+        if self.pipeline_running and self.retrigger == RetriggerPolicy.IGNORE:
+            return False
+        if self.state != AutomationState.RUNNING:
+            if len(self.after) > 0 and not self._dependencies_done():
+                return False
+            self.state = AutomationState.RUNNING
+        triggered = self._check_trigger()
+        if triggered:
+            self._dispatch()
+        self._after_check()
+        return triggered
 
-        compiled_steps = self._compile_steps() if len(self.steps) > 0 else []
+    def start(self):
+        if not self.prepare():
+            return
         while True:
             if len(self.after) == 0:
                 self.state = AutomationState.RUNNING
             while self.state == AutomationState.IDLE:
-                wait_for = [
-                    dep.name
-                    for dep in self.after
-                    if dep.state == AutomationState.RUNNING
-                ]
-                if len(wait_for) == 0:
-                    self.state = AutomationState.RUNNING
-                print(
-                    fr"[bold magenta]\[{self.name}] Waiting for dependent automations to finish:[/bold magenta] {wait_for}"
-                )
-                time.sleep(1)
+                if not self._dependencies_done():
+                    self._wake.wait()
+                    self._wake.clear()
             while self.state == AutomationState.RUNNING:
                 try:
-                    triggered, msg = self.evaluate_condition()
-                    if triggered:
-                        print(
-                            f"[bold yellow][*] Automation <{self.name}> "
-                            f"Triggered![/bold yellow]"
-                        )
-                        print(
-                            f"[bold blue][*] Condition met: "
-                            f"{self.condition.cond_lambda}"
-                        )
-                        if compiled_steps:
-                            ctx = ExecutionContext()
-                            for s in compiled_steps:
-                                s.run(ctx, self)
-                        else:
-                            self.trigger_actions()
-
-                        self.state = AutomationState.EXITED_SUCCESS
-                        for automation in self.starts:
-                            automation.enable()
-                        for automation in self.stops:
-                            automation.disable()
-                    if self.checkOnce:
-                        self.disable()
-                        self.state = AutomationState.EXITED_SUCCESS
-                    time.sleep(1 / self.freq)
+                    self.tick()
+                    self._wait_next()
                 except Exception as e:
-                    print(f"[ERROR] {e}")
+                    get_logger().error("automation.error", "{error}", error=e)
                     return
             self.state = AutomationState.IDLE
 
+    async def start_async(self, scheduler=None):
+        """Run the automation as a task on the running asyncio loop.
+
+        With a scheduler, a polling automation is handed over to it after
+        preparation and the task returns.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wake_async = asyncio.Event()
+        if not self.prepare():
+            return
+        if scheduler is not None and not self.event_driven:
+            self._scheduler = scheduler
+            scheduler.add(self)
+            return
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                get_logger().error("automation.error", "{error}", error=e)
+                return
+            if self._waiting_for:
+                await self._wake_async.wait()
+                self._wake_async.clear()
+            else:
+                await self._wait_next_async()
+
     def enable(self):
         self.enabled = True
-        print(f"[bold yellow][*] Enabled Automation: {self.name}[/bold yellow]")
+        self.wake()
+        self._activated()
+        get_logger().info("automation.enabled", "Enabled Automation: {name}", name=self.name)
 
     def disable(self):
         self.enabled = False
-        print(f"[bold yellow][*] Disabled Automation: {self.name}[/bold yellow]")
+        get_logger().info("automation.disabled", "Disabled Automation: {name}", name=self.name)
 
 
 class Action:
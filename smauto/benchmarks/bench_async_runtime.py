@@ -0,0 +1,133 @@
+"""Benchmark: thread-per-automation vs asyncio runtime.
+
+Starts N polling automations (condition never true) at FREQ Hz, runs them for
+a few seconds and reports resident memory growth and wake-up jitter (lateness behind the
+absolute tick deadline). Each mode runs in its own subprocess.
+
+Usage:
+    python benchmarks/bench_async_runtime.py [automations] [seconds]
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from smauto.lib.automation import Automation
+from smauto.lib.runtime import AutomationRuntime
+
+FREQ = 10
+
+
+class FalseCondition:
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.cond_lambda = "False"
+
+    def build(self):
+        return self.cond_lambda
+
+    def evaluate(self):
+        return False, "not triggered"
+
+
+class JitterAutomation(Automation):
+    """Records how late each wake-up is."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.jitter = []
+
+    def _wait_next(self):
+        super()._wait_next()
+        self.jitter.append(time.monotonic() - self._next_deadline)
+
+    def poll(self):
+        # Driven by the runtime's TickScheduler: lateness behind the deadline.
+        self.jitter.append(self.lateness.last)
+        return super().poll()
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def make_automations(n):
+    model = type("Model", (), {"entities_dict": {}, "restSources": []})()
+    return [
+        JitterAutomation(
+            parent=model,
+            name=f"auto_{i}",
+            condition=FalseCondition(),
+            actions=[],
+            freq=FREQ,
+            enabled=True,
+            continuous=True,
+            checkOnce=False,
+            delay=0,
+            after=[],
+            starts=[],
+            stops=[],
+        )
+        for i in range(n)
+    ]
+
+
+def run_threads(autos, seconds):
+    for a in autos:
+        threading.Thread(target=a.start, daemon=True).start()
+    time.sleep(seconds)
+
+
+def run_asyncio(autos, seconds):
+    async def main():
+        runtime = AutomationRuntime(autos, share=False)
+        await runtime.start()
+        await asyncio.sleep(seconds)
+        await runtime.stop()
+
+    asyncio.run(main())
+
+
+def child(mode, n, seconds):
+    autos = make_automations(n)
+    rss0 = rss_bytes()
+    with contextlib.redirect_stdout(io.StringIO()):
+        (run_threads if mode == "threads" else run_asyncio)(autos, seconds)
+    rss1 = rss_bytes()
+    jitter = sorted(j for a in autos for j in list(a.jitter)[FREQ:])
+    ticks = len(jitter)
+    print(json.dumps({
+        "mode": mode,
+        "automations": n,
+        "rss_mb": (rss1 - rss0) / 2 ** 20,
+        "rss_kb_per_automation": (rss1 - rss0) / 1024 / n,
+        "ticks": ticks,
+        "jitter_p50_ms": statistics.median(jitter) * 1000 if ticks else None,
+        "jitter_p99_ms": jitter[int(ticks * 0.99) - 1] * 1000 if ticks else None,
+    }))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], int(sys.argv[3]), float(sys.argv[4]))
+        sys.exit(0)
+    n = sys.argv[1] if len(sys.argv) > 1 else "1000"
+    seconds = sys.argv[2] if len(sys.argv) > 2 else "5"
+    for mode in ("threads", "asyncio"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", mode, n, seconds],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(
+            f"{r['mode']:8s} n={r['automations']} "
+            f"rss=+{r['rss_mb']:.1f} MB ({r['rss_kb_per_automation']:.1f} KB/automation) "
+            f"ticks={r['ticks']} jitter p50={r['jitter_p50_ms']:.2f} ms "
+            f"p99={r['jitter_p99_ms']:.2f} ms"
+        )
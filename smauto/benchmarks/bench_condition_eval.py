@@ -0,0 +1,78 @@
+"""Micro-benchmark: string eval() vs precompiled Condition evaluation.
+
+Usage:
+    python benchmarks/bench_condition_eval.py [iterations]
+"""
+import sys
+import time
+from smauto.lib.condition import Condition, EVAL_FUNCTIONS
+
+
+class Attr:
+    def __init__(self, name, value=None):
+        self.name = name
+        self.value = value
+
+
+class Entity:
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attributes_dict = {k: Attr(k, v) for k, v in attrs.items()}
+
+
+class ModelStub:
+    def __init__(self, entities_dict, rest_sources):
+        self.entities_dict = entities_dict
+        self.restSources = rest_sources
+
+
+class AutoStub:
+    def __init__(self, model, name="bench"):
+        self.parent = model
+        self.name = name
+
+
+COND = (
+    "(((entities['sensor'].attributes_dict['temp'].value > 28) and "
+    "(entities['sensor'].attributes_dict['hum'].value < 60)) or "
+    "((rests['Weather']['temp'] >= 30) and "
+    "(entities['fan'].attributes_dict['on'].value == False)))"
+)
+
+
+def build_condition():
+    entities = {
+        "sensor": Entity("sensor", temp=29.0, hum=55),
+        "fan": Entity("fan", on=False),
+    }
+    rs = type("RS", (), {"name": "Weather", "data": {"temp": 31.0}})()
+    cond = Condition(parent=AutoStub(ModelStub(entities, [rs])))
+    cond.cond_lambda = COND
+    cond.compile()
+    return cond
+
+
+def bench_string_eval(cond, n):
+    entities = cond.parent.parent.entities_dict
+    rests = {"Weather": cond.parent.parent.restSources[0].data}
+    t0 = time.perf_counter()
+    for _ in range(n):
+        eval(cond.cond_lambda, {"entities": entities, "rests": rests}, dict(EVAL_FUNCTIONS))
+    return n / (time.perf_counter() - t0)
+
+
+def bench_compiled_eval(cond, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        cond.evaluate()
+    return n / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    cond = build_condition()
+    before = bench_string_eval(cond, n)
+    after = bench_compiled_eval(cond, n)
+    print(f"string eval():        {before:12.0f} evals/s")
+    print(f"Condition.evaluate(): {after:12.0f} evals/s")
+    print(f"speedup:              {after / before:12.2f}x")
@@ -0,0 +1,106 @@
+"""Benchmark: interpreting jpath strings per call vs compiled accessors.
+
+Maps MAPPINGS fields out of a large, deeply nested payload (forecast arrays
+plus a device inventory), once interpreting every jpath string on every
+call and once through the accessors compiled by smauto.lib.rest_jpath.
+
+Usage:
+    python benchmarks/bench_rest_jpath.py [iterations]
+"""
+import sys
+import time
+from smauto.lib.rest_jpath import (
+    INDEX,
+    KEY,
+    WILDCARD,
+    CASTERS,
+    compile_source,
+    map_compiled,
+    parse_path,
+)
+
+
+class Mapping:
+    def __init__(self, name, jpath, type=None):
+        self.name = name
+        self.jpath = jpath
+        self.type = type
+
+
+def payload(hours=2000, devices=500, depth=8):
+    nested = {"value": 1.5}
+    for level in range(depth):
+        nested = {f"level{level}": nested, "meta": {"id": level, "tags": ["a", "b"]}}
+    return {
+        "hourly": {
+            "time": [f"t{i}" for i in range(hours)],
+            "temperature_2m": [20 + (i % 10) / 10 for i in range(hours)],
+            "wind_speed_10m": [3 + (i % 7) / 10 for i in range(hours)],
+        },
+        "devices": [{"id": f"d{i}", "state": {"on": i % 2 == 0}} for i in range(devices)],
+        "nested": nested,
+    }
+
+
+MAPPINGS = [
+    Mapping("temp", "$.hourly.temperature_2m[0]", "number"),
+    Mapping("wind", "$.hourly.wind_speed_10m[0]", "number"),
+    Mapping("time", "$.hourly.time[-1]", "string"),
+    Mapping("first_on", "$.devices[0].state.on", "bool"),
+    Mapping("deep", "$.nested" + "".join(f".level{i}" for i in reversed(range(8))) + ".value", "number"),
+    Mapping("next_hours", "$.hourly.temperature_2m[0:24]", "list"),
+    Mapping("device_ids", "$.devices[*].id", "list"),
+]
+
+
+def interpret(jpath, obj):
+    """Reference: parse the path on every call, then walk it."""
+    current = [obj]
+    multi = False
+    for kind, arg in parse_path(jpath):
+        matched = []
+        for value in current:
+            if kind in (KEY, INDEX):
+                try:
+                    matched.append(value[arg])
+                except (KeyError, IndexError, TypeError):
+                    pass
+            elif kind == WILDCARD:
+                multi = True
+                matched.extend(value.values() if isinstance(value, dict) else value)
+            else:
+                multi = True
+                matched.extend(value[arg])
+        if not matched:
+            return None
+        current = matched
+    return current if multi else current[0]
+
+
+def map_interpreted(source, raw):
+    return {m.name: CASTERS[m.type](interpret(m.jpath, raw)) for m in source.mappings}
+
+
+def bench(fn, source, raw, iterations):
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn(source, raw)
+    return (time.perf_counter() - t0) / iterations
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    raw = payload()
+    source = type("Source", (), {"mappings": MAPPINGS})()
+    compile_source(source)
+    assert map_interpreted(source, raw) == map_compiled(source, raw)
+    # Plain paths only: the accessors real sources use most.
+    plain = type("Source", (), {"mappings": MAPPINGS[:5]})()
+    compile_source(plain)
+    for label, src in (("plain paths", plain), ("all paths", source)):
+        slow = bench(map_interpreted, src, raw, iterations)
+        fast = bench(map_compiled, src, raw, iterations)
+        print(
+            f"{label:11s} mappings={len(src.mappings)} interpreted={slow * 1e6:.1f} us/poll "
+            f"compiled={fast * 1e6:.1f} us/poll speedup={slow / fast:.1f}x"
+        )
@@ -0,0 +1,112 @@
+"""Benchmark: per-request httpx client vs the shared ClientPool.
+
+Starts a local keep-alive HTTP stub server and polls it from SOURCES
+concurrent sources for ROUNDS rounds, once opening a new AsyncClient per
+request (as RestClient.fetch does) and once through one pooled client.
+Reports per-poll latency, CPU time and the number of TCP connections the
+server accepted.
+
+Usage:
+    python benchmarks/bench_rest_pool.py [sources] [rounds]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+import httpx
+from smauto.lib.rest_pool import ClientPool, decode_response
+
+BODY = json.dumps({"hourly": {"temperature_2m": [21.5] * 24, "wind_speed_10m": [3.2] * 24}}).encode()
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n"
+    b"Connection: keep-alive\r\n\r\n" + BODY
+)
+
+
+class StubServer:
+    def __init__(self):
+        self.connections = 0
+        self.server = None
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                writer.write(RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+
+class Src:
+    method = "GET"
+    headers = {}
+    auth = None
+    body = None
+    timeout = None
+
+    def __init__(self, url, idx):
+        self.url = url
+        self.params = {"source": idx}
+
+
+async def fetch_per_request(source):
+    async with httpx.AsyncClient() as client:
+        response = await client.request(source.method, source.url, params=source.params)
+        return decode_response(response)
+
+
+async def run(mode, sources, rounds):
+    stub = StubServer()
+    port = await stub.start()
+    srcs = [Src(f"http://127.0.0.1:{port}/forecast", i) for i in range(sources)]
+    pool = ClientPool(max_connections=sources, max_keepalive_connections=sources)
+    fetch = pool.fetch if mode == "pooled" else fetch_per_request
+    latencies = []
+
+    async def poll(source):
+        t0 = time.perf_counter()
+        await fetch(source)
+        latencies.append(time.perf_counter() - t0)
+
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(poll(s) for s in srcs))
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    await pool.aclose()
+    stub.server.close()
+    await stub.server.wait_closed()
+    latencies.sort()
+    return {
+        "mode": mode,
+        "polls": len(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "cpu_ms_per_poll": cpu / len(latencies) * 1000,
+        "wall_s": wall,
+        "connections": stub.connections,
+    }
+
+
+if __name__ == "__main__":
+    sources = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    for mode in ("per-request", "pooled"):
+        r = asyncio.run(run(mode, sources, rounds))
+        print(
+            f"{r['mode']:11s} polls={r['polls']} p50={r['p50_ms']:.2f} ms "
+            f"p99={r['p99_ms']:.2f} ms cpu={r['cpu_ms_per_poll']:.3f} ms/poll "
+            f"wall={r['wall_s']:.2f} s connections={r['connections']}"
+        )
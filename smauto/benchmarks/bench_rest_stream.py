@@ -0,0 +1,89 @@
+"""Benchmark: full json.loads + mapping vs streaming partial parsing.
+
+Builds a multi-megabyte forecast/inventory document and maps a few fields
+out of it, once parsing the whole body and once through
+smauto.lib.rest_stream (needs ijson). Reports time and peak traced memory
+per poll for a field at the start of the body (reading stops early), for
+fields spread over the body, and for a mapping that captures a whole array.
+
+Usage:
+    python benchmarks/bench_rest_stream.py [hours] [devices]
+"""
+import json
+import sys
+import time
+import tracemalloc
+from smauto.lib.rest_jpath import map_compiled
+from smauto.lib.rest_stream import extract, ijson
+
+CHUNK = 64 * 1024
+
+
+class Mapping:
+    def __init__(self, name, jpath, type=None):
+        self.name = name
+        self.jpath = jpath
+        self.type = type
+
+
+def source(mappings):
+    return type("Source", (), {"mappings": mappings, "compiled_mappings": None})()
+
+
+def body(hours, devices):
+    doc = {
+        "hourly": {
+            "temperature_2m": [20 + (i % 10) / 10 for i in range(hours)],
+            "wind_speed_10m": [3 + (i % 7) / 10 for i in range(hours)],
+            "time": [f"2026-01-01T{i:06d}" for i in range(hours)],
+        },
+        "devices": [
+            {"id": f"d{i}", "state": {"on": i % 2 == 0, "power": i * 1.5}}
+            for i in range(devices)
+        ],
+    }
+    return json.dumps(doc).encode()
+
+
+FIRST = [Mapping("temp", "$.hourly.temperature_2m[0]", "number")]
+SPREAD = FIRST + [Mapping("first_device", "$.devices[0].id", "string")]
+# [-1] / [*] capture the whole array: the worst case for streaming.
+WHOLE_ARRAY = FIRST + [Mapping("last_device", "$.devices[-1].id", "string")]
+
+
+def full(src, data):
+    return map_compiled(src, json.loads(data))
+
+
+def streamed(src, data):
+    return extract(src, (data[i:i + CHUNK] for i in range(0, len(data), CHUNK)))
+
+
+def measure(fn, src, data, iterations):
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn(src, data)
+    elapsed = (time.perf_counter() - t0) / iterations
+    tracemalloc.start()
+    fn(src, data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    if ijson is None:
+        sys.exit("ijson is not installed")
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    devices = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    data = body(hours, devices)
+    print(f"body={len(data) / 1e6:.1f} MB")
+    for label, mappings in (("first", FIRST), ("spread", SPREAD), ("whole array", WHOLE_ARRAY)):
+        src = source(mappings)
+        assert full(src, data) == streamed(src, data)
+        slow, slow_peak = measure(full, src, data, 3)
+        fast, fast_peak = measure(streamed, src, data, 3)
+        print(
+            f"{label:11s} full={slow * 1e3:.1f} ms peak={slow_peak / 1e6:.1f} MB  "
+            f"stream={fast * 1e3:.1f} ms peak={fast_peak / 1e6:.1f} MB"
+        )
@@ -0,0 +1,107 @@
+"""Benchmark: condition throughput of the sharded runtime vs. shard count.
+
+Builds a synthetic model (default 5000 polling automations over 500
+entities, conditions never true) in every worker and overloads the
+scheduler with a high tick rate, so each shard polls as fast as it can.
+Reports polls per second summed over all shards for 1, 2, 4, ... shards up
+to the number of cores.
+
+Usage:
+    python benchmarks/bench_sharding.py [automations] [seconds]
+"""
+import functools
+import multiprocessing
+import os
+import sys
+import time
+from smauto.lib.automation import Automation
+from smauto.lib.condition import Condition
+from smauto.lib.sharding import ShardedRuntime
+
+ENTITIES = 500
+FREQ = 1000
+
+
+class Attr:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+
+class Entity:
+    def __init__(self, name):
+        self.name = name
+        self.attributes_dict = {"value": Attr("value", 0.0)}
+
+
+class Model:
+    def __init__(self):
+        self.entities_dict = {}
+        self.restSources = []
+        self.automations = []
+
+
+class PrebuiltCondition(Condition):
+    def __init__(self, entity):
+        super().__init__(None)
+        self.cond_lambda = (
+            f"((entities['{entity}'].attributes_dict['value'].value > 1e9) and "
+            f"(entities['{entity}'].attributes_dict['value'].value < 2e9))"
+        )
+        self.deps = frozenset({("entity", entity, "value")})
+
+    def build(self):
+        return self.compile()
+
+
+def synthetic_model(n):
+    if multiprocessing.parent_process() is not None:
+        # Workers: keep the per-automation start-up output off the terminal.
+        sys.stdout = open(os.devnull, "w")
+    model = Model()
+    for i in range(ENTITIES):
+        model.entities_dict[f"e{i}"] = Entity(f"e{i}")
+    for i in range(n):
+        cond = PrebuiltCondition(f"e{i % ENTITIES}")
+        a = Automation(
+            parent=model, name=f"auto_{i}", condition=cond, actions=[],
+            freq=FREQ, enabled=True, continuous=True, checkOnce=False,
+            delay=0, after=[], starts=[], stops=[], polling=True,
+        )
+        cond.parent = a
+        model.automations.append(a)
+    return model
+
+
+def measure(n, shards, seconds):
+    runtime = ShardedRuntime(functools.partial(synthetic_model, n), shards=shards)
+    runtime.start(timeout=300)
+    try:
+        time.sleep(1)
+        before = sum(s["polls"] for s in runtime.stats())
+        t0 = time.perf_counter()
+        time.sleep(seconds)
+        after = sum(s["polls"] for s in runtime.stats())
+        elapsed = time.perf_counter() - t0
+    finally:
+        runtime.stop()
+    return (after - before) / elapsed
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    base = None
+    for shards in counts:
+        rate = measure(n, shards, seconds)
+        base = base or rate
+        print(
+            f"shards={shards:3d} polls/s={rate:12.0f} "
+            f"speedup={rate / base:5.2f}x efficiency={rate / base / shards:5.2f}"
+        )
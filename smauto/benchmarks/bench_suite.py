@@ -0,0 +1,293 @@
+"""End-to-end benchmark suite for the SmAuto runtime.
+
+Generates synthetic .smauto models, loads them with
+smauto.language.build_model and runs them on the AutomationRuntime with fake
+publishers (as in tests/conftest.py). Starting from a base configuration,
+one dimension at a time is swept: entities, automations, condition depth,
+window size and REST sources. Every configuration is run with both
+evaluation modes (`evaluation: events` and `evaluation: polling`), each in
+its own subprocess, and reports:
+
+    parse_s            build_model() time
+    build_s            condition build time for all automations
+    evals_per_s        sequential condition evaluations per second
+    latency_p50_ms     entity update -> action publish, median
+    latency_p99_ms     same, 99th percentile
+    rss_kb_per_automation
+
+Results are written as JSON (with the git commit) for comparison across
+commits.
+
+Usage:
+    python benchmarks/bench_suite.py [--quick] [--out results.json] [--seconds S]
+                                     [--evaluation events|polling|both]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE = {"entities": 50, "automations": 200, "depth": 2, "window": 0, "rest_sources": 0}
+SWEEP = {
+    "entities": [10, 50, 200],
+    "automations": [50, 200, 1000],
+    "depth": [1, 2, 4, 8],
+    "window": [0, 10, 100],
+    "rest_sources": [0, 2, 8],
+}
+MODES = ["events", "polling"]
+QUICK_SWEEP = {
+    "entities": [10, 50],
+    "automations": [50, 200],
+    "depth": [1, 4],
+    "window": [0, 10],
+    "rest_sources": [0, 2],
+}
+
+
+class FakePublisher:
+    def __init__(self):
+        self.sent = []
+
+    def publish(self, message):
+        self.sent.append((time.perf_counter(), message))
+
+
+def generate_model(entities, automations, depth, window, rest_sources, evaluation="events"):
+    """Source of a synthetic model.
+
+    Automation i fires when entity e(i % entities).v goes above 0.5; the
+    other depth - 1 terms read the always-true attribute w of other
+    entities (through a window when window > 0) and REST fields.
+    """
+    out = [
+        "Broker<MQTT> bench_broker",
+        '    host: "localhost"',
+        "    port: 1883",
+        "end",
+    ]
+    for e in range(entities):
+        out += [
+            f"Entity e{e}",
+            "    type: sensor",
+            f'    topic: "bench.e{e}"',
+            "    broker: bench_broker",
+            "    attributes:",
+            "        - v: float",
+            "        - w: float",
+            "end",
+        ]
+    out += [
+        "Entity out",
+        "    type: actuator",
+        '    topic: "bench.out"',
+        "    broker: bench_broker",
+        "    attributes:",
+        "        - level: int",
+        "end",
+    ]
+    for r in range(rest_sources):
+        out += [
+            f"RESTSource r{r}",
+            f'    url: "http://localhost/r{r}"',
+            '    map: { x: "$.x" | number }',
+            "end",
+        ]
+    for i in range(automations):
+        terms = [f"e{i % entities}.v > 0.5"]
+        for j in range(1, depth):
+            if rest_sources and j % 2 == 0:
+                terms.append(f"rest.r{(i + j) % rest_sources}.x > 0.5")
+            elif window:
+                terms.append(f"mean(e{(i + j) % entities}.w, {window}) > 0.5")
+            else:
+                terms.append(f"e{(i + j) % entities}.w > 0.5")
+        cond = terms[-1]
+        for term in reversed(terms[:-1]):
+            cond = f"({term}) AND ({cond})"
+        out += [
+            f"Automation a{i}",
+            f"    condition: {cond}",
+            f"    evaluation: {evaluation}",
+            "    actions:",
+            f"        - out.level: {i}",
+            "end",
+        ]
+    return "\n".join(out) + "\n"
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def apply_state(entity, state):
+    from smauto.lib.dependency import apply_entity_state
+
+    apply_entity_state(entity, state)
+
+
+async def measure_latency(model, automations, samples):
+    from smauto.lib.runtime import AutomationRuntime
+
+    publisher = model.entities_dict["out"].publisher
+    sensors = [e for name, e in model.entities_dict.items() if name != "out"]
+    expected = {}
+    for i in range(len(automations)):
+        name = f"e{i % len(sensors)}"
+        expected[name] = expected.get(name, 0) + 1
+    runtime = AutomationRuntime(automations, model=model, rest=False)
+    await runtime.start()
+    latencies = []
+    try:
+        await asyncio.sleep(0.5)
+        for s in range(samples):
+            entity = sensors[s % len(sensors)]
+            publisher.sent.clear()
+            t0 = time.perf_counter()
+            apply_state(entity, {"v": 1.0})
+            deadline = t0 + 5
+            while len(publisher.sent) < expected[entity.name] and time.perf_counter() < deadline:
+                await asyncio.sleep(0)
+            latencies.extend(t - t0 for t, _ in publisher.sent)
+            apply_state(entity, {"v": 0.0})
+            await asyncio.sleep(0)
+    finally:
+        await runtime.stop()
+    return sorted(latencies)
+
+
+def run_config(config, seconds, samples):
+    from smauto.language import build_model
+
+    src = generate_model(**config)
+    with tempfile.NamedTemporaryFile("w", suffix=".smauto", delete=False) as f:
+        f.write(src)
+        path = f.name
+    try:
+        rss0 = rss_bytes()
+        t0 = time.perf_counter()
+        model = build_model(path)
+        parse_s = time.perf_counter() - t0
+    finally:
+        os.unlink(path)
+    model.entities_dict = {e.name: e for e in model.entities}
+    for entity in model.entities:
+        entity.publisher = FakePublisher()
+        for attr in entity.attributes:
+            attr.value = 0.0
+    for rs in getattr(model, "restSources", None) or []:
+        rs.data = {"x": 1.0}
+    automations = list(model.automations)
+
+    t0 = time.perf_counter()
+    for a in automations:
+        a.build_condition()
+    build_s = time.perf_counter() - t0
+    rss1 = rss_bytes()
+
+    # Building windowed conditions creates the buffers: fill them afterwards.
+    for entity in model.entities:
+        if entity.name != "out":
+            for _ in range(max(config["window"], 1)):
+                apply_state(entity, {"w": 1.0})
+
+    evals = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        for a in automations:
+            a.condition.evaluate()
+        evals += len(automations)
+    evals_per_s = evals / (time.perf_counter() - t0)
+
+    latencies = asyncio.run(measure_latency(model, automations, samples))
+    n = len(latencies)
+    return {
+        "config": config,
+        "parse_s": parse_s,
+        "build_s": build_s,
+        "evals_per_s": evals_per_s,
+        "latency_p50_ms": statistics.median(latencies) * 1000 if n else None,
+        "latency_p99_ms": latencies[max(int(n * 0.99) - 1, 0)] * 1000 if n else None,
+        "latency_samples": n,
+        "rss_kb_per_automation": (rss1 - rss0) / 1024 / config["automations"],
+    }
+
+
+def configs(sweep, modes=MODES):
+    seen = []
+    for dim, values in sweep.items():
+        for value in values:
+            for mode in modes:
+                config = dict(BASE, **{dim: value}, evaluation=mode)
+                if config not in seen:
+                    seen.append(config)
+    return seen
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--evaluation", choices=MODES + ["both"], default="both")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = run_config(json.loads(args.child), args.seconds, args.samples)
+        print(json.dumps(result))
+        return
+
+    results = []
+    modes = MODES if args.evaluation == "both" else [args.evaluation]
+    for config in configs(QUICK_SWEEP if args.quick else SWEEP, modes):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", json.dumps(config),
+             "--seconds", str(args.seconds), "--samples", str(args.samples)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        results.append(r)
+        p50 = r["latency_p50_ms"]
+        p99 = r["latency_p99_ms"]
+        print(
+            " ".join(f"{k}={v}" for k, v in config.items()),
+            f"| parse={r['parse_s']:.2f}s build={r['build_s']:.3f}s "
+            f"evals/s={r['evals_per_s']:.0f} "
+            f"p50={p50 if p50 is None else round(p50, 3)}ms "
+            f"p99={p99 if p99 is None else round(p99, 3)}ms "
+            f"mem={r['rss_kb_per_automation']:.1f}KB/automation",
+        )
+    with open(args.out, "w") as f:
+        json.dump({
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }, f, indent=2)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
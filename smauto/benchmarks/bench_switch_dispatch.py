@@ -0,0 +1,74 @@
+"""Micro-benchmark: sequential string eval() vs indexed Switch dispatch.
+
+Runs a 50-case temperature-band Switch on random values, once the way
+SwitchStepRt.select used to (copy ctx into the locals, eval every case
+source in order) and once with the precompiled interval table.
+
+Usage:
+    python benchmarks/bench_switch_dispatch.py [iterations]
+"""
+import random
+import sys
+import time
+from smauto.lib.automation import Automation
+
+CASES = 50
+
+
+class ModelStub:
+    entities_dict = {}
+    restSources = []
+
+
+class AutoStub:
+    parent = ModelStub()
+
+    def _build_rests_mapping(self):
+        return {}
+
+
+def make_switch():
+    cases = [
+        (f"((ctx['t'] >= {i}) and (ctx['t'] < {i + 1}))", [i])
+        for i in range(CASES)
+    ]
+    return Automation.SwitchStepRt(cases, default_steps=[])
+
+
+def select_sequential(switch, ctx, entities, rests):
+    locals_map = {"min": min, "max": max, "ctx": ctx}
+    locals_map.update(ctx)
+    for cond_src, steps in switch.cases:
+        if eval(cond_src, {"entities": entities, "rests": rests}, locals_map):
+            return steps
+    return switch.default_steps
+
+
+def bench(n):
+    switch = make_switch()
+    auto = AutoStub()
+    rng = random.Random(0)
+    ctxs = [{"t": rng.uniform(0, CASES), "avg": 1.0, "x": 2.0} for _ in range(1000)]
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        select_sequential(switch, ctxs[i % 1000], {}, {})
+    seq = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        switch.select(ctxs[i % 1000], auto)
+    indexed = time.perf_counter() - t0
+
+    for ctx in ctxs:
+        assert switch.select(ctx, auto) == select_sequential(switch, ctx, {}, {})
+    return seq, indexed
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seq, indexed = bench(n)
+    print(f"{CASES}-case switch, {n} selects")
+    print(f"sequential eval: {seq * 1e6 / n:8.2f} us/select")
+    print(f"interval table:  {indexed * 1e6 / n:8.2f} us/select")
+    print(f"speedup:         {seq / indexed:8.1f}x")
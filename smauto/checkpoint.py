@@ -0,0 +1,358 @@
+"""Checkpoints of runtime state for warm restarts.
+
+A checkpoint holds entity attribute values, the samples of the rolling
+windows, the enabled/state flags of automations and the last REST values.
+Taking one on the event loop only copies these into plain lists and dicts;
+encoding and writing happen in a background thread, so evaluation is not
+held up by disk I/O.
+
+The file is memory-mapped and has two slots. Every write goes to the slot
+not holding the newest checkpoint, and each slot carries a sequence number
+and a CRC, so a write cut short by a crash leaves the previous checkpoint
+readable:
+
+    header: magic "SMCK", version u16, reserved u16, slot capacity u64
+    slot:   sequence u64, payload length u32, crc32 u32, payload
+    payload: zlib-compressed JSON
+
+    checkpointer = Checkpointer("state.ckpt", interval=10)
+    runtime = AutomationRuntime(model.automations, model=model, checkpoint=checkpointer)
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from smauto.lib.automation import AutomationState
+from smauto.lib.clock import get_clock
+from smauto.lib.log import get_logger
+
+JSON_TYPES = (int, float, str, bool, type(None), list, dict)
+
+
+class CheckpointFile(object):
+    MAGIC = b"SMCK"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHQ")
+    SLOT = struct.Struct("<QII")
+
+    def __init__(self, path, capacity=1 << 16):
+        self.path = path
+        self.capacity = capacity
+        self.seq = 0
+        self._slot = 1
+        self._file = None
+        self._map = None
+        if os.path.exists(path) and os.path.getsize(path) >= self.HEADER.size:
+            self._open()
+            found = self._newest()
+            if found is not None:
+                self.seq, self._slot = found[0], found[1]
+        else:
+            self._create(capacity)
+
+    def _slot_offset(self, slot):
+        return self.HEADER.size + slot * (self.SLOT.size + self.capacity)
+
+    @staticmethod
+    def _crc(seq, payload):
+        return zlib.crc32(payload, zlib.crc32(struct.pack("<QI", seq, len(payload))))
+
+    def _create(self, capacity, seq=0, payload=None):
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, 0, capacity))
+            f.truncate(self.HEADER.size + 2 * (self.SLOT.size + capacity))
+            if payload is not None:
+                # Written before the new file replaces the old one, so a crash
+                # never leaves a file without a valid checkpoint.
+                f.seek(self.HEADER.size)
+                f.write(self.SLOT.pack(seq, len(payload), self._crc(seq, payload)))
+                f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self.close()
+        os.replace(tmp, self.path)
+        self._open()
+        self._slot = 0
+
+    def _open(self):
+        self._file = open(self.path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, version, _, capacity = self.HEADER.unpack_from(self._map, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{self.path} is not a SmAuto checkpoint")
+        self.capacity = capacity
+
+    def _read_slot(self, slot):
+        offset = self._slot_offset(slot)
+        seq, length, crc = self.SLOT.unpack_from(self._map, offset)
+        if seq == 0 or length > self.capacity:
+            return None
+        start = offset + self.SLOT.size
+        payload = self._map[start:start + length]
+        if self._crc(seq, payload) != crc:
+            return None
+        return seq, payload
+
+    def _newest(self):
+        best = None
+        for slot in (0, 1):
+            found = self._read_slot(slot)
+            if found is not None and (best is None or found[0] > best[0]):
+                best = (found[0], slot, found[1])
+        return best
+
+    def _write_slot(self, slot, seq, payload):
+        offset = self._slot_offset(slot)
+        start = offset + self.SLOT.size
+        self._map[start:start + len(payload)] = payload
+        self.SLOT.pack_into(self._map, offset, seq, len(payload), self._crc(seq, payload))
+        self._map.flush()
+
+    def read(self):
+        """Payload of the newest valid checkpoint, or None."""
+        found = self._newest()
+        return None if found is None else found[2]
+
+    def write(self, payload):
+        self.seq += 1
+        if len(payload) > self.capacity:
+            capacity = self.capacity
+            while capacity < len(payload):
+                capacity *= 2
+            self._create(capacity, self.seq, payload)
+            return
+        self._slot = 1 - self._slot
+        self._write_slot(self._slot, self.seq, payload)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+
+def _buffers(entity):
+    buffers = getattr(entity, "attributes_buff", None)
+    return buffers if isinstance(buffers, dict) else {}
+
+
+def _attributes(entity):
+    attrs = getattr(entity, "attributes_dict", None)
+    if attrs is None:
+        attrs = {a.name: a for a in getattr(entity, "attributes", None) or ()}
+    return attrs
+
+
+def _rest_values(rs):
+    for name in ("data", "value", "fields"):
+        value = getattr(rs, name, None)
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+def take_snapshot(model, automations):
+    """Copy the runtime state into plain data. Cheap; runs on the loop."""
+    entities, buffers = {}, {}
+    for entity in model.entities_dict.values():
+        values = {
+            name: attr.value for name, attr in _attributes(entity).items()
+            if isinstance(getattr(attr, "value", None), JSON_TYPES)
+        }
+        if values:
+            entities[entity.name] = values
+        windows = {
+            name: [buffer.maxlen, list(buffer)]
+            for name, buffer in _buffers(entity).items()
+            if buffer is not None and len(buffer)
+        }
+        if windows:
+            buffers[entity.name] = windows
+    rests = {}
+    for rs in getattr(model, "restSources", None) or []:
+        values = _rest_values(rs)
+        if values:
+            rests[rs.name] = dict(values)
+    return {
+        "time": time.time(),
+        "entities": entities,
+        "buffers": buffers,
+        "automations": {
+            a.name: [bool(a.enabled), a.state] for a in automations
+        },
+        "rests": rests,
+    }
+
+
+def encode_snapshot(snapshot):
+    return zlib.compress(json.dumps(snapshot, separators=(",", ":"), default=str).encode(), 1)
+
+
+def decode_snapshot(payload):
+    return json.loads(zlib.decompress(payload))
+
+
+def snapshot_age(snapshot):
+    return time.time() - snapshot.get("time", time.time())
+
+
+def apply_snapshot(snapshot, model, automations, max_age=None):
+    """Restore a snapshot. Conditions must be built first, so the windows exist.
+
+    If the snapshot is older than max_age seconds, only the automation flags
+    are restored: stale entity values, windows and REST values are skipped.
+    """
+    by_name = {a.name: a for a in automations}
+    for name, (enabled, state) in snapshot.get("automations", {}).items():
+        automation = by_name.get(name)
+        if automation is None:
+            continue
+        automation.enabled = enabled
+        # A pipeline cut short by the restart is not resumed.
+        automation.state = AutomationState.IDLE if state == AutomationState.RUNNING else state
+    if max_age is not None and snapshot_age(snapshot) > max_age:
+        return False
+    for name, values in snapshot.get("entities", {}).items():
+        entity = model.entities_dict.get(name)
+        if entity is None:
+            continue
+        attrs = _attributes(entity)
+        for attr, value in values.items():
+            if attr in attrs:
+                attrs[attr].value = value
+    for name, windows in snapshot.get("buffers", {}).items():
+        entity = model.entities_dict.get(name)
+        if entity is None:
+            continue
+        buffers = _buffers(entity)
+        for attr, (maxlen, values) in windows.items():
+            buffer = buffers.get(attr)
+            if buffer is None:
+                continue
+            buffer.clear()
+            buffer.extend(values[-buffer.maxlen:])
+    for rs in getattr(model, "restSources", None) or []:
+        values = snapshot.get("rests", {}).get(rs.name)
+        if values is None:
+            continue
+        current = _rest_values(rs)
+        if current is None:
+            rs.data = current = {}
+        current.update(values)
+    return True
+
+
+class Checkpointer(object):
+    """Periodically checkpoints a running model (see AutomationRuntime)."""
+
+    def __init__(self, path, interval=10.0, max_age=None):
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+        self.file = None
+        self.writes = 0
+        self.last_size = 0
+        self.last_write_s = 0.0
+        self._pending = None
+        self._ready = threading.Condition()
+        self._writer = None
+        self._stopping = False
+
+    def _file(self):
+        if self.file is None:
+            self.file = CheckpointFile(self.path)
+        return self.file
+
+    def restore(self, model, automations, max_age=None):
+        """Apply the newest checkpoint, if any. Returns True if one was applied.
+
+        Values and windows older than max_age seconds (default: self.max_age)
+        are not restored.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        try:
+            payload = self._file().read()
+            if payload is None:
+                return False
+            snapshot = decode_snapshot(payload)
+        except (OSError, ValueError, zlib.error) as e:
+            get_logger().warn("checkpoint.restore", "Cannot restore {path}: {error}",
+                              path=self.path, error=e)
+            return False
+        age = snapshot_age(snapshot)
+        if not apply_snapshot(snapshot, model, automations, max_age):
+            get_logger().info(
+                "checkpoint.restore",
+                "{path} is {age:.1f}s old (max_age {max_age}s): restored automation flags only",
+                path=self.path, age=age, max_age=max_age,
+            )
+            return True
+        get_logger().info("checkpoint.restore", "Restored state from {path} ({age:.1f}s old)",
+                          path=self.path, age=age)
+        return True
+
+    def submit(self, snapshot):
+        """Hand a snapshot to the writer; an unwritten older one is replaced."""
+        with self._ready:
+            self._pending = snapshot
+            if self._writer is None:
+                self._stopping = False
+                self._writer = threading.Thread(
+                    target=self._run_writer, name="smauto-checkpoint", daemon=True
+                )
+                self._writer.start()
+            self._ready.notify()
+
+    def _run_writer(self):
+        while True:
+            with self._ready:
+                self._ready.wait_for(lambda: self._pending is not None or self._stopping)
+                snapshot, self._pending = self._pending, None
+                if snapshot is None:
+                    return
+            self.write(snapshot)
+
+    def write(self, snapshot):
+        t0 = time.perf_counter()
+        try:
+            payload = encode_snapshot(snapshot)
+            self._file().write(payload)
+        except (OSError, ValueError) as e:
+            get_logger().error("checkpoint.write", "Cannot write {path}: {error}",
+                               path=self.path, error=e)
+            return
+        self.writes += 1
+        self.last_size = len(payload)
+        self.last_write_s = time.perf_counter() - t0
+
+    async def run(self, model, automations):
+        """Checkpoint every `interval` seconds until cancelled."""
+        while True:
+            await get_clock().sleep(self.interval)
+            self.submit(take_snapshot(model, automations))
+
+    def stop(self, model=None, automations=None):
+        """Write a final checkpoint (when given the model) and stop the writer."""
+        writer = self._writer
+        if writer is not None:
+            with self._ready:
+                self._stopping = True
+                self._ready.notify()
+            writer.join()
+            self._writer = None
+        if model is not None:
+            self.write(take_snapshot(model, automations))
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def stats(self):
+        return {
+            "writes": self.writes,
+            "last_size": self.last_size,
+            "last_write_s": self.last_write_s,
+        }
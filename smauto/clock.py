@@ -0,0 +1,94 @@
+"""Clocks used for all runtime timing (ticks, Delay steps, re-arm intervals).
+
+The default RealClock uses the monotonic wall clock. VirtualClock runs an
+asyncio loop whose time only advances when nothing is ready to run: the
+loop then jumps straight to the next timer instead of waiting for it, so a
+simulated day passes in as long as its events take to process.
+"""
+import asyncio
+import selectors
+import time
+
+
+class RealClock(object):
+    def time(self):
+        return time.monotonic()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+    def sleep_sync(self, seconds):
+        time.sleep(seconds)
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    def __init__(self):
+        super().__init__()
+        self.loop = None
+
+    def select(self, timeout=None):
+        # Real I/O (e.g. call_soon_threadsafe) is still serviced.
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            return super().select(None)
+        self.loop._now += timeout
+        return []
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    def __init__(self, start=0.0):
+        selector = _VirtualSelector()
+        super().__init__(selector)
+        selector.loop = self
+        self._now = start
+
+    def time(self):
+        return self._now
+
+
+class VirtualClock(object):
+    def __init__(self, start=0.0):
+        self.loop = VirtualTimeLoop(start)
+
+    def time(self):
+        return self.loop.time()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+    def sleep_sync(self, seconds):
+        raise RuntimeError(
+            "Blocking sleep under a virtual clock; use the asyncio runtime"
+        )
+
+    def run(self, coro):
+        """Run coro to completion on the virtual loop."""
+        return self.loop.run_until_complete(coro)
+
+    def close(self):
+        self.loop.close()
+
+
+CLOCK = RealClock()
+
+
+def get_clock():
+    return CLOCK
+
+
+def clock_time():
+    """Time of the installed clock, looked up on every call.
+
+    A default for `clock=` arguments, so set_clock() also applies to objects
+    created before it.
+    """
+    return CLOCK.time()
+
+
+def set_clock(clock):
+    """Install clock for the runtime; returns the previous one."""
+    global CLOCK
+    previous, CLOCK = CLOCK, clock
+    return previous
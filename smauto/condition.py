@@ -1,6 +1,15 @@
 from textx import textx_isinstance, get_metamodel
-import statistics
 from smauto.lib.types import List, Dict, Time, Date
+from smauto.lib.dependency import entity_dep, rest_dep
+from smauto.lib.log import get_logger
+from smauto.lib.optimizer import simplify_condition
+from smauto.lib.rolling import (
+    window_max,
+    window_mean,
+    window_min,
+    window_std,
+    window_var,
+)
 
 PRIMITIVES = (int, float, str, bool)
 
@@ -29,15 +38,30 @@ OPERATORS = {
     "InRange": lambda attr, min, max: f"({attr} > {min} and {attr} < {max})",
 }
 
+EVAL_FUNCTIONS = {
+    "std": window_std,
+    "var": window_var,
+    "mean": window_mean,
+    "min": window_min,
+    "max": window_max,
+}
+
 
 class Condition(object):
     def __init__(self, parent):
         self.parent = parent
         self.cond_lambda = None
         self.cond_raw = None
+        self.cond_code = None
+        self._cond_code_src = None
+        self.deps = frozenset()
+        self.shared_node = None
+        self.static_value = None
 
     @staticmethod
-    def transform_operand(node) -> str:
+    def transform_operand(node, deps=None) -> str:
+        """Transform an operand to source. Inputs read are added to deps."""
+        deps = set() if deps is None else deps
         if type(node) in PRIMITIVES:
             if type(node) is str:
                 return f"'{node}'"
@@ -52,16 +76,18 @@ class Condition(object):
         elif textx_isinstance(
             node, get_metamodel(node).namespaces["condition"]["AugmentedAttr"]
         ):
-            return Condition.transform_augmented_attr(node)
+            return Condition.transform_augmented_attr(node, deps)
         elif textx_isinstance(
             node, get_metamodel(node).namespaces["condition"]["SimpleTimeAttr"]
         ):
+            deps.add(entity_dep(node.attribute.parent.name, node.attribute.name))
             val = (
                 f"entities['{node.attribute.parent.name}']."
                 + f"attributes_dict['{node.attribute.name}'].value.to_int()"
             )
             return val
         else:
+            deps.add(entity_dep(node.parent.name, node.name))
             val = (
                 f"entities['{node.parent.name}']."
                 + f"attributes_dict['{node.name}'].value"
@@ -69,13 +95,15 @@ class Condition(object):
             return val
 
     @staticmethod
-    def transform_augmented_attr(aattr) -> str:
+    def transform_augmented_attr(aattr, deps=None) -> str:
+        deps = set() if deps is None else deps
         parent = aattr.parent
         val: str = ""
         cname = aattr.__class__.__name__
         if cname == "SimpleNumericAttr":
             attr_ref = aattr.attribute
             entity_ref = aattr.attribute.parent
+            deps.add(entity_dep(entity_ref.name, attr_ref.name))
             if parent.__class__.__name__ in (
                 "StdAttr",
                 "MeanAttr",
@@ -94,6 +122,7 @@ class Condition(object):
         elif cname == "SimpleBoolAttr":
             attr_ref = aattr.attribute
             entity_ref = aattr.attribute.parent
+            deps.add(entity_dep(entity_ref.name, attr_ref.name))
             val = (
                 f"entities[''{entity_ref.name}'']."
                 + f"attributes_dict['{attr_ref.name}'].value"
@@ -105,6 +134,7 @@ class Condition(object):
         elif cname == "SimpleStringAttr":
             attr_ref = aattr.attribute
             entity_ref = aattr.attribute.parent
+            deps.add(entity_dep(entity_ref.name, attr_ref.name))
             val = (
                 f"entities['{entity_ref.name}']."
                 + f"attributes_dict['{attr_ref.name}'].value"
@@ -112,6 +142,7 @@ class Condition(object):
         elif cname == "SimpleDictAttr":
             attr_ref = aattr.attribute
             entity_ref = aattr.attribute.parent
+            deps.add(entity_dep(entity_ref.name, attr_ref.name))
             val = (
                 f"entities['{entity_ref.name}']."
                 + f"attributes_dict['{attr_ref.name}'].value"
@@ -119,37 +150,54 @@ class Condition(object):
         elif cname == "SimpleListAttr":
             attr_ref = aattr.attribute
             entity_ref = aattr.attribute.parent
+            deps.add(entity_dep(entity_ref.name, attr_ref.name))
             val = (
                 f"entities['{entity_ref.name}']."
                 + f"attributes_dict['{attr_ref.name}'].value"
             )
         elif cname == "StdAttr":
-            val = f"std({Condition.transform_augmented_attr(aattr.attribute)})"
+            val = f"std({Condition.transform_augmented_attr(aattr.attribute, deps)})"
         elif cname == "MeanAttr":
-            val = f"mean({Condition.transform_augmented_attr(aattr.attribute)})"
+            val = f"mean({Condition.transform_augmented_attr(aattr.attribute, deps)})"
         elif cname == "VarAttr":
-            val = f"var({Condition.transform_augmented_attr(aattr.attribute)})"
+            val = f"var({Condition.transform_augmented_attr(aattr.attribute, deps)})"
         elif cname == "MaxAttr":
-            val = f"max({Condition.transform_augmented_attr(aattr.attribute)})"
+            val = f"max({Condition.transform_augmented_attr(aattr.attribute, deps)})"
         elif cname == "MinAttr":
-            val = f"min({Condition.transform_augmented_attr(aattr.attribute)})"
+            val = f"min({Condition.transform_augmented_attr(aattr.attribute, deps)})"
         elif cname == "RestNumericRef":
+            deps.add(rest_dep(aattr.source.name, aattr.field))
             val = f"rests['{aattr.source.name}']['{aattr.field}']"
         elif cname == "RestStringRef":
+            deps.add(rest_dep(aattr.source.name, aattr.field))
             val = f"rests['{aattr.source.name}'][''{aattr.field}'']"
             val = f"rests['{aattr.source.name}']['{aattr.field}']"
         elif cname == "RestBoolRef":
+            deps.add(rest_dep(aattr.source.name, aattr.field))
             val = f"rests['{aattr.source.name}']['{aattr.field}']"
         elif cname == "RestListRef":
+            deps.add(rest_dep(aattr.source.name, aattr.field))
             val = f"rests['{aattr.source.name}']['{aattr.field}']"
         elif cname == "RestDictRef":
+            deps.add(rest_dep(aattr.source.name, aattr.field))
             val = f"rests['{aattr.source.name}']['{aattr.field}']"
         return val
 
     def build(self):
         self.process_node_condition(self)
+        simplify_condition(self)
+        self.compile()
         return self.cond_lambda
 
+    def compile(self):
+        """Compile cond_lambda to a code object, reused by every evaluation."""
+        if self.cond_lambda in (None, ""):
+            self.cond_code = None
+        elif self._cond_code_src is not self.cond_lambda:
+            self.cond_code = compile(self.cond_lambda, "<condition>", "eval")
+        self._cond_code_src = self.cond_lambda
+        return self.cond_code
+
     @staticmethod
     def process_node_condition(cond_node):
         metamodel = get_metamodel(cond_node.parent)
@@ -161,46 +209,67 @@ class Condition(object):
             cond_node.cond_lambda = (OPERATORS[cond_node.operator])(
                 cond_node.r1.cond_lambda, cond_node.r2.cond_lambda
             )
+            cond_node.deps = cond_node.r1.deps | cond_node.r2.deps
         elif textx_isinstance(
             cond_node, metamodel.namespaces["condition"]["InRangeCondition"]
         ):
             cond_node.process_node_condition()
         else:
-            operand1 = Condition.transform_operand(cond_node.operand1)
-            operand2 = Condition.transform_operand(cond_node.operand2)
+            deps = set()
+            operand1 = Condition.transform_operand(cond_node.operand1, deps)
+            operand2 = Condition.transform_operand(cond_node.operand2, deps)
             cond_node.cond_lambda = (OPERATORS[cond_node.operator])(operand1, operand2)
+            cond_node.deps = frozenset(deps)
+
+    def namespace(self):
+        """Globals for evaluating generated condition code."""
+        model = self.parent.parent
+        rests = {}
+        for rs in getattr(model, "restSources", []):
+            if hasattr(rs, "data") and isinstance(rs.data, dict):
+                rests[rs.name] = rs.data
+            elif hasattr(rs, "value") and isinstance(rs.value, dict):
+                rests[rs.name] = rs.value
+            elif hasattr(rs, "fields") and isinstance(rs.fields, dict):
+                rests[rs.name] = rs.fields
+            else:
+                rests[rs.name] = {}
+        return {"entities": model.entities_dict, "rests": rests}
+
+    def evaluate_code(self, code):
+        """Evaluate another expression over this condition's inputs."""
+        try:
+            return bool(eval(code, self.namespace(), EVAL_FUNCTIONS))
+        except Exception as e:
+            self._log_error(e)
+            return False
+
+    def _log_error(self, error):
+        # Rate-limited per automation: a REST field missing before the first
+        # poll fails on every tick.
+        name = getattr(self.parent, "name", None)
+        get_logger().warn(
+            ("condition.error", name), "[{name}] Condition evaluation failed: {error}",
+            name=name, error=error,
+        )
 
     def evaluate(self):
         if self.cond_lambda not in (None, ""):
             try:
-                entities = self.parent.parent.entities_dict
-                model = self.parent.parent
-                rests = {}
-                for rs in getattr(model, "restSources", []):
-                    if hasattr(rs, "data") and isinstance(rs.data, dict):
-                        rests[rs.name] = rs.data
-                    elif hasattr(rs, "value") and isinstance(rs.value, dict):
-                        rests[rs.name] = rs.value
-                    elif hasattr(rs, "fields") and isinstance(rs.fields, dict):
-                        rests[rs.name] = rs.fields
-                    else:
-                        rests[rs.name] = {}
-                if eval(
-                    self.cond_lambda,
-                    {"entities": entities, "rests": rests},
-                    {
-                        "std": statistics.stdev,
-                        "var": statistics.variance,
-                        "mean": statistics.mean,
-                        "min": min,
-                        "max": max,
-                    },
-                ):
+                namespace = self.namespace()
+                if self.shared_node is not None:
+                    result = self.shared_node.evaluate(namespace)
+                else:
+                    code = self.cond_code
+                    if self._cond_code_src is not self.cond_lambda:
+                        code = self.compile()
+                    result = eval(code, namespace, EVAL_FUNCTIONS)
+                if result:
                     return True, f"{self.parent.name}: triggered."
                 else:
                     return False, f"{self.parent.name}: not triggered."
             except Exception as e:
-                print(e)
+                self._log_error(e)
                 return False, f"{self.parent.name}: not triggered."
         else:
             return False, f"{self.parent.name}: condition not built."
@@ -232,9 +301,11 @@ class InRangeCondition(AdvancedCondition):
         super().__init__(parent)
 
     def process_node_condition(self):
-        operand1 = self.transform_operand(self.attribute)
+        deps = set()
+        operand1 = self.transform_operand(self.attribute, deps)
         cond_lambda = (OPERATORS["InRange"])(operand1, self.min, self.max)
         self.cond_lambda = cond_lambda
+        self.deps = frozenset(deps)
 
 
 class NumericCondition(PrimitiveCondition):
@@ -0,0 +1,165 @@
+"""Model-wide sharing of identical condition subexpressions.
+
+All built condition trees are hash-consed on their generated source
+(cond_lambda) into a graph of SharedNodes, similar to the alpha network of a
+Rete matcher. A node is evaluated at most once per change of its inputs (as
+reported to the DependencyIndex) and its result is reused by every
+automation that references it. Only event-driven automations are shared:
+the cache is valid only if every input change is reported to the index.
+"""
+from smauto.lib.condition import EVAL_FUNCTIONS
+from smauto.lib.dependency import get_dependency_index
+
+
+def _xnor(left, right):
+    lval = left()
+    return (lval and right()) or ((not lval) and (not right()))
+
+
+# Same semantics as condition.OPERATORS, on lazily evaluated operands.
+GROUP_OPERATORS = {
+    "AND": lambda left, right: left() and right(),
+    "OR": lambda left, right: left() or right(),
+    "NOT": lambda left, right: left() is not right(),
+    "XOR": lambda left, right: left() ^ right(),
+    "NOR": lambda left, right: not (left() or right()),
+    "XNOR": _xnor,
+    "NAND": lambda left, right: not (left() and right()),
+}
+
+_UNSET = object()
+
+
+def _is_group(cond):
+    return hasattr(cond, "r1") and hasattr(cond, "r2")
+
+
+def _collapsed(cond):
+    """The subtree a group was simplified into, if any.
+
+    simplify_condition() replaces e.g. `X AND X` or `X AND True` with the
+    text of X; such a group is shared as X rather than as a second node
+    with the same key.
+    """
+    while _is_group(cond) and getattr(cond, "static_value", None) is None:
+        if cond.cond_lambda == cond.r1.cond_lambda:
+            cond = cond.r1
+        elif cond.cond_lambda == cond.r2.cond_lambda:
+            cond = cond.r2
+        else:
+            break
+    return cond
+
+
+class SharedNode(object):
+    def __init__(self, network, cond):
+        self.network = network
+        self.key = cond.cond_lambda
+        self.deps = tuple(sorted(getattr(cond, "deps", ())))
+        self.operator = None
+        self.children = ()
+        self.code = None
+        self.refcount = 0
+        self.size = 1
+        self._snapshot = None
+        self._value = _UNSET
+        if _is_group(cond) and getattr(cond, "static_value", None) is None:
+            self.operator = GROUP_OPERATORS[cond.operator]
+            self.children = (network.add(cond.r1), network.add(cond.r2))
+            self.size += sum(child.size for child in self.children)
+        else:
+            self.code = compile(self.key, "<condition>", "eval")
+
+    def evaluate(self, namespace):
+        index = self.network.index
+        snapshot = tuple([index.version(d) for d in self.deps])
+        if self._value is not _UNSET and snapshot == self._snapshot:
+            self.network.cache_hits += 1
+            return self._value
+        if self.code is not None:
+            value = eval(self.code, namespace, EVAL_FUNCTIONS)
+        else:
+            left, right = self.children
+            value = self.operator(
+                lambda: left.evaluate(namespace), lambda: right.evaluate(namespace)
+            )
+        self.network.evaluations += 1
+        self._snapshot = snapshot
+        self._value = value
+        return value
+
+
+class ConditionNetwork(object):
+    def __init__(self, index=None):
+        self.index = index if index is not None else get_dependency_index()
+        self.nodes = {}
+        self.total_nodes = 0
+        self.automations = 0
+        self.evaluations = 0
+        self.cache_hits = 0
+
+    def add(self, cond):
+        """Hash-cons a built condition tree, returning its shared root."""
+        cond = _collapsed(cond)
+        self.total_nodes += 1
+        node = self.nodes.get(cond.cond_lambda)
+        if node is None:
+            node = SharedNode(self, cond)
+            self.nodes[cond.cond_lambda] = node
+        else:
+            self.total_nodes += node.size - 1
+        node.refcount += 1
+        return node
+
+    def _release(self, node):
+        node.refcount -= 1
+        if node.refcount == 0:
+            if self.nodes.get(node.key) is node:
+                del self.nodes[node.key]
+            for child in node.children:
+                self._release(child)
+
+    def remove(self, automation):
+        """Release the shared nodes of a removed automation.
+
+        Nodes no longer referenced by any automation (or shared parent
+        node) are dropped together with their compiled code.
+        """
+        condition = getattr(automation, "condition", None)
+        node = getattr(condition, "shared_node", None)
+        if node is None or self.nodes.get(node.key) is not node:
+            return
+        condition.shared_node = None
+        self.total_nodes -= node.size
+        self.automations -= 1
+        self._release(node)
+
+    def build(self, automations):
+        """Attach shared nodes to the built conditions of event-driven automations.
+
+        Polling automations keep evaluating their own copy: their inputs are
+        not reported to the index, so cached results could go stale.
+        """
+        for automation in automations:
+            if not automation.event_driven:
+                continue
+            automation.condition.shared_node = self.add(automation.condition)
+            self.automations += 1
+        return self.stats()
+
+    def stats(self):
+        return {
+            "automations": self.automations,
+            "nodes": self.total_nodes,
+            "unique": len(self.nodes),
+            "deduplicated": self.total_nodes - len(self.nodes),
+            "shared": sum(1 for n in self.nodes.values() if n.refcount > 1),
+            "evaluations": self.evaluations,
+            "cache_hits": self.cache_hits,
+        }
+
+
+def share_conditions(automations, index=None):
+    network = ConditionNetwork(index)
+    network.build(automations)
+    return network
@@ -0,0 +1,112 @@
+"""Reverse index from condition inputs to the automations that read them.
+
+Conditions record the entity attributes and REST fields they read when they
+are built (see Condition.deps). Automations register here on start, and
+incoming entity state updates / REST poll results wake only the automations
+whose conditions depend on the changed inputs.
+"""
+import threading
+from smauto.lib.outbox import get_action_outbox
+
+
+def entity_dep(entity_name, attr_name):
+    return ("entity", entity_name, attr_name)
+
+
+def rest_dep(source_name, field):
+    return ("rest", source_name, field)
+
+
+def automation_inputs(automation):
+    """(entity names, REST source names) read by the automation's condition and steps."""
+    deps = set(getattr(automation.condition, "deps", None) or ())
+    step_deps = getattr(automation, "step_deps", None)
+    if step_deps is not None:
+        deps.update(step_deps())
+    entities, rests = set(), set()
+    for kind, name, _ in deps:
+        (entities if kind == "entity" else rests).add(name)
+    return entities, rests
+
+
+class DependencyIndex(object):
+    def __init__(self):
+        self._index = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def register(self, automation):
+        deps = getattr(automation.condition, "deps", None) or ()
+        with self._lock:
+            for dep in deps:
+                # Dicts as ordered sets: wake-ups follow registration order.
+                self._index.setdefault(dep, {})[automation] = None
+
+    def unregister(self, automation):
+        deps = getattr(automation.condition, "deps", None) or ()
+        with self._lock:
+            for dep in deps:
+                dependents = self._index.get(dep)
+                if dependents is not None:
+                    dependents.pop(automation, None)
+
+    def dependents(self, dep):
+        with self._lock:
+            return set(self._index.get(dep, ()))
+
+    def version(self, dep):
+        """Number of change notifications seen for dep."""
+        return self._versions.get(dep, 0)
+
+    def notify(self, deps):
+        """Mark deps as changed and wake every automation reading them."""
+        affected = {}
+        with self._lock:
+            for dep in deps:
+                self._versions[dep] = self._versions.get(dep, 0) + 1
+                affected.update(dict.fromkeys(self._index.get(dep, ())))
+        for automation in affected:
+            automation.wake()
+        return set(affected)
+
+    def notify_entity(self, entity_name, attributes):
+        return self.notify([entity_dep(entity_name, a) for a in attributes])
+
+    def notify_rest(self, source_name, fields):
+        return self.notify([rest_dep(source_name, f) for f in fields])
+
+
+DEPENDENCY_INDEX = DependencyIndex()
+
+
+def get_dependency_index():
+    return DEPENDENCY_INDEX
+
+
+def notify_entity_update(entity_name, state):
+    """Hook for entity subscribers: state is the dict of updated attributes."""
+    get_action_outbox().observe(entity_name, state)
+    return DEPENDENCY_INDEX.notify_entity(entity_name, state.keys())
+
+
+def apply_entity_state(entity, state):
+    """Apply incoming entity state the way the entity's subscriber does.
+
+    Sets the attribute values, appends them to the windows of windowed
+    attributes (mean/std/var/min/max conditions) and wakes the readers.
+    """
+    attrs = entity.attributes_dict
+    buffers = getattr(entity, "attributes_buff", None) or {}
+    for attr, value in state.items():
+        if attr not in attrs:
+            continue
+        attrs[attr].value = value
+        buffer = buffers.get(attr)
+        if getattr(buffer, "maxlen", None):
+            buffer.append(value)
+    return notify_entity_update(entity.name, state)
+
+
+def notify_rest_update(source_name, values):
+    """Hook for the REST poller: values is the dict of freshly mapped fields."""
+    return DEPENDENCY_INDEX.notify_rest(source_name, values.keys())
@@ -0,0 +1,135 @@
+"""Interval-indexed case dispatch for Switch steps.
+
+A run of Switch cases that only compare one numeric expression against
+literals, e.g. temperature bands
+
+    case (t >= 30): ...
+    case ((t >= 25) and (t < 30)): ...
+    case (t < 5): ...
+
+is turned into a sorted table of breakpoints. The line is split into the
+open ranges between breakpoints and the breakpoints themselves; each of
+these regions is mapped to the first case that contains it, so a bisect on
+the breakpoints gives the same answer as trying the cases in order.
+"""
+import ast
+import math
+from bisect import bisect_left
+from smauto.lib.optimizer import Interval, MIRRORED, _number, _parse
+
+# Below this many indexable cases sequential evaluation is as fast.
+MIN_TABLE_CASES = 4
+
+
+def _comparisons(expr, out):
+    """Collect (subject, op, number) for an AND-chain of simple comparisons.
+
+    Returns None if any part of the expression is something else.
+    """
+    if isinstance(expr, ast.BoolOp) and isinstance(expr.op, ast.And):
+        for value in expr.values:
+            if _comparisons(value, out) is None:
+                return None
+        return out
+    if not (isinstance(expr, ast.Compare) and len(expr.ops) == 1):
+        return None
+    op = type(expr.ops[0])
+    left, right = expr.left, expr.comparators[0]
+    if op not in MIRRORED:
+        return None
+    if _number(right) is not None and _number(left) is None:
+        out.append((left, op, _number(right)))
+    elif _number(left) is not None and _number(right) is None:
+        out.append((right, MIRRORED[op], _number(left)))
+    else:
+        return None
+    return out
+
+
+def case_interval(src):
+    """Return (subject AST, Interval) if the case is a range test, else None."""
+    expr = _parse(src)
+    if expr is None:
+        return None
+    comparisons = _comparisons(expr, [])
+    if not comparisons:
+        return None
+    subject = ast.dump(comparisons[0][0])
+    if any(ast.dump(c[0]) != subject for c in comparisons):
+        return None
+    interval = Interval()
+    for _, op, value in comparisons:
+        interval.restrict(op, value)
+    return comparisons[0][0], interval
+
+
+def _contains_point(interval, x):
+    above = interval.lo < x or (interval.lo == x and not interval.lo_strict)
+    below = interval.hi > x or (interval.hi == x and not interval.hi_strict)
+    return above and below
+
+
+def _contains_range(interval, lo, hi):
+    # Every interval endpoint is a breakpoint, so the open range (lo, hi)
+    # is either fully inside the interval or fully outside.
+    return not interval.empty() and interval.lo <= lo and interval.hi >= hi
+
+
+class IntervalTable(object):
+    def __init__(self, subject, intervals):
+        self.subject = compile(
+            ast.Expression(body=subject), "<switch subject>", "eval"
+        )
+        self.size = len(intervals)
+        self.breakpoints = sorted(
+            {v for i in intervals for v in (i.lo, i.hi) if math.isfinite(v)}
+        )
+        bounds = [-math.inf] + self.breakpoints + [math.inf]
+        self.regions = []
+        for k in range(len(bounds) - 1):
+            self.regions.append(self._first(
+                intervals, lambda i: _contains_range(i, bounds[k], bounds[k + 1])
+            ))
+            if k < len(self.breakpoints):
+                point = self.breakpoints[k]
+                self.regions.append(self._first(
+                    intervals, lambda i: _contains_point(i, point)
+                ))
+
+    @staticmethod
+    def _first(intervals, matches):
+        for idx, interval in enumerate(intervals):
+            if matches(interval):
+                return idx
+        return None
+
+    def lookup(self, value):
+        """Index of the first case matching value, or None."""
+        if value != value:
+            # NaN compares false against everything.
+            return None
+        i = bisect_left(self.breakpoints, value)
+        if i < len(self.breakpoints) and self.breakpoints[i] == value:
+            return self.regions[2 * i + 1]
+        return self.regions[2 * i]
+
+
+def build_interval_table(sources):
+    """Index the leading run of range cases that share one subject.
+
+    Returns None when fewer than MIN_TABLE_CASES cases qualify.
+    """
+    subject = None
+    intervals = []
+    for src in sources:
+        parsed = case_interval(src)
+        if parsed is None:
+            break
+        if subject is None:
+            subject = parsed[0]
+        elif ast.dump(parsed[0]) != ast.dump(subject):
+            break
+        intervals.append(parsed[1])
+    if len(intervals) < MIN_TABLE_CASES:
+        return None
+    return IntervalTable(subject, intervals)
@@ -0,0 +1,41 @@
+"""Firing modes: when a true condition actually runs the actions.
+
+level  - every evaluation where the condition holds fires (the default).
+edge   - only a false -> true transition fires.
+
+With hysteresis, the condition counts as holding until a relaxed version
+of it (see optimizer.relax_thresholds) turns false, so a value that hovers
+around a threshold does not toggle it. A re-arm interval is the minimum
+time between two firings.
+"""
+from smauto.lib.clock import get_clock
+
+
+class FiringMode:
+    LEVEL = "level"
+    EDGE = "edge"
+
+
+class FiringGate(object):
+    def __init__(self, mode=FiringMode.LEVEL, hold=None, rearm=0, clock=None):
+        self.mode = mode
+        self.hold = hold
+        self.rearm = rearm
+        self.clock = clock if clock is not None else get_clock().time
+        self.active = False
+        self.last_fired = None
+        self.suppressed = 0
+
+    def update(self, holds):
+        """Feed one evaluation result; return True if the automation fires."""
+        if not holds and self.active and self.hold is not None:
+            holds = self.hold()
+        fire = holds and (self.mode == FiringMode.LEVEL or not self.active)
+        self.active = holds
+        if fire and self.rearm and self.last_fired is not None:
+            if self.clock() - self.last_fired < self.rearm:
+                self.suppressed += 1
+                return False
+        if fire:
+            self.last_fired = self.clock()
+        return fire
@@ -22,6 +22,8 @@ from smauto.lib.automation import (
     StringAction,
 )
 from smauto.lib.types import Dict, List, Time, Date
+from smauto.lib.plan import build_execution_plan, DependencyCycleError
+from smauto.lib.rest_jpath import JsonPathError, compile_source
 from smauto.lib.broker import (
     AMQPBroker,
     Broker,
@@ -183,11 +185,29 @@ def verify_automation_names(model):
         _ids.append(a.name)
 
 
+def verify_automation_dependencies(model):
+    autos = get_children_of_type("Automation", model)
+    try:
+        model.execution_plan = build_execution_plan(autos)
+    except DependencyCycleError as e:
+        raise TextXSemanticError(str(e), **get_location(e.cycle[0]))
+
+
+def compile_rest_sources(model):
+    for source in get_children_of_type("RESTSource", model):
+        try:
+            compile_source(source)
+        except JsonPathError as e:
+            raise TextXSemanticError(str(e), **get_location(source))
+
+
 def model_proc(model, metamodel):
     process_time_class(model)
     verify_entity_names(model)
     verify_automation_names(model)
+    verify_automation_dependencies(model)
     verify_broker_names(model)
+    compile_rest_sources(model)
 
 
 def get_metamodel(debug: bool = False, global_repo: bool = False):
@@ -0,0 +1,199 @@
+"""Runtime logging with levels, per-key rate limiting and a background writer.
+
+Hot paths only check the level and append a record (time, level, key,
+template, fields) to a deque; deque appends are atomic, so no lock is
+taken. Formatting and terminal I/O happen in a writer thread that drains
+the buffer. Messages are str.format templates filled from the fields, so a
+suppressed or filtered message is never formatted.
+
+    log = get_logger()
+    if log.debug_enabled:
+        log.debug("automation.cond", "Condition met: {cond}", cond=src)
+    log.info("automation.enabled", "Enabled Automation: {name}", name=name)
+
+Records with a rate-limited key are dropped when the previous one with the
+same key was emitted less than `interval` seconds ago; the next emitted
+record carries the number of records suppressed in between. A key may be a
+(kind, name) tuple: the limit set for the kind then applies to every name
+separately, e.g. one "automation.triggered" line per automation per second.
+"""
+import atexit
+import json
+import sys
+import threading
+import time
+from collections import deque
+from rich.markup import escape
+from rich import print as rich_print
+
+
+class LogLevel:
+    DEBUG = 10
+    INFO = 20
+    WARN = 30
+    ERROR = 40
+    OFF = 100
+
+    NAMES = {10: "DEBUG", 20: "INFO", 30: "WARN", 40: "ERROR"}
+
+    @classmethod
+    def parse(cls, level):
+        if isinstance(level, int):
+            return level
+        return getattr(cls, str(level).upper())
+
+
+class LogFormat:
+    PRETTY = "pretty"
+    JSON = "json"
+
+
+PRETTY_STYLE = {
+    LogLevel.DEBUG: ("[dim][*] ", "[/dim]"),
+    LogLevel.INFO: ("[bold yellow][*] ", "[/bold yellow]"),
+    LogLevel.WARN: ("[bold red][WARN] ", "[/bold red]"),
+    LogLevel.ERROR: ("[bold red][ERROR] ", "[/bold red]"),
+}
+
+
+class Logger(object):
+    def __init__(self, level=LogLevel.INFO, fmt=LogFormat.PRETTY,
+                 capacity=65536, interval=0.05, stream=None):
+        self.fmt = fmt
+        self.interval = interval
+        self.stream = stream
+        self.written = 0
+        self.dropped = 0
+        self._buffer = deque(maxlen=capacity)
+        self._rate = {}
+        self._last = {}
+        self._suppressed = {}
+        self._wake = threading.Event()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.set_level(level)
+
+    def set_level(self, level):
+        self.level = LogLevel.parse(level)
+        self.debug_enabled = self.level <= LogLevel.DEBUG
+        self.info_enabled = self.level <= LogLevel.INFO
+
+    def rate_limit(self, key, interval):
+        """Emit at most one record with `key` every `interval` seconds."""
+        if interval:
+            self._rate[key] = interval
+        else:
+            self._rate.pop(key, None)
+
+    def log(self, level, key, msg, **fields):
+        if level < self.level:
+            return
+        now = time.time()
+        interval = self._rate.get(key[0] if key.__class__ is tuple else key)
+        if interval is not None:
+            if now - self._last.get(key, float("-inf")) < interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return
+            self._last[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+            if suppressed:
+                fields["suppressed"] = suppressed
+        buffer = self._buffer
+        if len(buffer) == buffer.maxlen:
+            self.dropped += 1
+        buffer.append((now, level, key, msg, fields))
+        if self._writer is None:
+            self._start_writer()
+        if level >= LogLevel.ERROR:
+            self._wake.set()
+
+    def debug(self, key, msg, **fields):
+        if self.debug_enabled:
+            self.log(LogLevel.DEBUG, key, msg, **fields)
+
+    def info(self, key, msg, **fields):
+        if self.info_enabled:
+            self.log(LogLevel.INFO, key, msg, **fields)
+
+    def warn(self, key, msg, **fields):
+        self.log(LogLevel.WARN, key, msg, **fields)
+
+    def error(self, key, msg, **fields):
+        self.log(LogLevel.ERROR, key, msg, **fields)
+
+    def _start_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run_writer, name="smauto-log", daemon=True
+                )
+                self._writer.start()
+
+    def _run_writer(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def format(self, record):
+        ts, level, key, msg, fields = record
+        try:
+            text = msg.format(**fields) if fields else msg
+        except (KeyError, IndexError, ValueError):
+            text = msg
+        if self.fmt == LogFormat.JSON:
+            if key.__class__ is tuple:
+                key = ":".join(map(str, key))
+            out = {"ts": ts, "level": LogLevel.NAMES.get(level, level), "key": key, "msg": text}
+            out.update((k, v if isinstance(v, (int, float, str, bool, type(None))) else str(v))
+                       for k, v in fields.items())
+            return json.dumps(out)
+        start, end = PRETTY_STYLE.get(level, ("", ""))
+        suffix = f" ({fields['suppressed']} similar suppressed)" if "suppressed" in fields else ""
+        return f"{start}{escape(text)}{suffix}{end}"
+
+    def flush(self):
+        """Write out all buffered records (called by the writer thread)."""
+        buffer = self._buffer
+        stream = self.stream or sys.stdout
+        # The writer thread and explicit flushes must not interleave lines.
+        with self._flush_lock:
+            while buffer:
+                try:
+                    record = buffer.popleft()
+                except IndexError:
+                    break
+                line = self.format(record)
+                if self.fmt == LogFormat.JSON:
+                    stream.write(line + "\n")
+                else:
+                    rich_print(line, file=stream)
+                self.written += 1
+            stream.flush()
+
+    def stats(self):
+        return {
+            "level": LogLevel.NAMES.get(self.level, self.level),
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "suppressed": sum(self._suppressed.values()),
+        }
+
+
+# Keys logged per automation on every tick: at most one line per automation
+# per interval.
+DEFAULT_RATE_LIMITS = {
+    "automation.triggered": 1.0,
+    "condition.error": 10.0,
+}
+
+LOGGER = Logger()
+for _key, _interval in DEFAULT_RATE_LIMITS.items():
+    LOGGER.rate_limit(_key, _interval)
+atexit.register(LOGGER.flush)
+
+
+def get_logger():
+    return LOGGER
@@ -0,0 +1,278 @@
+"""Build-time simplification of conditions and Compute math expressions.
+
+simplify_condition() runs on a condition tree after its cond_lambda has been
+generated. It folds boolean identities, detects comparisons that can never
+(or always) hold and records the result in node.static_value (True, False,
+or None when the value depends on runtime inputs).
+
+fold_math() precomputes literal-only subtrees of a MathExpression and stores
+them in node.const_value, which Automation._eval_math uses instead of
+walking the subtree.
+"""
+import ast
+import math
+import operator
+from smauto.lib.log import get_logger
+
+COMPARISONS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+}
+
+_NOT_LITERAL = object()
+
+MIRRORED = {
+    ast.Gt: ast.Lt,
+    ast.Lt: ast.Gt,
+    ast.GtE: ast.LtE,
+    ast.LtE: ast.GtE,
+    ast.Eq: ast.Eq,
+}
+
+
+class Interval(object):
+    def __init__(self):
+        self.lo = -math.inf
+        self.lo_strict = False
+        self.hi = math.inf
+        self.hi_strict = False
+
+    def restrict(self, op, value):
+        if op in (ast.Gt, ast.GtE, ast.Eq):
+            strict = op is ast.Gt
+            if value > self.lo or (value == self.lo and strict):
+                self.lo, self.lo_strict = value, strict
+        if op in (ast.Lt, ast.LtE, ast.Eq):
+            strict = op is ast.Lt
+            if value < self.hi or (value == self.hi and strict):
+                self.hi, self.hi_strict = value, strict
+
+    def empty(self):
+        if self.lo > self.hi:
+            return True
+        return self.lo == self.hi and (self.lo_strict or self.hi_strict)
+
+
+def _number(node):
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _number(node.operand)
+        return None if value is None else -value
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    return None
+
+
+def _constraints(expr, out):
+    """Collect (operand, op, number) comparisons that must all hold."""
+    if isinstance(expr, ast.BoolOp) and isinstance(expr.op, ast.And):
+        for value in expr.values:
+            _constraints(value, out)
+    elif isinstance(expr, ast.Compare) and len(expr.ops) == 1:
+        op = type(expr.ops[0])
+        left, right = expr.left, expr.comparators[0]
+        if op not in MIRRORED:
+            return out
+        if _number(right) is not None and _number(left) is None:
+            out.append((ast.dump(left), op, _number(right)))
+        elif _number(left) is not None and _number(right) is None:
+            out.append((ast.dump(right), MIRRORED[op], _number(left)))
+    return out
+
+
+def _parse(src):
+    try:
+        return ast.parse(src, mode="eval").body
+    except SyntaxError:
+        return None
+
+
+def _literal(node):
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return _NOT_LITERAL
+
+
+def static_value(src):
+    """Static truth value of a generated condition expression, if known."""
+    expr = _parse(src)
+    if expr is None:
+        return None
+    if isinstance(expr, ast.Constant) and isinstance(expr.value, bool):
+        return expr.value
+    if isinstance(expr, ast.Compare) and len(expr.ops) == 1:
+        # Only literal operands: "x == x" still fails on a missing input
+        # (not triggered) and is False for NaN at run time.
+        compare = COMPARISONS.get(type(expr.ops[0]))
+        left, right = _literal(expr.left), _literal(expr.comparators[0])
+        if compare is not None and left is not _NOT_LITERAL and right is not _NOT_LITERAL:
+            try:
+                return bool(compare(left, right))
+            except TypeError:
+                return None
+    intervals = {}
+    for operand, op, value in _constraints(expr, []):
+        intervals.setdefault(operand, Interval()).restrict(op, value)
+    if any(i.empty() for i in intervals.values()):
+        return False
+    return None
+
+
+def _set_static(node, value):
+    node.static_value = value
+    node.cond_lambda = str(value)
+    node.deps = frozenset()
+
+
+def _replace_with(node, child):
+    node.static_value = child.static_value
+    node.cond_lambda = child.cond_lambda
+    node.deps = child.deps
+    return node.static_value
+
+
+def simplify_condition(node):
+    """Fold a built condition tree bottom-up. Returns node.static_value."""
+    if not (hasattr(node, "r1") and hasattr(node, "r2")):
+        value = static_value(node.cond_lambda)
+        if value is not None:
+            _set_static(node, value)
+        else:
+            node.static_value = None
+        return node.static_value
+
+    left = simplify_condition(node.r1)
+    right = simplify_condition(node.r2)
+    op = node.operator
+    same = node.r1.cond_lambda == node.r2.cond_lambda
+    value = None
+    if op == "AND":
+        if left is False or right is False:
+            value = False
+        elif left is True:
+            return _replace_with(node, node.r2)
+        elif right is True or same:
+            return _replace_with(node, node.r1)
+    elif op == "OR":
+        if left is True or right is True:
+            value = True
+        elif left is False:
+            return _replace_with(node, node.r2)
+        elif right is False or same:
+            return _replace_with(node, node.r1)
+    elif op in ("XOR", "NOT") and same:
+        value = False
+    elif op == "XNOR" and same:
+        value = True
+    if value is None and left is not None and right is not None:
+        value = {
+            "AND": left and right,
+            "OR": left or right,
+            "NOT": left is not right,
+            "XOR": left ^ right,
+            "NOR": not (left or right),
+            "XNOR": (left and right) or ((not left) and (not right)),
+            "NAND": not (left and right),
+        }[op]
+    if value is None:
+        value = static_value(node.cond_lambda)
+    if value is not None:
+        _set_static(node, value)
+    else:
+        node.static_value = None
+    return node.static_value
+
+
+def fold_math(node):
+    """Precompute literal-only subtrees. Returns the constant value or None."""
+    if isinstance(node, (int, float)):
+        return float(node)
+    cname = node.__class__.__name__
+    value = None
+    if cname == "MathOperand":
+        value = fold_math(node.op)
+    elif cname == "MathFactor":
+        value = fold_math(node.op)
+        if value is not None and getattr(node, "sign", None) == "-":
+            value = -value
+    elif cname in ("MathExpression", "MathTerm"):
+        parts = node.op if isinstance(node.op, list) else [node.op]
+        values = [fold_math(p) for p in parts[::2]]
+        if all(v is not None for v in values):
+            value = values[0]
+            for op, rhs in zip(parts[1::2], values[1:]):
+                if op == "+":
+                    value += rhs
+                elif op == "-":
+                    value -= rhs
+                elif op == "*":
+                    value *= rhs
+                elif rhs == 0:
+                    # Leave division by zero to fail at run time.
+                    value = None
+                    break
+                else:
+                    value /= rhs
+    if value is not None:
+        node.const_value = value
+    return value
+
+
+# Direction in which a literal threshold moves to make "literal OP x" easier
+# to satisfy: x > c holds for more x as c decreases, x < c as c increases.
+RELAX_DIRECTION = {ast.Gt: -1, ast.GtE: -1, ast.Lt: 1, ast.LtE: 1}
+
+
+def _relax(expr, margin):
+    if isinstance(expr, ast.BoolOp):
+        expr.values = [_relax(v, margin) for v in expr.values]
+    elif isinstance(expr, ast.UnaryOp) and isinstance(expr.op, ast.Not):
+        expr.operand = _relax(expr.operand, -margin)
+    elif isinstance(expr, ast.Compare) and len(expr.ops) == 1:
+        op = type(expr.ops[0])
+        if op not in RELAX_DIRECTION:
+            return expr
+        right = _number(expr.comparators[0])
+        left = _number(expr.left)
+        if right is not None and left is None:
+            shift = RELAX_DIRECTION[op] * margin
+            expr.comparators = [ast.Constant(right + shift)]
+        elif left is not None and right is None:
+            shift = RELAX_DIRECTION[MIRRORED[op]] * margin
+            expr.left = ast.Constant(left + shift)
+    return expr
+
+
+def relax_thresholds(src, margin):
+    """Widen every numeric threshold of a condition by margin.
+
+    Used for hysteresis: the relaxed expression stays true a bit longer
+    than the original once the value drifts back over the threshold.
+    Comparisons under `not` are relaxed the other way. XNOR, NOR and NAND
+    expand to and/or/not, so their thresholds are relaxed like any other;
+    only operands of XOR (^) and NOT (is not) are left as they are.
+    Returns None if src cannot be parsed.
+    """
+    expr = _parse(src)
+    if expr is None:
+        return None
+    return ast.unparse(_relax(expr, margin))
+
+
+def prune_unsatisfiable(automations):
+    """Drop automations whose built conditions can never be true."""
+    runnable = []
+    for automation in automations:
+        if getattr(automation.condition, "static_value", None) is False:
+            get_logger().warn(
+                ("optimizer.pruned", automation.name),
+                "Automation <{name}> condition can never be true; not scheduling it.",
+                name=automation.name,
+            )
+            continue
+        runnable.append(automation)
+    return runnable
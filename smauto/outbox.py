@@ -0,0 +1,125 @@
+"""Outbound action buffer shared by all automations.
+
+Attribute writes made by actions are collected per entity and published
+together when the outbox is flushed: once after each scheduler batch, and
+at the end of the current event loop iteration for event-driven automations.
+Writes that repeat the last value published for (or reported by) the entity
+are dropped unless forced, so a continuous automation whose condition stays
+true does not republish the same state every tick. Reported state arrives
+through observe() (called by notify_entity_update) or, for updates that
+bypass it, is picked up from the entity's attributes when they change.
+"""
+import asyncio
+import threading
+
+
+class ActionOutbox(object):
+    def __init__(self, enabled=True):
+        # The shared outbox only tracks reported state once a runtime uses it.
+        self.enabled = enabled
+        self._pending = {}
+        self._forced = {}
+        self._entities = {}
+        self._last = {}
+        self._seen = {}
+        self._lock = threading.Lock()
+        self._flush_scheduled = False
+        self.counters = {
+            "writes": 0,
+            "merged": 0,
+            "suppressed": 0,
+            "published": 0,
+        }
+
+    def write(self, attribute, value, force=False):
+        self.write_message(attribute.parent, {attribute.name: value}, force)
+
+    def write_message(self, entity, message, force=False):
+        with self._lock:
+            self.counters["writes"] += 1
+            pending = self._pending.get(entity.name)
+            if pending is None:
+                self._pending[entity.name] = dict(message)
+                self._entities[entity.name] = entity
+            else:
+                self.counters["merged"] += 1
+                pending.update(message)
+            if force:
+                self._forced.setdefault(entity.name, set()).update(message)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop (thread runtime): nothing to batch with.
+            self.flush()
+            return
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self.flush)
+
+    def observe(self, entity_name, state):
+        """Record state reported by the entity itself as its last known value."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._last.setdefault(entity_name, {}).update(state)
+
+    def flush(self):
+        with self._lock:
+            self._flush_scheduled = False
+            pending, self._pending = self._pending, {}
+            forced, self._forced = self._forced, {}
+            outgoing = []
+            for name, message in pending.items():
+                last = self._last.setdefault(name, {})
+                self._sync_reported(self._entities[name], message, last)
+                keep = forced.get(name, ())
+                changed = {
+                    k: v for k, v in message.items()
+                    if k in keep or k not in last or last[k] != v
+                }
+                if not changed:
+                    self.counters["suppressed"] += 1
+                    continue
+                last.update(changed)
+                outgoing.append((self._entities[name], changed))
+            self.counters["published"] += len(outgoing)
+        for entity, message in outgoing:
+            entity.publisher.publish(message)
+        return len(outgoing)
+
+    def _sync_reported(self, entity, message, last):
+        # An attribute that changed since the last flush was reported by the
+        # entity (or set by someone else): it replaces the last published value.
+        attrs = getattr(entity, "attributes_dict", None) or {}
+        seen = self._seen.setdefault(entity.name, {})
+        for key in message:
+            attr = attrs.get(key)
+            if attr is None:
+                continue
+            value = getattr(attr, "value", None)
+            if key in seen and seen[key] != value:
+                last[key] = value
+            seen[key] = value
+
+    def forget(self, entity_name=None):
+        """Drop the last published values (all entities if none is given)."""
+        with self._lock:
+            if entity_name is None:
+                self._last.clear()
+                self._seen.clear()
+            else:
+                self._last.pop(entity_name, None)
+                self._seen.pop(entity_name, None)
+
+    def stats(self):
+        return dict(self.counters)
+
+
+ACTION_OUTBOX = ActionOutbox(enabled=False)
+
+
+def get_action_outbox():
+    return ACTION_OUTBOX
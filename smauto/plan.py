@@ -0,0 +1,72 @@
+"""Execution plan for the `after` dependencies between automations.
+
+An automation listing others under `after` only runs once none of them is
+RUNNING, so a cycle of `after` references can never make progress. The
+plan orders automations into stages (stage n only waits on stages < n) and
+is computed once when the model is loaded.
+"""
+
+
+class DependencyCycleError(ValueError):
+    def __init__(self, cycle):
+        self.cycle = cycle
+        names = " -> ".join(a.name for a in cycle + cycle[:1])
+        super().__init__(f"Cyclic 'after' dependency between automations: {names}")
+
+
+def _find_cycle(remaining):
+    """Return one cycle among automations that could not be ordered."""
+    path, on_path = [], set()
+
+    def visit(automation):
+        path.append(automation)
+        on_path.add(automation)
+        for dep in automation.after:
+            if dep in on_path:
+                return path[path.index(dep):]
+            if dep in remaining:
+                cycle = visit(dep)
+                if cycle:
+                    return cycle
+        on_path.discard(path.pop())
+        return None
+
+    for automation in remaining:
+        cycle = visit(automation)
+        if cycle:
+            return cycle
+    return list(remaining)
+
+
+def build_execution_plan(automations):
+    """Group automations into stages ordered by `after`.
+
+    Raises DependencyCycleError if the `after` references form a cycle.
+    """
+    automations = list(automations)
+    members = set(automations)
+    pending = {
+        a: len([d for d in set(a.after) if d in members]) for a in automations
+    }
+    dependents = {a: [] for a in automations}
+    for a in automations:
+        for dep in set(a.after):
+            if dep in members:
+                dependents[dep].append(a)
+    stages = []
+    ready = [a for a in automations if pending[a] == 0]
+    while ready:
+        stages.append(ready)
+        following = []
+        for a in ready:
+            for d in dependents[a]:
+                pending[d] -= 1
+                if pending[d] == 0:
+                    following.append(d)
+        ready = following
+    if sum(len(s) for s in stages) != len(automations):
+        ordered = {a for s in stages for a in s}
+        raise DependencyCycleError(
+            _find_cycle([a for a in automations if a not in ordered])
+        )
+    return stages
@@ -0,0 +1,131 @@
+"""Conditional REST polling with HTTP validators.
+
+Most upstream APIs change far less often than they are polled. For every
+source, ConditionalFetcher keeps the ETag / Last-Modified validators and
+the freshness lifetime (Cache-Control max-age, minus Age) of the last
+response:
+
+- while the last response is fresh, a poll is skipped entirely;
+- otherwise If-None-Match / If-Modified-Since are sent, and a
+  304 Not Modified reuses the last body and mapped values without
+  re-running the mapping.
+
+    fetcher = ConditionalFetcher(get_client_pool())
+    values = await fetcher.poll(source, map_fields)   # None when unchanged
+"""
+import re
+from smauto.lib.clock import clock_time
+from smauto.lib.rest_pool import decode_response, get_client_pool, request_kwargs
+
+MAX_AGE = re.compile(r"(?:^|,)\s*max-age\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+def freshness(headers):
+    """Seconds the response may be reused without asking, or 0."""
+    cache_control = headers.get("cache-control", "")
+    lowered = cache_control.lower()
+    if "no-cache" in lowered or "no-store" in lowered:
+        return 0
+    match = MAX_AGE.search(cache_control)
+    if match is None:
+        return 0
+    try:
+        age = int(headers.get("age", 0))
+    except ValueError:
+        age = 0
+    return max(int(match.group(1)) - age, 0)
+
+
+class CacheEntry(object):
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+        self.fresh_until = None
+        self.data = None
+        self.mapped = None
+        self.body_size = 0
+        self.counters = {
+            "fetched": 0,
+            "hits": 0,
+            "not_modified": 0,
+            "bytes_saved": 0,
+        }
+
+    def validators(self):
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def store(self, response, now):
+        headers = response.headers
+        if response.status_code != 304:
+            self.etag = headers.get("etag")
+            self.last_modified = headers.get("last-modified")
+        else:
+            self.etag = headers.get("etag", self.etag)
+            self.last_modified = headers.get("last-modified", self.last_modified)
+        ttl = freshness(headers)
+        self.fresh_until = now + ttl if ttl else None
+
+
+class ConditionalFetcher(object):
+    def __init__(self, pool=None, clock=clock_time):
+        self.pool = pool
+        self.clock = clock
+        self.entries = {}
+
+    def entry(self, source):
+        entry = self.entries.get(source.name)
+        if entry is None:
+            entry = self.entries[source.name] = CacheEntry()
+        return entry
+
+    async def fetch(self, source):
+        """Return (data, changed) for a source, using the cache where possible."""
+        entry = self.entry(source)
+        now = self.clock()
+        if entry.data is not None and entry.fresh_until is not None and now < entry.fresh_until:
+            entry.counters["hits"] += 1
+            entry.counters["bytes_saved"] += entry.body_size
+            return entry.data, False
+        kwargs = request_kwargs(source)
+        if entry.data is not None:
+            kwargs["headers"].update(entry.validators())
+        pool = self.pool or get_client_pool()
+        response = await pool.request(kwargs.pop("method"), kwargs.pop("url"), **kwargs)
+        if response.status_code == 304 and entry.data is not None:
+            entry.store(response, now)
+            entry.counters["not_modified"] += 1
+            entry.counters["bytes_saved"] += entry.body_size
+            return entry.data, False
+        response.raise_for_status()
+        entry.store(response, now)
+        entry.data = decode_response(response)
+        entry.mapped = None
+        entry.body_size = len(response.content)
+        entry.counters["fetched"] += 1
+        return entry.data, True
+
+    async def poll(self, source, mapper):
+        """Fetch and map a source; returns None if nothing changed.
+
+        mapper(source, data) is only called for new response bodies.
+        """
+        data, changed = await self.fetch(source)
+        entry = self.entry(source)
+        if not changed and entry.mapped is not None:
+            return None
+        entry.mapped = mapper(source, data)
+        return entry.mapped
+
+    def forget(self, source_name):
+        self.entries.pop(source_name, None)
+
+    def stats(self, source_name=None):
+        if source_name is not None:
+            entry = self.entries.get(source_name)
+            return dict(entry.counters) if entry is not None else None
+        return {name: dict(e.counters) for name, e in self.entries.items()}
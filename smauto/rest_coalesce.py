@@ -0,0 +1,138 @@
+"""Request coalescing for RESTSources that share an endpoint.
+
+Models often declare several sources with the same url, method, params,
+headers and body that differ only in their `map` (one source per dashboard
+tile, say). RequestCoalescer groups sources by a canonical request key and:
+
+- collapses concurrent identical fetches into one request task owned by
+  the coalescer (single-flight), so cancelling one caller leaves the
+  others waiting on the same request;
+- reuses a response fetched less than `window` seconds ago (by default half
+  the shortest poll interval of the group), so sources of a group polled
+  in the same interval share one request;
+- fans one response out to the mappings of every source in the group.
+
+    coalescer = RequestCoalescer(get_client_pool())
+    for source in model.restSources:
+        coalescer.register(source)
+    values = await coalescer.poll_group(source)   # {source name: mapped values}
+"""
+import asyncio
+import json
+from smauto.lib.clock import clock_time
+from smauto.lib.rest_jpath import map_compiled
+from smauto.lib.rest_pool import get_client_pool, request_kwargs
+
+DEFAULT_POLL = 60
+
+
+def _retrieve(task):
+    # Waiters re-raise the error; one left without waiters is not reported.
+    if not task.cancelled():
+        task.exception()
+
+
+def request_key(source):
+    """Canonical, hashable form of the HTTP request a source issues."""
+    kwargs = request_kwargs(source)
+    kwargs.pop("timeout", None)
+    kwargs["headers"] = {k.lower(): v for k, v in kwargs["headers"].items()}
+    return json.dumps(kwargs, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class RequestCoalescer(object):
+    def __init__(self, pool=None, fetch=None, window=None, clock=clock_time):
+        self.pool = pool
+        # async fetch(source) -> decoded body; defaults to pool.fetch.
+        self._fetch = fetch
+        self.window = window
+        self.clock = clock
+        self._groups = {}
+        self._keys = {}
+        self._inflight = {}
+        self._results = {}
+        self.counters = {"requests": 0, "joined": 0, "reused": 0}
+
+    def register(self, source):
+        key = request_key(source)
+        self._keys[source.name] = key
+        group = self._groups.setdefault(key, [])
+        group[:] = [s for s in group if s.name != source.name] + [source]
+        return key
+
+    def unregister(self, source_name):
+        key = self._keys.pop(source_name, None)
+        if key is None:
+            return
+        group = [s for s in self._groups.get(key, ()) if s.name != source_name]
+        if group:
+            self._groups[key] = group
+        else:
+            self._groups.pop(key, None)
+            self._results.pop(key, None)
+
+    def key_of(self, source):
+        key = self._keys.get(source.name)
+        return key if key is not None else self.register(source)
+
+    def group(self, source):
+        return list(self._groups.get(self.key_of(source), ()))
+
+    def groups(self):
+        """One representative source per unique request, for the poll loops."""
+        return [group[0] for group in self._groups.values()]
+
+    def interval(self, source):
+        """Poll interval of a group: the shortest of its sources."""
+        return min(getattr(s, "poll", None) or DEFAULT_POLL for s in self.group(source))
+
+    def _window(self, source):
+        return self.window if self.window is not None else self.interval(source) / 2
+
+    async def _request(self, source):
+        if self._fetch is not None:
+            return await self._fetch(source)
+        return await (self.pool or get_client_pool()).fetch(source)
+
+    async def fetch(self, source):
+        """Decoded body for a source, shared with identical requests."""
+        key = self.key_of(source)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.counters["joined"] += 1
+        else:
+            cached = self._results.get(key)
+            if cached is not None and self.clock() - cached[0] < self._window(source):
+                self.counters["reused"] += 1
+                return cached[1]
+            self.counters["requests"] += 1
+            # Owned by the coalescer: a cancelled caller does not cancel the
+            # request the other callers are waiting for.
+            task = asyncio.get_running_loop().create_task(self._shared_request(key, source))
+            task.add_done_callback(_retrieve)
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _shared_request(self, key, source):
+        try:
+            data = await self._request(source)
+        finally:
+            self._inflight.pop(key, None)
+        self._results[key] = (self.clock(), data)
+        return data
+
+    async def poll(self, source):
+        """Mapped values of one source."""
+        return map_compiled(source, await self.fetch(source))
+
+    async def poll_group(self, source):
+        """One fetch, mapped for every source sharing the request."""
+        data = await self.fetch(source)
+        return {s.name: map_compiled(s, data) for s in self.group(source)}
+
+    def stats(self):
+        return dict(
+            self.counters,
+            sources=len(self._keys),
+            unique_requests=len(self._groups),
+        )
@@ -0,0 +1,162 @@
+"""Demand-driven, adaptive polling of RESTSources.
+
+A source is only polled while at least one automation reading
+rest.<Source>.* is active (enabled and not waiting for its `after`
+automations). When an automation becomes active again, the sources it
+reads are polled at once instead of at the end of their current interval.
+
+With adaptive=True, the interval of a source grows by `backoff` after each
+poll that returned the same values, up to max_factor times its `poll`
+interval, and drops back to `poll` as soon as the values change. The first
+poll of every source is delayed by a random fraction (`jitter`) of its
+interval, so sources declared with the same `poll` do not fire together.
+
+    poller = DemandPoller(model.restSources, automations, fetch, adaptive=True)
+    task = asyncio.create_task(poller.run())
+"""
+import asyncio
+import random
+from smauto.lib.dependency import automation_inputs, notify_rest_update
+from smauto.lib.log import get_logger
+
+DEFAULT_POLL = 60
+
+
+def store_values(source, values):
+    """Default sink: merge into source.data and wake the readers."""
+    current = getattr(source, "data", None)
+    if not isinstance(current, dict):
+        source.data = current = {}
+    current.update(values)
+    notify_rest_update(source.name, values)
+
+
+class SourceState(object):
+    def __init__(self, source, base):
+        self.source = source
+        self.base = base
+        self.interval = base
+        self.values = None
+        self.wake = asyncio.Event()
+        self.counters = {"polls": 0, "changed": 0, "idle": 0, "catch_up": 0, "errors": 0}
+
+
+class DemandPoller(object):
+    def __init__(self, sources, automations, fetch, on_update=store_values,
+                 adaptive=False, backoff=2.0, max_factor=8, jitter=0.2,
+                 rng=random.random):
+        # async fetch(source) -> mapped values, e.g. RequestCoalescer.poll.
+        self.fetch = fetch
+        self.on_update = on_update
+        self.adaptive = adaptive
+        self.backoff = backoff
+        self.max_factor = max_factor
+        self.jitter = jitter
+        self.rng = rng
+        self._loop = None
+        self.sources = {
+            s.name: SourceState(s, getattr(s, "poll", None) or DEFAULT_POLL) for s in sources
+        }
+        self.readers = {}
+        self.attach(automations)
+
+    def attach(self, automations):
+        """(Re)build the source -> reading automations map, e.g. after a reload."""
+        for readers in self.readers.values():
+            for automation in readers:
+                if self._on_activated in automation._activation_listeners:
+                    automation._activation_listeners.remove(self._on_activated)
+        self.readers = {name: [] for name in self.sources}
+        for automation in automations:
+            _, rests = automation_inputs(automation)
+            for name in rests:
+                if name in self.readers:
+                    self.readers[name].append(automation)
+            if rests:
+                automation._activation_listeners.append(self._on_activated)
+
+    def demanded(self, name):
+        return any(a.active for a in self.readers.get(name, ()))
+
+    def _on_activated(self, automation):
+        # May be called from an automation thread.
+        _, rests = automation_inputs(automation)
+        for name in rests:
+            state = self.sources.get(name)
+            if state is None:
+                continue
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._catch_up, state)
+            else:
+                self._catch_up(state)
+
+    def _catch_up(self, state):
+        state.counters["catch_up"] += 1
+        state.interval = state.base
+        state.wake.set()
+
+    def _next_interval(self, state, changed):
+        if not self.adaptive or changed:
+            return state.base
+        return min(state.interval * self.backoff, state.base * self.max_factor)
+
+    async def _sleep(self, state, seconds):
+        """Sleep, or return early on a catch-up request."""
+        try:
+            await asyncio.wait_for(state.wake.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        state.wake.clear()
+
+    async def poll_once(self, name):
+        """Poll a source now; returns True if its values changed."""
+        state = self.sources[name]
+        try:
+            values = await self.fetch(state.source)
+        except Exception as exc:
+            state.counters["errors"] += 1
+            get_logger().warn(
+                ("rest.poll", name), "[{name}] REST poll failed: {error}", name=name, error=exc
+            )
+            return False
+        state.counters["polls"] += 1
+        changed = values != state.values
+        if changed:
+            state.counters["changed"] += 1
+            state.values = values
+            if self.on_update is not None:
+                self.on_update(state.source, values)
+        return changed
+
+    async def _run_source(self, state):
+        name = state.source.name
+        await self._sleep(state, self.rng() * self.jitter * state.base)
+        while True:
+            if not self.demanded(name):
+                # Direct `enabled` changes bypass the listeners: recheck each interval.
+                state.counters["idle"] += 1
+                await self._sleep(state, state.base)
+                continue
+            changed = await self.poll_once(name)
+            state.interval = self._next_interval(state, changed)
+            await self._sleep(state, state.interval)
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        tasks = [
+            asyncio.create_task(self._run_source(state), name=f"rest:{name}")
+            for name, state in self.sources.items()
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._loop = None
+
+    def stats(self):
+        return {
+            name: dict(state.counters, interval=state.interval, demanded=self.demanded(name))
+            for name, state in self.sources.items()
+        }
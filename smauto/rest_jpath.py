@@ -0,0 +1,207 @@
+"""Compiled JSON-path accessors for RESTSource mappings.
+
+Interpreting a jpath string such as "$.hourly.temperature_2m[0]" on every
+poll repeats the same parsing for every mapping of every source. Here each
+path is parsed once and turned into an accessor:
+
+- plain paths (keys and indices) become one generated subscript chain,
+  obj["hourly"]["temperature_2m"][0], guarded by a single try/except;
+- paths with wildcards ([*], .*) or slices ([1:5], [::2]) are walked in one
+  pass over the matches and return the list of matched values.
+
+Missing paths give None, as with rest_mapping.json_path. Each RESTMapping
+compiles to a (name, accessor, caster) triple, built once per source when
+the model is loaded (see language.compile_rest_sources).
+"""
+import functools
+import re
+
+KEY, INDEX, WILDCARD, SLICE = "key", "index", "wildcard", "slice"
+
+_TOKEN = re.compile(
+    r"""
+    \.(?P<dot>[A-Za-z_$][\w$-]*)
+  | \.(?P<dotstar>\*)
+  | \[\s*(?P<index>-?\d+)\s*\]
+  | \[\s*(?P<star>\*)\s*\]
+  | \[\s*(?P<slice>-?\d*\s*:\s*-?\d*(?:\s*:\s*-?\d*)?)\s*\]
+  | \[\s*'(?P<squoted>[^']*)'\s*\]
+  | \[\s*"(?P<dquoted>[^"]*)"\s*\]
+    """,
+    re.VERBOSE,
+)
+
+
+class JsonPathError(ValueError):
+    pass
+
+
+def _slice(text):
+    parts = [p.strip() for p in text.split(":")]
+    return slice(*(int(p) if p else None for p in parts))
+
+
+def parse_path(jpath):
+    """Split a jpath into (kind, arg) steps."""
+    path = jpath.strip()
+    if path.startswith("$"):
+        path = path[1:]
+    elif path and not path.startswith((".", "[")):
+        path = "." + path
+    steps, pos = [], 0
+    while pos < len(path):
+        match = _TOKEN.match(path, pos)
+        if match is None:
+            raise JsonPathError(f"Invalid JSON path {jpath!r} at {path[pos:]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind in ("dot", "squoted", "dquoted"):
+            steps.append((KEY, value))
+        elif kind == "index":
+            steps.append((INDEX, int(value)))
+        elif kind in ("star", "dotstar"):
+            steps.append((WILDCARD, None))
+        else:
+            steps.append((SLICE, _slice(value)))
+        pos = match.end()
+    return tuple(steps)
+
+
+def _plain_accessor(steps):
+    chain = "".join(f"[{arg!r}]" for _, arg in steps)
+    src = (
+        "def get(obj):\n"
+        "    try:\n"
+        f"        return obj{chain}\n"
+        "    except (KeyError, IndexError, TypeError):\n"
+        "        return None\n"
+    )
+    namespace = {}
+    exec(compile(src, "<jpath>", "exec"), namespace)
+    return namespace["get"]
+
+
+def _step(kind, arg):
+    """Function mapping the current matches to the next ones."""
+    if kind == KEY:
+        return lambda values: [v[arg] for v in values if isinstance(v, dict) and arg in v]
+    if kind == INDEX:
+        return lambda values: [
+            v[arg] for v in values if isinstance(v, list) and -len(v) <= arg < len(v)
+        ]
+    if kind == WILDCARD:
+        def wildcard(values):
+            matched = []
+            for v in values:
+                if isinstance(v, dict):
+                    matched.extend(v.values())
+                elif isinstance(v, list):
+                    matched.extend(v)
+            return matched
+        return wildcard
+
+    def sliced(values):
+        matched = []
+        for v in values:
+            if isinstance(v, list):
+                matched.extend(v[arg])
+        return matched
+    return sliced
+
+
+def _multi_accessor(steps):
+    functions = tuple(_step(kind, arg) for kind, arg in steps)
+
+    def get(obj):
+        current = [obj]
+        for step in functions:
+            current = step(current)
+            if not current:
+                return None
+        return current
+    return get
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_path(jpath):
+    """Accessor obj -> value for a jpath (a list of values for multi-match paths)."""
+    steps = parse_path(jpath)
+    if all(kind in (KEY, INDEX) for kind, _ in steps):
+        return _plain_accessor(steps)
+    return _multi_accessor(steps)
+
+
+def json_path(jpath, obj):
+    return compile_path(jpath)(obj)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _string(value):
+    return None if value is None else str(value)
+
+
+def _bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes", "on")
+    return None if value is None else bool(value)
+
+
+def _list(value):
+    if value is None or isinstance(value, list):
+        return value
+    return [value]
+
+
+def _dict(value):
+    return value if isinstance(value, dict) else None
+
+
+def _identity(value):
+    return value
+
+
+CASTERS = {
+    "number": _number,
+    "string": _string,
+    "bool": _bool,
+    "list": _list,
+    "dict": _dict,
+    None: _identity,
+}
+
+
+def _lift(caster):
+    # Multi-match paths cast every matched value.
+    return lambda value: [caster(v) for v in value] if isinstance(value, list) else caster(value)
+
+
+def compile_mapping(mapping):
+    """(name, accessor, caster) for a RESTMapping."""
+    kind = getattr(mapping, "type", None) or None
+    caster = CASTERS[kind]
+    steps = parse_path(mapping.jpath)
+    if kind not in ("list", None) and not all(k in (KEY, INDEX) for k, _ in steps):
+        caster = _lift(caster)
+    return mapping.name, compile_path(mapping.jpath), caster
+
+
+def compile_source(source):
+    """Compile the mappings of a RESTSource; stored on the source."""
+    source.compiled_mappings = tuple(
+        compile_mapping(m) for m in getattr(source, "mappings", None) or ()
+    )
+    return source.compiled_mappings
+
+
+def map_compiled(source, raw):
+    """map_fields() over the compiled mappings of a source."""
+    compiled = getattr(source, "compiled_mappings", None)
+    if compiled is None:
+        compiled = compile_source(source)
+    return {name: caster(get(raw)) for name, get, caster in compiled}
@@ -0,0 +1,169 @@
+"""Long-lived, pooled HTTP clients for RESTSource fetching.
+
+Opening an httpx.AsyncClient per request pays for TCP (and TLS) setup on
+every poll. ClientPool keeps one AsyncClient per origin (scheme, host,
+port) with keep-alive connections, so consecutive polls of a source reuse
+an open connection. Pool limits and HTTP/2 are configurable; HTTP/2 needs
+the optional `h2` package and falls back to HTTP/1.1 without it.
+
+The pool is meant to live as long as the REST runtime: open_client_pool()
+when it starts and close_client_pool() when it stops.
+
+    pool = await open_client_pool(max_connections=20)
+    data = await pool.fetch(source)
+    await close_client_pool()
+"""
+import importlib.util
+from urllib.parse import urlsplit
+import httpx
+from smauto.lib.log import get_logger
+
+DEFAULT_TIMEOUT = 10.0
+
+
+def _plain(value):
+    """DSL Dict/List values to native Python."""
+    to_dict = getattr(value, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    return value
+
+
+def request_kwargs(source):
+    """Native httpx request arguments for a RESTSource."""
+    headers = dict(_plain(getattr(source, "headers", None)) or {})
+    params = dict(_plain(getattr(source, "params", None)) or {})
+    kwargs = {
+        "method": (getattr(source, "method", None) or "GET").upper(),
+        "url": source.url,
+        "headers": headers,
+        "params": params,
+    }
+    auth = getattr(source, "auth", None)
+    cname = auth.__class__.__name__
+    if cname == "RESTAuthApiKey":
+        headers[auth.header] = auth.value
+    elif cname == "RESTAuthBearer":
+        headers["Authorization"] = f"Bearer {auth.token}"
+    elif cname == "RESTAuthBasic":
+        kwargs["auth"] = (auth.username, auth.password)
+    body = _plain(getattr(source, "body", None))
+    if isinstance(body, (dict, list)):
+        kwargs["json"] = body
+    elif body is not None:
+        kwargs["content"] = body
+    timeout = getattr(source, "timeout", None)
+    if timeout:
+        kwargs["timeout"] = timeout
+    return kwargs
+
+
+def decode_response(response):
+    """JSON body, or {"_raw": text} for anything else."""
+    if "json" in response.headers.get("content-type", ""):
+        try:
+            return response.json()
+        except ValueError:
+            pass
+    return {"_raw": response.text}
+
+
+def origin(url):
+    parts = urlsplit(str(url))
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return parts.scheme, parts.hostname, port
+
+
+class ClientPool(object):
+    def __init__(self, max_connections=10, max_keepalive_connections=5,
+                 keepalive_expiry=30.0, http2=False, timeout=DEFAULT_TIMEOUT,
+                 transport=None):
+        if http2 and importlib.util.find_spec("h2") is None:
+            get_logger().warn(
+                "rest.http2", "HTTP/2 needs the 'h2' package; using HTTP/1.1"
+            )
+            http2 = False
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.timeout = timeout
+        # Custom transport, e.g. httpx.MockTransport in tests.
+        self.transport = transport
+        self._clients = {}
+        self.requests = {}
+
+    def client_for(self, url):
+        key = origin(url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self.limits,
+                http2=self.http2,
+                timeout=self.timeout,
+                transport=self.transport,
+            )
+            self._clients[key] = client
+        return client
+
+    async def request(self, method, url, **kwargs):
+        key = origin(url)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        return await self.client_for(url).request(method, url, **kwargs)
+
+    def stream(self, method, url, **kwargs):
+        """Streaming request (async context manager), see rest_stream."""
+        key = origin(url)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        return self.client_for(url).stream(method, url, **kwargs)
+
+    async def send(self, source):
+        """Issue the request described by a RESTSource; returns the response."""
+        kwargs = request_kwargs(source)
+        response = await self.request(kwargs.pop("method"), kwargs.pop("url"), **kwargs)
+        response.raise_for_status()
+        return response
+
+    async def fetch(self, source):
+        """Fetch a RESTSource and decode its body (see RestClient.fetch)."""
+        return decode_response(await self.send(source))
+
+    async def aclose(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    def stats(self):
+        return {
+            "clients": len(self._clients),
+            "http2": self.http2,
+            "requests": {f"{s}://{h}:{p}": n for (s, h, p), n in self.requests.items()},
+        }
+
+
+CLIENT_POOL = None
+
+
+async def open_client_pool(**kwargs):
+    """Create the shared pool (closing a previous one)."""
+    global CLIENT_POOL
+    await close_client_pool()
+    CLIENT_POOL = ClientPool(**kwargs)
+    return CLIENT_POOL
+
+
+def get_client_pool():
+    """The shared pool, created with default limits on first use."""
+    global CLIENT_POOL
+    if CLIENT_POOL is None:
+        CLIENT_POOL = ClientPool()
+    return CLIENT_POOL
+
+
+async def close_client_pool():
+    global CLIENT_POOL
+    pool, CLIENT_POOL = CLIENT_POOL, None
+    if pool is not None:
+        await pool.aclose()
@@ -0,0 +1,312 @@
+"""Streaming, partial JSON parsing for large RESTSource responses.
+
+A source that maps two fields out of a multi-megabyte body does not need
+the whole body as Python objects. With `stream: true` the response bytes
+are fed, chunk by chunk, into an event-based parser (ijson). Only the
+subtrees under the mapped jpath prefixes are built, into a sparse copy of
+the document, and reading stops as soon as every prefix has been seen.
+The compiled mappings (rest_jpath) then run over that sparse copy, so the
+values are the same as with a full parse.
+
+The capture prefix of a path is its leading keys and non-negative indices:
+"$.hourly.temperature_2m[0]" is captured as is, "$.devices[*].id" and
+"$.hourly.time[-1]" capture the whole "devices" / "hourly.time" array.
+
+ijson is optional; without it the body is buffered and parsed in one go.
+
+    values = await stream_map(source)   # same result as map_fields(fetch())
+"""
+import json
+from itertools import accumulate, islice, repeat
+from operator import itemgetter
+from smauto.lib.rest_jpath import INDEX, KEY, map_compiled, parse_path
+from smauto.lib.rest_pool import decode_response, get_client_pool, request_kwargs
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+CHUNK_SIZE = 64 * 1024
+_DEPTH = {"start_map": 1, "start_array": 1, "end_map": -1, "end_array": -1}
+
+
+def capture_prefix(jpath):
+    """Leading steps of a jpath that select a single, concrete node."""
+    prefix = []
+    for kind, arg in parse_path(jpath):
+        if kind == KEY or (kind == INDEX and arg >= 0):
+            prefix.append(arg)
+        else:
+            break
+    return tuple(prefix)
+
+
+class _Node(object):
+    __slots__ = ("children", "parent", "path", "done")
+
+    def __init__(self, parent=None):
+        self.children = {}
+        self.parent = parent
+        self.path = None    # set on capture nodes
+        self.done = False
+
+
+def capture_tree(source):
+    """Trie of the minimal capture prefixes of a source's mappings."""
+    root = _Node()
+    for mapping in getattr(source, "mappings", None) or ():
+        prefix = capture_prefix(mapping.jpath)
+        node = root
+        for part in prefix:
+            if node.path is not None:
+                break   # an enclosing subtree is captured already
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _Node(node)
+            node = child
+        else:
+            if node.path is None:
+                node.path = prefix
+                node.children = {}
+    return root
+
+
+def _count(node):
+    if node.path is not None:
+        return 1
+    return sum(_count(child) for child in node.children.values())
+
+
+class _Builder(object):
+    """Builds one JSON value from basic_parse events."""
+    __slots__ = ("containers", "keys", "value")
+
+    def __init__(self):
+        self.containers = []
+        self.keys = []
+        self.value = None
+
+    def _add(self, value):
+        if not self.containers:
+            self.value = value
+            return
+        top = self.containers[-1]
+        if isinstance(top, list):
+            top.append(value)
+        else:
+            top[self.keys[-1]] = value
+
+    def event(self, event, value):
+        """Consume an event; True once the value is complete."""
+        if event == "map_key":
+            self.keys[-1] = value
+            return False
+        if event == "start_map" or event == "start_array":
+            container = {} if event == "start_map" else []
+            self._add(container)
+            self.containers.append(container)
+            self.keys.append(None)
+            return False
+        if event == "end_map" or event == "end_array":
+            self.containers.pop()
+            self.keys.pop()
+        else:
+            self._add(value)
+        return not self.containers
+
+
+def _assign(container, part, value):
+    if isinstance(container, list):
+        if len(container) <= part:
+            container.extend([None] * (part + 1 - len(container)))
+        container[part] = value
+    else:
+        container[part] = value
+
+
+def _child(container, part):
+    if isinstance(container, list):
+        return container[part] if part < len(container) else None
+    return container.get(part)
+
+
+class StreamExtractor(object):
+    """Incremental extractor of the mapped parts of one JSON document.
+
+    feed() returns True once every capture prefix has been read; the
+    rest of the body can then be dropped. result() gives the sparse
+    document, values() the mapped values.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.root = capture_tree(source)
+        self.remaining = _count(self.root)
+        self.bytes_read = 0
+        self.document = None
+        self._chunks = []
+        self._events = None
+        self._parser = None
+        if ijson is not None:
+            self._events = ijson.sendable_list()
+            self._parser = ijson.basic_parse_coro(self._events, use_float=True)
+        # Frames of the containers being walked: [trie node, is_map, key/index].
+        self._stack = []
+        self._skip = 0
+        self._builder = None
+        self._capture = None
+
+    @property
+    def complete(self):
+        return self.remaining == 0
+
+    def feed(self, chunk):
+        if self.complete:
+            return True
+        self.bytes_read += len(chunk)
+        if self._parser is None:
+            self._chunks.append(chunk)
+            return False
+        self._parser.send(chunk)
+        self._walk(self._events)
+        del self._events[:]
+        return self.complete
+
+    def close(self):
+        """End of body: finish parsing what has not been captured."""
+        if self._parser is None:
+            if self._chunks:
+                self.document = json.loads(b"".join(self._chunks))
+                self._chunks = []
+        elif not self.complete:
+            self._parser.close()
+            self._walk(self._events)
+            del self._events[:]
+        return self.document
+
+    def result(self):
+        return self.document
+
+    def values(self):
+        return map_compiled(self.source, self.document)
+
+    def _skip_from(self, events, pos):
+        """Skip to the end of the subtree being skipped; returns the next position."""
+        deltas = map(_DEPTH.get, map(itemgetter(0), islice(events, pos, None)), repeat(0))
+        depths = list(accumulate(deltas, initial=self._skip))
+        try:
+            closed = depths.index(0, 1)
+        except ValueError:
+            self._skip = depths[-1]
+            return len(events)
+        self._skip = 0
+        return pos + closed
+
+    def _walk(self, events):
+        stack = self._stack
+        pos, end = 0, len(events)
+        while pos < end:
+            if self._skip:
+                pos = self._skip_from(events, pos)
+                continue
+            event, value = events[pos]
+            pos += 1
+            if self._builder is not None:
+                if self._builder.event(event, value):
+                    self._store(self._capture, self._builder.value)
+                    self._builder = None
+                    if self.remaining == 0:
+                        return
+                continue
+            if stack and stack[-1][0].done:
+                # Everything mapped below this container has been read.
+                stack.pop()
+                self._skip = 1
+                pos -= 1
+                continue
+            if event == "map_key":
+                stack[-1][2] = value
+                continue
+            if event == "end_map" or event == "end_array":
+                stack.pop()
+                continue
+            # A value starts: find its trie node.
+            if stack:
+                frame = stack[-1]
+                if not frame[1]:
+                    frame[2] += 1
+                node = frame[0].children.get(frame[2])
+            else:
+                node = self.root
+            container = event == "start_map" or event == "start_array"
+            if node is None or node.done:
+                if container:
+                    self._skip = 1
+            elif node.path is not None:
+                builder = _Builder()
+                if builder.event(event, value):
+                    self._store(node, builder.value)
+                    if self.remaining == 0:
+                        return
+                else:
+                    self._builder, self._capture = builder, node
+            elif container:
+                stack.append([node, event == "start_map", None if event == "start_map" else -1])
+
+    def _store(self, node, value):
+        node.done = True
+        self.remaining -= 1
+        parent = node.parent
+        while parent is not None and all(c.done for c in parent.children.values()):
+            parent.done = True
+            parent = parent.parent
+        path = node.path
+        if not path:
+            self.document = value
+            return
+        if self.document is None:
+            self.document = {} if isinstance(path[0], str) else []
+        container = self.document
+        for part, following in zip(path, path[1:]):
+            child = _child(container, part)
+            if child is None:
+                child = {} if isinstance(following, str) else []
+                _assign(container, part, child)
+            container = child
+        _assign(container, path[-1], value)
+
+
+def extract(source, chunks):
+    """Mapped values of a source from an iterable of body chunks."""
+    extractor = StreamExtractor(source)
+    for chunk in chunks:
+        if extractor.feed(chunk):
+            break
+    extractor.close()
+    return extractor.values()
+
+
+def wants_stream(source):
+    return bool(getattr(source, "stream", False))
+
+
+async def stream_map(source, pool=None, chunk_size=CHUNK_SIZE):
+    """Fetch a RESTSource, streaming its body, and return the mapped values.
+
+    The response is closed as soon as every mapping has been read, so its
+    connection is not returned to the keep-alive pool in that case.
+    """
+    kwargs = request_kwargs(source)
+    pool = pool or get_client_pool()
+    async with pool.stream(kwargs.pop("method"), kwargs.pop("url"), **kwargs) as response:
+        response.raise_for_status()
+        if "json" not in response.headers.get("content-type", ""):
+            await response.aread()
+            return map_compiled(source, decode_response(response))
+        extractor = StreamExtractor(source)
+        async for chunk in response.aiter_bytes(chunk_size):
+            if extractor.feed(chunk):
+                break
+        extractor.close()
+    return extractor.values()
@@ -0,0 +1,141 @@
+"""Fixed-size sample windows with O(1) rolling aggregates.
+
+Used for the windowed condition attributes (std/var/mean/min/max). Mean and
+variance are kept with Welford-style updates, min/max with monotonic deques,
+so each append and each read is O(1) regardless of the window size.
+"""
+from collections import deque
+import statistics
+
+
+class RollingWindow(object):
+    # Running sums are recomputed from the samples every this many window
+    # lengths to stop floating point error from accumulating.
+    RESYNC_PERIOD = 64
+
+    def __init__(self, maxlen):
+        self.maxlen = maxlen
+        self._values = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._seq = 0
+        self._min = deque()
+        self._max = deque()
+        self._since_resync = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __repr__(self):
+        return f"RollingWindow({list(self._values)}, maxlen={self.maxlen})"
+
+    @property
+    def full(self):
+        return len(self._values) == self.maxlen
+
+    def append(self, value):
+        n = len(self._values)
+        if n < self.maxlen:
+            self._values.append(value)
+            delta = value - self._mean
+            self._mean += delta / (n + 1)
+            self._m2 += delta * (value - self._mean)
+        else:
+            old = self._values.popleft()
+            self._values.append(value)
+            old_mean = self._mean
+            self._mean += (value - old) / n
+            self._m2 += (value - old) * (value - self._mean + old - old_mean)
+            self._since_resync += 1
+            if self._since_resync >= self.RESYNC_PERIOD * self.maxlen:
+                self._resync()
+        self._push_extremes(value)
+        self._seq += 1
+
+    def extend(self, values):
+        for v in values:
+            self.append(v)
+
+    def clear(self):
+        self._values.clear()
+        self._min.clear()
+        self._max.clear()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._since_resync = 0
+
+    def _push_extremes(self, value):
+        seq = self._seq
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((seq, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((seq, value))
+        oldest = seq - self.maxlen
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+
+    def _resync(self):
+        self._mean = statistics.fmean(self._values)
+        self._m2 = sum((v - self._mean) ** 2 for v in self._values)
+        self._since_resync = 0
+
+    # Until the window is full the aggregates are 0, matching the
+    # zero-padded buffers returned by Entity.get_buffer before.
+
+    def mean(self):
+        return self._mean if self.full else 0
+
+    def variance(self):
+        if not self.full:
+            return 0
+        if self.maxlen < 2:
+            raise statistics.StatisticsError(
+                "variance requires at least two data points"
+            )
+        return max(self._m2, 0.0) / (self.maxlen - 1)
+
+    def stdev(self):
+        return self.variance() ** 0.5
+
+    def min(self):
+        return self._min[0][1] if self.full else 0
+
+    def max(self):
+        return self._max[0][1] if self.full else 0
+
+
+def window_std(values):
+    if isinstance(values, RollingWindow):
+        return values.stdev()
+    return statistics.stdev(values)
+
+
+def window_var(values):
+    if isinstance(values, RollingWindow):
+        return values.variance()
+    return statistics.variance(values)
+
+
+def window_mean(values):
+    if isinstance(values, RollingWindow):
+        return values.mean()
+    return statistics.mean(values)
+
+
+def window_min(values, *args):
+    if isinstance(values, RollingWindow) and not args:
+        return values.min()
+    return min(values, *args)
+
+
+def window_max(values, *args):
+    if isinstance(values, RollingWindow) and not args:
+        return values.max()
+    return max(values, *args)
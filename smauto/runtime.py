@@ -0,0 +1,133 @@
+"""Asyncio runtime: all automations run as tasks on a single event loop.
+
+Replaces one blocking thread per automation. The REST poller of
+smauto.lib.rest_runtime is started on the same loop, so REST updates and
+automation ticks are interleaved without extra threads. Polling automations
+are ticked by a shared TickScheduler; event-driven ones wait for wake-ups in
+their own task. With outbox enabled, action writes of all automations go
+through one ActionOutbox that merges them per entity and skips unchanged
+values. Single automations can be added and removed while running (see
+smauto.lib.reload). With a checkpoint, state is restored from it on start
+and saved periodically (see smauto.lib.checkpoint).
+"""
+import asyncio
+from smauto.lib.checkpoint import Checkpointer
+from smauto.lib.condition_network import share_conditions
+from smauto.lib.dependency import get_dependency_index
+from smauto.lib.scheduler import TickScheduler
+from smauto.lib.outbox import get_action_outbox
+from smauto.lib.plan import build_execution_plan
+from smauto.lib.log import get_logger
+from smauto.lib.rest_runtime import start_rest_runtime, stop_rest_runtime
+
+
+class AutomationRuntime(object):
+    def __init__(self, automations, model=None, rest=True, share=True, outbox=False,
+                 checkpoint=None):
+        self.automations = list(automations)
+        self.model = model
+        self.rest = rest and len(getattr(model, "restSources", None) or []) > 0
+        self.share = share
+        self.network = None
+        self.plan = build_execution_plan(self.automations)
+        self.scheduler = TickScheduler()
+        self.outbox = None
+        if outbox:
+            self.outbox = get_action_outbox() if outbox is True else outbox
+            self.outbox.enabled = True
+            self.scheduler.after_batch.append(self.outbox.flush)
+            for automation in self.automations:
+                automation.outbox = self.outbox
+        self.checkpoint = None
+        if checkpoint is not None:
+            self.checkpoint = (
+                checkpoint if isinstance(checkpoint, Checkpointer) else Checkpointer(checkpoint)
+            )
+        self._tasks = []
+        self._automation_tasks = {}
+
+    async def start(self):
+        if self.checkpoint is not None:
+            # Windows are created when conditions are built.
+            for automation in self.automations:
+                automation.build_condition()
+            self.checkpoint.restore(self.model, self.automations)
+        if self.rest:
+            await start_rest_runtime(self.model)
+        if self.share:
+            for automation in self.automations:
+                automation.build_condition()
+            self.network = share_conditions(self.automations)
+            get_logger().info("runtime.shared", "Shared conditions: {stats}", stats=self.network.stats())
+        self._tasks.append(asyncio.create_task(self.scheduler.run(), name="scheduler"))
+        if self.checkpoint is not None:
+            self._tasks.append(asyncio.create_task(
+                self.checkpoint.run(self.model, self.automations), name="checkpoint"
+            ))
+        for automation in [a for stage in self.plan for a in stage]:
+            self._spawn(automation)
+
+    def _spawn(self, automation):
+        task = asyncio.create_task(
+            automation.start_async(self.scheduler), name=automation.name
+        )
+        self._tasks.append(task)
+        self._automation_tasks[automation] = task
+
+    def add_automation(self, automation):
+        """Start one more automation on the running loop."""
+        self.automations.append(automation)
+        if self.outbox is not None:
+            automation.outbox = self.outbox
+        if self.network is not None:
+            automation.build_condition()
+            self.network.build([automation])
+        self._spawn(automation)
+
+    async def remove_automation(self, automation):
+        """Stop one automation, leaving the others running."""
+        if automation in self.automations:
+            self.automations.remove(automation)
+        self.scheduler.remove(automation)
+        get_dependency_index().unregister(automation)
+        if self.network is not None:
+            self.network.remove(automation)
+        for dep in automation.after:
+            dep._dependents.pop(automation, None)
+        tasks = [
+            t for t in (self._automation_tasks.pop(automation, None), automation._pipeline_task)
+            if t is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = [t for t in self._tasks if t not in tasks]
+
+    async def stop(self):
+        for automation in self.automations:
+            if automation._pipeline_task is not None:
+                self._tasks.append(automation._pipeline_task)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._automation_tasks = {}
+        if self.checkpoint is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.checkpoint.stop, self.model, self.automations
+            )
+        if self.rest:
+            await stop_rest_runtime()
+
+    async def run(self):
+        await self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+
+def run_model(model, **kwargs):
+    """Blocking entry point: run every automation of a model on one loop."""
+    runtime = AutomationRuntime(model.automations, model=model, **kwargs)
+    asyncio.run(runtime.run())
@@ -0,0 +1,181 @@
+"""Central tick scheduler for polling automations.
+
+Instead of every automation sleeping 1/freq between evaluations (which drifts
+by the evaluation time), polling automations are grouped by frequency and
+driven from a single heap of absolute deadlines: tick n of a group is due at
+start + n / freq. All automations of a group are polled in one batch when
+their deadline comes up. How late each poll started relative to its deadline
+is recorded per automation, so overload shows up as growing lateness.
+"""
+import asyncio
+import heapq
+import itertools
+from smauto.lib.clock import get_clock
+from smauto.lib.log import get_logger
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class Lateness(object):
+    """Lateness statistics (seconds) of one automation."""
+
+    def __init__(self):
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+        self.count = 0
+
+    def record(self, value):
+        self.last = value
+        self.total += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self):
+        return {
+            "last": self.last,
+            "max": self.max,
+            "mean": self.mean,
+            "ticks": self.count,
+        }
+
+
+class FreqGroup(object):
+    def __init__(self, freq, start):
+        self.freq = freq
+        self.period = 1 / freq
+        self.start = start
+        self.tick = 0
+        self.automations = []
+        self.missed = 0
+
+    @property
+    def deadline(self):
+        return self.start + self.tick * self.period
+
+    def advance(self, now):
+        """Move to the next deadline after now, skipping (and counting) missed ticks."""
+        self.tick += 1
+        if self.deadline <= now:
+            behind = int((now - self.start) / self.period) + 1
+            self.missed += behind - self.tick
+            self.tick = behind
+
+
+class TickScheduler(object):
+    def __init__(self, clock=None):
+        self.clock = clock if clock is not None else get_clock().time
+        self.groups = {}
+        self.lateness = {}
+        self.batches = 0
+        self.after_batch = []
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = None
+
+    def add(self, automation):
+        group = self.groups.get(automation.freq)
+        if group is None:
+            group = FreqGroup(automation.freq, self.clock())
+            self.groups[automation.freq] = group
+            heapq.heappush(self._heap, (group.deadline, next(self._seq), group))
+        group.automations.append(automation)
+        automation.lateness = self.lateness.setdefault(automation.name, Lateness())
+        if self._wakeup is not None:
+            _wake(self._wakeup)
+
+    def remove(self, automation):
+        group = self.groups.get(automation.freq)
+        if group is not None and automation in group.automations:
+            group.automations.remove(automation)
+            if not group.automations:
+                # Dropped from the heap lazily when its deadline comes up.
+                del self.groups[automation.freq]
+
+    def poll_now(self, automation):
+        """Poll one automation outside its tick, e.g. when its `after` wait ends."""
+        if self.groups.get(automation.freq) is None:
+            return
+        if automation not in self.groups[automation.freq].automations:
+            return
+        try:
+            automation.poll()
+        except Exception as e:
+            get_logger().error("scheduler.poll", "[{name}] {error}", name=automation.name, error=e)
+            self.remove(automation)
+        for callback in self.after_batch:
+            callback()
+
+    def next_deadline(self):
+        while self._heap:
+            deadline, _, group = self._heap[0]
+            if self.groups.get(group.freq) is group:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    def run_due(self, now=None):
+        """Poll every automation whose deadline has passed. Returns the count."""
+        now = self.clock() if now is None else now
+        polled = 0
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, group = heapq.heappop(self._heap)
+            if self.groups.get(group.freq) is not group:
+                continue
+            for automation in list(group.automations):
+                automation.lateness.record(self.clock() - deadline)
+                try:
+                    automation.poll()
+                except Exception as e:
+                    get_logger().error("scheduler.poll", "[{name}] {error}", name=automation.name, error=e)
+                    self.remove(automation)
+                polled += 1
+            group.advance(self.clock())
+            heapq.heappush(self._heap, (group.deadline, next(self._seq), group))
+        if polled:
+            self.batches += 1
+            for callback in self.after_batch:
+                callback()
+        return polled
+
+    async def run(self):
+        while True:
+            deadline = self.next_deadline()
+            delay = None if deadline is None else deadline - self.clock()
+            if delay is None or delay > 0:
+                await self._sleep(delay)
+                continue
+            self.run_due()
+
+    async def _sleep(self, delay):
+        """Sleep for delay seconds (None: indefinitely) or until add() wakes us.
+
+        A group added meanwhile may be due before the deadline slept for.
+        """
+        loop = asyncio.get_running_loop()
+        self._wakeup = waiter = loop.create_future()
+        timer = loop.call_later(delay, _wake, waiter) if delay is not None else None
+        try:
+            await waiter
+        finally:
+            self._wakeup = None
+            if timer is not None:
+                timer.cancel()
+
+    def stats(self):
+        return {
+            "groups": {
+                freq: {"automations": len(g.automations), "ticks": g.tick, "missed": g.missed}
+                for freq, g in self.groups.items()
+            },
+            "batches": self.batches,
+            "lateness": {name: l.to_dict() for name, l in self.lateness.items()},
+        }
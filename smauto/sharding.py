@@ -0,0 +1,299 @@
+"""Run the automations of a model in several worker processes.
+
+Automations are partitioned so that those reading the same entities end up
+in the same shard (automations linked by `after` always do, since they
+observe each other's state). Every worker rebuilds the model from a
+picklable factory, keeps its own automations and runs them on an
+AutomationRuntime. The parent forwards entity state and REST updates only
+to the shards that read them and routes `starts`/`stops` between shards.
+"""
+import asyncio
+import heapq
+import math
+import multiprocessing
+import os
+import threading
+from smauto.lib.dependency import apply_entity_state, automation_inputs, notify_rest_update
+from smauto.lib.runtime import AutomationRuntime
+
+
+class _UnionFind(object):
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+
+class ShardPlan(object):
+    def __init__(self, shards, automations):
+        self.shards = shards
+        self.owner = {}
+        self.entity_shards = {}
+        self.rest_shards = {}
+        by_name = {a.name: a for a in automations}
+        for idx, names in enumerate(shards):
+            for name in names:
+                self.owner[name] = idx
+                entities, rests = automation_inputs(by_name[name])
+                for e in entities:
+                    self.entity_shards.setdefault(e, set()).add(idx)
+                for r in rests:
+                    self.rest_shards.setdefault(r, set()).add(idx)
+
+    def cross_shard_links(self, automations):
+        """Number of starts/stops references that cross a shard boundary."""
+        return sum(
+            1
+            for a in automations
+            for target in list(a.starts) + list(a.stops)
+            if self.owner[target.name] != self.owner[a.name]
+        )
+
+
+def partition(automations, shards):
+    """Split automations into at most `shards` groups of similar size.
+
+    Automations chained by `after` form one unit. Units that read a common
+    entity are kept together unless that would overload a shard, in which
+    case the component is split into its units.
+    """
+    automations = list(automations)
+    shards = max(1, min(shards, len(automations) or 1))
+    units = _UnionFind()
+    for a in automations:
+        units.find(a.name)
+        for dep in a.after:
+            units.union(a.name, dep.name)
+    components = _UnionFind()
+    unit_members = {}
+    unit_inputs = {}
+    for a in automations:
+        unit = units.find(a.name)
+        unit_members.setdefault(unit, []).append(a.name)
+        entities, rests = automation_inputs(a)
+        inputs = unit_inputs.setdefault(unit, set())
+        inputs.update(f"entity:{e}" for e in entities)
+        inputs.update(f"rest:{r}" for r in rests)
+        components.find(unit)
+        for key in inputs:
+            components.union(unit, key)
+    grouped = {}
+    for unit in unit_members:
+        grouped.setdefault(components.find(unit), []).append(unit)
+
+    capacity = math.ceil(len(automations) / shards)
+    result = [[] for _ in range(shards)]
+    shard_inputs = [set() for _ in range(shards)]
+    loads = [(0, idx) for idx in range(shards)]
+
+    def place(unit_list, idx):
+        for unit in unit_list:
+            result[idx].extend(unit_members[unit])
+            shard_inputs[idx].update(unit_inputs[unit])
+
+    def size(unit_list):
+        return sum(len(unit_members[u]) for u in unit_list)
+
+    for component in sorted(grouped.values(), key=size, reverse=True):
+        load, idx = heapq.heappop(loads)
+        if load + size(component) <= capacity:
+            place(component, idx)
+            heapq.heappush(loads, (load + size(component), idx))
+            continue
+        heapq.heappush(loads, (load, idx))
+        # Too big for one shard: place unit by unit, preferring a shard
+        # that already reads the same inputs.
+        for unit in sorted(component, key=lambda u: sorted(unit_inputs[u])):
+            n = len(unit_members[unit])
+            candidates = [
+                i for i in range(shards)
+                if len(result[i]) + n <= capacity and unit_inputs[unit] & shard_inputs[i]
+            ]
+            if candidates:
+                idx = min(candidates, key=lambda i: len(result[i]))
+            else:
+                idx = min(range(shards), key=lambda i: len(result[i]))
+            place([unit], idx)
+        loads = [(len(result[i]), i) for i in range(shards)]
+        heapq.heapify(loads)
+    return ShardPlan([names for names in result if names], automations)
+
+
+class RemoteAutomation(object):
+    """Stands in for an automation owned by another shard in starts/stops."""
+
+    def __init__(self, name, outbox):
+        self.name = name
+        self._outbox = outbox
+
+    def enable(self):
+        self._outbox.put(("enable", self.name))
+
+    def disable(self):
+        self._outbox.put(("disable", self.name))
+
+
+def _apply_entity_state(model, entity_name, state):
+    entity = model.entities_dict.get(entity_name)
+    if entity is not None:
+        apply_entity_state(entity, state)
+
+
+def _apply_rest_values(model, source_name, values):
+    for rs in getattr(model, "restSources", None) or []:
+        if rs.name == source_name:
+            data = getattr(rs, "data", None)
+            if not isinstance(data, dict):
+                rs.data = data = {}
+            data.update(values)
+    notify_rest_update(source_name, values)
+
+
+async def _serve(index, model, local, inbox, outbox):
+    runtime = AutomationRuntime(local, model=model, rest=False)
+    await runtime.start()
+    outbox.put(("ready", index, len(local)))
+    loop = asyncio.get_running_loop()
+    by_name = {a.name: a for a in local}
+    try:
+        while True:
+            msg = await loop.run_in_executor(None, inbox.get)
+            kind = msg[0]
+            if kind == "state":
+                _apply_entity_state(model, msg[1], msg[2])
+            elif kind == "rest":
+                _apply_rest_values(model, msg[1], msg[2])
+            elif kind == "enable":
+                by_name[msg[1]].enable()
+            elif kind == "disable":
+                by_name[msg[1]].disable()
+            elif kind == "stats":
+                outbox.put(("stats", index, {
+                    "automations": len(local),
+                    "polls": sum(l.count for l in runtime.scheduler.lateness.values()),
+                    "enabled": {a.name: a.enabled for a in local},
+                }))
+            elif kind == "stop":
+                break
+    finally:
+        await runtime.stop()
+
+
+def _worker_main(index, factory, names, inbox, outbox):
+    model = factory()
+    names = set(names)
+    local = [a for a in model.automations if a.name in names]
+    for a in local:
+        a.starts = [
+            t if t.name in names else RemoteAutomation(t.name, outbox) for t in a.starts
+        ]
+        a.stops = [
+            t if t.name in names else RemoteAutomation(t.name, outbox) for t in a.stops
+        ]
+    asyncio.run(_serve(index, model, local, inbox, outbox))
+
+
+class ShardedRuntime(object):
+    """Parent side of the sharded execution mode.
+
+    factory must be picklable (e.g. a module-level function or a
+    functools.partial of one) and return a model with `automations` and
+    `entities_dict`.
+    """
+
+    def __init__(self, factory, shards=None, context=None):
+        self.factory = factory
+        model = factory()
+        for automation in model.automations:
+            automation.build_condition()
+        self.plan = partition(model.automations, shards or os.cpu_count() or 1)
+        self._ctx = context or multiprocessing.get_context()
+        self._inboxes = []
+        self._outbox = None
+        self._processes = []
+        self._router = None
+        self._replies = None
+
+    def start(self, timeout=60):
+        self._outbox = self._ctx.Queue()
+        self._replies = {}
+        self._reply_ready = threading.Condition()
+        for idx, names in enumerate(self.plan.shards):
+            inbox = self._ctx.Queue()
+            p = self._ctx.Process(
+                target=_worker_main,
+                args=(idx, self.factory, names, inbox, self._outbox),
+                name=f"smauto-shard-{idx}",
+                daemon=True,
+            )
+            p.start()
+            self._inboxes.append(inbox)
+            self._processes.append(p)
+        self._router = threading.Thread(target=self._route, daemon=True)
+        self._router.start()
+        self._collect("ready", timeout)
+
+    def _route(self):
+        while True:
+            msg = self._outbox.get()
+            kind = msg[0]
+            if kind is None:
+                return
+            if kind in ("enable", "disable"):
+                owner = self.plan.owner.get(msg[1])
+                if owner is not None:
+                    self._inboxes[owner].put(msg)
+            else:
+                with self._reply_ready:
+                    self._replies.setdefault(kind, {})[msg[1]] = msg[2]
+                    self._reply_ready.notify_all()
+
+    def _collect(self, kind, timeout):
+        with self._reply_ready:
+            ok = self._reply_ready.wait_for(
+                lambda: len(self._replies.get(kind, {})) == len(self._inboxes),
+                timeout,
+            )
+            replies = self._replies.pop(kind, {})
+        if not ok:
+            raise TimeoutError(f"Shards did not answer '{kind}' in {timeout}s")
+        return [replies[i] for i in sorted(replies)]
+
+    def update_entity(self, entity_name, state):
+        """Forward an entity state update to the shards reading the entity."""
+        for idx in self.plan.entity_shards.get(entity_name, ()):
+            self._inboxes[idx].put(("state", entity_name, state))
+
+    def update_rest(self, source_name, values):
+        """Forward freshly polled REST values to the shards reading the source."""
+        for idx in self.plan.rest_shards.get(source_name, ()):
+            self._inboxes[idx].put(("rest", source_name, values))
+
+    def stats(self, timeout=10):
+        for inbox in self._inboxes:
+            inbox.put(("stats",))
+        return self._collect("stats", timeout)
+
+    def stop(self, timeout=10):
+        for inbox in self._inboxes:
+            inbox.put(("stop",))
+        for p in self._processes:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        if self._outbox is not None:
+            self._outbox.put((None,))
+            self._router.join(timeout)
+        self._inboxes, self._processes = [], []
@@ -0,0 +1,201 @@
+"""Run a model against simulated inputs on a virtual clock.
+
+Entity attributes with a value generator (linear, saw, sinus, gaussian,
+constant, replay, optionally `with noise`) are updated at the entity's
+freq, and REST sources can be fed from mocks, all on the timeline of one
+VirtualClock. Actions are recorded instead of being sent to a broker and are
+applied to the target entity, so automations see each other's effects.
+Noise is drawn from random generators seeded per attribute, so two runs of
+the same model and seed produce the same log.
+
+    sim = Simulation(model, seed=1)
+    sim.add_rest_mock("Weather", lambda t: {"temp": 20 + 10 * math.sin(t / 3600)}, interval=600)
+    log = sim.run(24 * 3600)
+"""
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import zlib
+from smauto.lib.clock import VirtualClock, set_clock
+from smauto.lib.dependency import apply_entity_state, notify_rest_update
+from smauto.lib.log import LogLevel, get_logger
+from smauto.lib.runtime import AutomationRuntime
+
+
+def _replay_values(gen):
+    if getattr(gen, "filepath", None):
+        with open(gen.filepath) as f:
+            values = [json.loads(line) for line in f if line.strip()]
+        return values, 1
+    return list(gen.values), max(getattr(gen, "times", 1) or 1, 1)
+
+
+def value_generator(gen):
+    """Return f(k) giving the k-th generated value (k = 0, 1, ... ticks)."""
+    cname = gen.__class__.__name__
+    if cname == "ConstantFun":
+        return lambda k: gen.value
+    if cname == "LinearFun":
+        return lambda k: gen.start + gen.step * k
+    if cname == "SawFun":
+        span = gen.max - gen.min
+        return lambda k: gen.min + (gen.step * k) % span if span else gen.min
+    if cname == "SinusFun":
+        return lambda k: gen.dc + gen.amplitude * math.sin(gen.step * k)
+    if cname == "GaussianFun":
+        # Bell curve peaking at maxValue on tick `value`, `sigma` ticks wide.
+        return lambda k: gen.maxValue * math.exp(
+            -((k - gen.value) ** 2) / (2 * gen.sigma ** 2)
+        )
+    if cname in ("ReplayFun", "ReplayFileFun"):
+        values, times = _replay_values(gen)
+        # Play the values `times` times, then hold the last one.
+        return lambda k: values[k % len(values)] if k < len(values) * times else values[-1]
+    raise NotImplementedError(f"Unsupported value generator: {cname}")
+
+
+def noise_generator(noise, rng):
+    cname = noise.__class__.__name__
+    if cname == "UniformNoise":
+        return lambda: rng.uniform(noise.min, noise.max)
+    if cname == "GaussianNoise":
+        return lambda: rng.gauss(noise.mu, noise.sigma)
+    raise NotImplementedError(f"Unsupported noise: {cname}")
+
+
+def _attr_rng(seed, entity_name, attr_name):
+    # crc32 rather than hash(): stable across processes and runs.
+    return random.Random(zlib.crc32(f"{seed}:{entity_name}.{attr_name}".encode()))
+
+
+class RecordingPublisher(object):
+    """Replaces an entity publisher: logs messages and applies them locally."""
+
+    def __init__(self, simulation, entity):
+        self.simulation = simulation
+        self.entity = entity
+
+    def publish(self, message):
+        self.simulation.record("action", self.entity.name, message)
+        self.simulation.apply_entity_state(self.entity, message)
+
+
+class Simulation(object):
+    def __init__(self, model, seed=0, start=0.0, quiet=True):
+        self.model = model
+        self.seed = seed
+        self.clock = VirtualClock(start)
+        self.quiet = quiet
+        self.log = []
+        self._rest_mocks = []
+        self._generators = []
+        for entity in model.entities_dict.values():
+            attrs = []
+            for attr in getattr(entity, "attributes", None) or entity.attributes_dict.values():
+                gen = getattr(attr, "generator", None)
+                if gen is None:
+                    continue
+                noise = getattr(attr, "noise", None)
+                rng = _attr_rng(seed, entity.name, attr.name)
+                attrs.append((
+                    attr.name,
+                    value_generator(gen),
+                    noise_generator(noise, rng) if noise is not None else None,
+                ))
+            if attrs:
+                self._generators.append((entity, attrs))
+
+    def record(self, kind, name, payload):
+        self.log.append((round(self.clock.time(), 9), kind, name, payload))
+
+    def apply_entity_state(self, entity, state):
+        apply_entity_state(entity, state)
+
+    def add_rest_mock(self, source_name, values, interval=60):
+        """Feed a REST source from values(t) -> dict every `interval` seconds.
+
+        values may also be a list of (t, dict) pairs, applied at time t.
+        """
+        self._rest_mocks.append((source_name, values, interval))
+
+    def _apply_rest(self, source_name, values):
+        for rs in getattr(self.model, "restSources", None) or []:
+            if rs.name == source_name:
+                data = getattr(rs, "data", None)
+                if not isinstance(data, dict):
+                    rs.data = data = {}
+                data.update(values)
+        self.record("rest", source_name, values)
+        notify_rest_update(source_name, values)
+
+    async def _drive_entity(self, entity, attrs, start):
+        period = 1 / (getattr(entity, "freq", None) or 1)
+        k = 0
+        while True:
+            state = {}
+            for name, value_at, noise in attrs:
+                value = value_at(k)
+                if noise is not None:
+                    value = value + noise()
+                state[name] = value
+            self.record("state", entity.name, state)
+            self.apply_entity_state(entity, state)
+            k += 1
+            await asyncio.sleep(start + k * period - self.clock.time())
+
+    async def _drive_rest(self, source_name, values, interval, start):
+        if callable(values):
+            k = 0
+            while True:
+                self._apply_rest(source_name, values(self.clock.time() - start))
+                k += 1
+                await asyncio.sleep(start + k * interval - self.clock.time())
+        else:
+            for t, v in sorted(values, key=lambda p: p[0]):
+                await asyncio.sleep(start + t - self.clock.time())
+                self._apply_rest(source_name, v)
+
+    async def _main(self, duration):
+        for entity in self.model.entities_dict.values():
+            entity.publisher = RecordingPublisher(self, entity)
+        runtime = AutomationRuntime(self.model.automations, model=self.model, rest=False)
+        start = self.clock.time()
+        drivers = [
+            asyncio.create_task(self._drive_entity(e, attrs, start))
+            for e, attrs in self._generators
+        ] + [
+            asyncio.create_task(self._drive_rest(name, values, interval, start))
+            for name, values, interval in self._rest_mocks
+        ]
+        await runtime.start()
+        try:
+            await asyncio.sleep(start + duration - self.clock.time())
+        finally:
+            for task in drivers:
+                task.cancel()
+            await asyncio.gather(*drivers, return_exceptions=True)
+            await runtime.stop()
+        return self.log
+
+    def run(self, duration):
+        """Simulate `duration` seconds and return the event log.
+
+        Log entries are (time, kind, name, payload) with kind one of
+        "state", "rest" or "action".
+        """
+        previous = set_clock(self.clock)
+        log = get_logger()
+        level = log.level
+        try:
+            with contextlib.ExitStack() as stack:
+                if self.quiet:
+                    log.set_level(LogLevel.OFF)
+                    devnull = stack.enter_context(open(os.devnull, "w"))
+                    stack.enter_context(contextlib.redirect_stdout(devnull))
+                return self.clock.run(self._main(duration))
+        finally:
+            log.set_level(level)
+            set_clock(previous)
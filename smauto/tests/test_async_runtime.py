@@ -0,0 +1,53 @@
+import asyncio
+import time
+import pytest
+from smauto.lib.runtime import AutomationRuntime
+
+
+class DummyAction:
+    def __init__(self, attribute, value):
+        self.attribute = attribute
+        self.value = value
+
+
+@pytest.mark.asyncio
+async def test_runtime_runs_automations_as_tasks(entities, model_builder, automation_builder):
+    model = model_builder(entities, rest_temp=30.0)
+    autos = []
+    for i in range(50):
+        a = automation_builder(model, actions=[DummyAction(entities["fan"].attributes_dict["speed"], i)])
+        a.name = f"auto_{i}"
+        a.freq = 100
+        autos.append(a)
+    runtime = AutomationRuntime(autos)
+    await runtime.start()
+    try:
+        await asyncio.sleep(0.1)
+        sent = [m["speed"] for m in entities["fan"].publisher.sent]
+        assert sorted(set(sent)) == list(range(50))
+        assert all(not a.enabled for a in autos)  # checkOnce
+    finally:
+        await runtime.stop()
+    assert runtime._tasks == []
+
+
+@pytest.mark.asyncio
+async def test_delay_step_does_not_block_loop(entities, model_builder, automation_builder, steps_runtime):
+    model = model_builder(entities, rest_temp=30.0)
+    slow = automation_builder(model, steps=[
+        steps_runtime["Delay"](0.3),
+        steps_runtime["Action"](entities["ac"].attributes_dict["power"], True),
+    ])
+    fast = automation_builder(model, actions=[DummyAction(entities["fan"].attributes_dict["speed"], 1)])
+    runtime = AutomationRuntime([slow, fast])
+    t0 = time.monotonic()
+    await runtime.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert entities["fan"].publisher.sent == [{"speed": 1}]
+        assert entities["ac"].publisher.sent == []
+        await asyncio.sleep(0.4)
+        assert entities["ac"].publisher.sent == [{"power": True}]
+    finally:
+        await runtime.stop()
+    assert time.monotonic() - t0 < 1.0
@@ -0,0 +1,126 @@
+import asyncio
+from smauto.lib.automation import AutomationState
+from smauto.lib import checkpoint
+from smauto.lib.checkpoint import (
+    CheckpointFile,
+    Checkpointer,
+    apply_snapshot,
+    take_snapshot,
+)
+from smauto.lib.rolling import RollingWindow
+from smauto.lib.runtime import AutomationRuntime
+
+
+def test_file_keeps_previous_checkpoint_when_newest_is_torn(tmp_path):
+    path = str(tmp_path / "state.ckpt")
+    f = CheckpointFile(path, capacity=64)
+    f.write(b"first")
+    f.write(b"second")
+    assert f.read() == b"second"
+    # Corrupt the payload of the newest slot.
+    offset = f._slot_offset(f._slot) + f.SLOT.size
+    f._map[offset:offset + 1] = b"X"
+    assert f.read() == b"first"
+    f.close()
+    f = CheckpointFile(path)
+    assert f.read() == b"first"
+    f.write(b"third")
+    assert CheckpointFile(path).read() == b"third"
+
+
+def test_file_grows_for_large_payloads(tmp_path):
+    path = str(tmp_path / "state.ckpt")
+    f = CheckpointFile(path, capacity=16)
+    f.write(b"small")
+    f.write(b"x" * 100)
+    assert f.capacity == 128
+    assert f.read() == b"x" * 100
+    f.write(b"after")
+    assert CheckpointFile(path).read() == b"after"
+
+
+def test_grown_file_holds_the_payload_before_replacing(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.ckpt")
+    f = CheckpointFile(path, capacity=16)
+    f.write(b"small")
+    replaced = []
+
+    def replace(src, dst):
+        # A crash here must leave a readable checkpoint either way.
+        replaced.append((CheckpointFile(src).read(), CheckpointFile(dst).read()))
+        real_replace(src, dst)
+
+    real_replace = checkpoint.os.replace
+    monkeypatch.setattr(checkpoint.os, "replace", replace)
+    f.write(b"x" * 100)
+    assert replaced == [(b"x" * 100, b"small")]
+    assert f.read() == b"x" * 100
+
+
+def test_snapshot_roundtrip(entities, model_builder, automation_builder):
+    model = model_builder(entities, rest_temp=21.5)
+    entities["sensor"].attributes_buff = {"temp": RollingWindow(3)}
+    entities["sensor"].attributes_buff["temp"].extend([1.0, 2.0, 3.0, 4.0])
+    entities["sensor"].attributes_dict["temp"].value = 4.0
+    a = automation_builder(model)
+    a.enabled = False
+    a.state = AutomationState.EXITED_SUCCESS
+    snapshot = take_snapshot(model, [a])
+
+    entities["sensor"].attributes_dict["temp"].value = 0.0
+    entities["sensor"].attributes_buff["temp"] = RollingWindow(3)
+    model.restSources[0].data = {}
+    b = automation_builder(model)
+    apply_snapshot(snapshot, model, [b])
+
+    assert entities["sensor"].attributes_dict["temp"].value == 4.0
+    window = entities["sensor"].attributes_buff["temp"]
+    assert list(window) == [2.0, 3.0, 4.0] and window.mean() == 3.0
+    assert model.restSources[0].data == {"temp": 21.5}
+    assert b.enabled is False and b.state == AutomationState.EXITED_SUCCESS
+
+
+def test_stale_snapshot_restores_only_automation_flags(entities, model_builder, automation_builder):
+    model = model_builder(entities, rest_temp=21.5)
+    entities["sensor"].attributes_buff = {"temp": RollingWindow(3)}
+    entities["sensor"].attributes_buff["temp"].extend([1.0, 2.0])
+    entities["sensor"].attributes_dict["temp"].value = 2.0
+    a = automation_builder(model)
+    a.enabled = False
+    snapshot = take_snapshot(model, [a])
+    snapshot["time"] -= 3600
+
+    entities["sensor"].attributes_dict["temp"].value = 0.0
+    entities["sensor"].attributes_buff["temp"] = RollingWindow(3)
+    b = automation_builder(model)
+    assert apply_snapshot(snapshot, model, [b], max_age=600) is False
+    assert entities["sensor"].attributes_dict["temp"].value == 0.0
+    assert list(entities["sensor"].attributes_buff["temp"]) == []
+    assert b.enabled is False
+    assert apply_snapshot(snapshot, model, [b], max_age=7200) is True
+    assert entities["sensor"].attributes_dict["temp"].value == 2.0
+
+
+def test_runtime_saves_on_stop_and_restores_on_start(tmp_path, entities, model_builder, automation_builder):
+    path = str(tmp_path / "state.ckpt")
+
+    async def run(model, automations):
+        runtime = AutomationRuntime(automations, model=model, rest=False, checkpoint=path)
+        await runtime.start()
+        await asyncio.sleep(0.05)
+        await runtime.stop()
+
+    model = model_builder(entities, rest_temp=30.0)
+    entities["fan"].attributes_dict["speed"].value = 3
+    a = automation_builder(model)
+    asyncio.run(run(model, [a]))
+    # checkOnce: the automation disabled itself after its check.
+    assert a.enabled is False
+
+    entities["fan"].attributes_dict["speed"].value = 0
+    fresh = automation_builder(model)
+    checkpointer = Checkpointer(path)
+    assert checkpointer.restore(model, [fresh])
+    checkpointer.stop()
+    assert entities["fan"].attributes_dict["speed"].value == 3
+    assert fresh.enabled is False
@@ -0,0 +1,65 @@
+import pytest
+
+
+class MathExpression:
+    def __init__(self, *op):
+        self.op = list(op)
+
+class MathTerm(MathExpression):
+    pass
+
+class MathFactor:
+    def __init__(self, op, sign=None):
+        self.op = op
+        self.sign = sign
+
+class MathOperand:
+    def __init__(self, op):
+        self.op = op
+
+class RestNumericRef:
+    def __init__(self, source, field):
+        self.source = type("Src", (), {"name": source})()
+        self.field = field
+
+
+def operand(x):
+    return MathTerm(MathFactor(MathOperand(x)))
+
+
+def test_compiled_expression_reads_entities_and_rest(entities, model_builder, automation_builder, auto_mod):
+    entities["sensor"].attributes_dict["temp"].value = 29.0
+    model = model_builder(entities, rest_temp=31.0)
+    aut = automation_builder(model, cls=auto_mod.Automation)
+    # ((sensor.temp + rest.OpenWeather.temp) / 2) * -1
+    inner = MathExpression(
+        operand(entities["sensor"].attributes_dict["temp"]),
+        "+",
+        operand(RestNumericRef("OpenWeather", "temp")),
+    )
+    expr = MathExpression(
+        MathTerm(MathFactor(MathOperand(inner)), "/", MathFactor(MathOperand(2)), "*", MathFactor(MathOperand(1), sign="-"))
+    )
+    fn = aut._compile_math(expr)
+    assert fn({}) == pytest.approx(-30.0)
+
+    # accessors read live values, not values captured at compile time
+    entities["sensor"].attributes_dict["temp"].value = 33.0
+    assert fn({}) == pytest.approx(-32.0)
+
+
+def test_compute_step_uses_compiled_fn(entities, model_builder, automation_builder, steps_runtime):
+    model = model_builder(entities, rest_temp=31.0)
+    aut = automation_builder(model)
+    step = steps_runtime["Compute"]("x", None, lambda ctx: 42.0)
+    ctx = {}
+    step.run(ctx, aut)
+    assert ctx["x"] == 42.0
+
+
+def test_const_value_short_circuits(entities, model_builder, automation_builder, auto_mod):
+    model = model_builder(entities, rest_temp=31.0)
+    aut = automation_builder(model, cls=auto_mod.Automation)
+    expr = MathExpression(operand(2), "*", operand(3))
+    expr.const_value = 6.0
+    assert aut._compile_math(expr)({}) == 6.0
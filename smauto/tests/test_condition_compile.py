@@ -0,0 +1,32 @@
+import pytest
+from smauto.lib.condition import Condition
+
+@pytest.fixture
+def make_condition(entities, model_builder, automation_builder):
+    def _make(temp):
+        return Condition(parent=automation_builder(model_builder(entities, rest_temp=temp)))
+    return _make
+
+def test_compile_produces_code_object(make_condition):
+    cond = make_condition(30.0)
+    cond.cond_lambda = "rests['OpenWeather']['temp'] >= 28"
+    code = cond.compile()
+    assert code is cond.cond_code
+    assert cond.compile() is code  # compiled once, reused
+    ok, _ = cond.evaluate()
+    assert ok
+
+def test_evaluate_recompiles_when_lambda_changes(make_condition):
+    cond = make_condition(30.0)
+    cond.cond_lambda = "rests['OpenWeather']['temp'] >= 28"
+    cond.compile()
+    cond.cond_lambda = "rests['OpenWeather']['temp'] >= 35"
+    ok, _ = cond.evaluate()
+    assert not ok
+
+def test_compiled_condition_uses_window_functions(entities, make_condition):
+    entities["sensor"].attributes_dict["temp"].value = [1.0, 2.0, 3.0]
+    cond = make_condition(0.0)
+    cond.cond_lambda = "mean(entities['sensor'].attributes_dict['temp'].value) == 2.0"
+    ok, _ = cond.evaluate()
+    assert ok
@@ -0,0 +1,113 @@
+from smauto.lib.condition import ConditionGroup, PrimitiveCondition
+from smauto.lib.condition_network import ConditionNetwork
+from smauto.lib.dependency import DependencyIndex, entity_dep, rest_dep
+from smauto.lib.optimizer import simplify_condition
+
+HOT = "(rests['OpenWeather']['temp'] > 28)"
+WARM = "(entities['sensor'].attributes_dict['temp'].value > 20)"
+
+
+def leaf(src, dep):
+    c = PrimitiveCondition(None)
+    c.cond_lambda = src
+    c.deps = frozenset([dep])
+    return c
+
+
+def group(r1, op, r2):
+    g = ConditionGroup(None, r1, op, r2)
+    g.cond_lambda = f"({r1.cond_lambda} {op.lower()} {r2.cond_lambda})"
+    g.deps = r1.deps | r2.deps
+    return g
+
+
+def build_automations(entities, model_builder, automation_builder):
+    model = model_builder(entities, rest_temp=30.0)
+    autos = []
+    for i in range(3):
+        a = automation_builder(model)
+        a.name = f"a{i}"
+        a.polling = False
+        a.condition = group(
+            leaf(HOT, rest_dep("OpenWeather", "temp")),
+            "AND",
+            leaf(WARM, entity_dep("sensor", "temp")),
+        )
+        a.condition.parent = a
+        autos.append(a)
+    return model, autos
+
+
+def test_identical_subexpressions_are_deduplicated(entities, model_builder, automation_builder):
+    _, autos = build_automations(entities, model_builder, automation_builder)
+    net = ConditionNetwork(DependencyIndex())
+    stats = net.build(autos)
+    assert stats["automations"] == 3
+    assert stats["nodes"] == 9
+    assert stats["unique"] == 3
+    assert stats["deduplicated"] == 6
+    assert autos[0].condition.shared_node is autos[2].condition.shared_node
+
+
+def test_shared_node_evaluated_once_per_input_change(entities, model_builder, automation_builder):
+    entities["sensor"].attributes_dict["temp"].value = 25.0
+    model, autos = build_automations(entities, model_builder, automation_builder)
+    index = DependencyIndex()
+    net = ConditionNetwork(index)
+    net.build(autos)
+
+    assert all(a.condition.evaluate()[0] for a in autos)
+    assert net.evaluations == 3  # root + two leaves, once
+
+    entities["sensor"].attributes_dict["temp"].value = 10.0
+    index.notify_entity("sensor", ["temp"])
+    assert not any(a.condition.evaluate()[0] for a in autos)
+    # root and the sensor leaf are re-evaluated, the REST leaf is reused
+    assert net.evaluations == 5
+
+
+def test_removed_automations_release_their_nodes(entities, model_builder, automation_builder):
+    _, autos = build_automations(entities, model_builder, automation_builder)
+    other = automation_builder(model_builder(entities, rest_temp=30.0))
+    other.polling = False
+    other.condition = group(
+        leaf(HOT, rest_dep("OpenWeather", "temp")),
+        "OR",
+        leaf("(entities['fan'].attributes_dict['on'].value)", entity_dep("fan", "on")),
+    )
+    net = ConditionNetwork(DependencyIndex())
+    net.build(autos + [other])
+    assert net.stats()["unique"] == 5
+
+    for a in autos[:2]:
+        net.remove(a)
+    assert net.stats()["unique"] == 5 and net.stats()["automations"] == 2
+    net.remove(autos[2])
+    assert set(net.nodes) == {HOT, other.condition.cond_lambda, "(entities['fan'].attributes_dict['on'].value)"}
+    assert net.nodes[HOT].refcount == 1
+    net.remove(other)
+    net.remove(other)   # already released: no-op
+    assert net.stats() == dict(net.stats(), automations=0, nodes=0, unique=0)
+    assert other.condition.shared_node is None
+
+
+def test_groups_simplified_into_a_child_share_the_child(entities, model_builder, automation_builder):
+    model = model_builder(entities, rest_temp=30.0)
+    autos = []
+    for right in (HOT, "True"):
+        a = automation_builder(model)
+        a.polling = False
+        a.condition = group(
+            leaf(HOT, rest_dep("OpenWeather", "temp")), "AND", leaf(right, rest_dep("OpenWeather", "temp"))
+        )
+        a.condition.parent = a
+        simplify_condition(a.condition)
+        assert a.condition.cond_lambda == HOT
+        autos.append(a)
+    net = ConditionNetwork(DependencyIndex())
+    stats = net.build(autos)
+    assert stats["nodes"] == 2 and stats["unique"] == 1 and stats["deduplicated"] == 1
+    assert all(a.condition.evaluate()[0] for a in autos)
+    for a in autos:
+        net.remove(a)
+    assert net.nodes == {} and net.stats()["nodes"] == 0
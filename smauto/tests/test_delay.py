@@ -1,10 +1,11 @@
-import smauto.lib.automation as auto
+import smauto.lib.clock as clock
 
 def test_delay_calls_sleep(monkeypatch, entities, model_builder, automation_builder, steps_runtime):
     calls = []
     def fake_sleep(s):
         calls.append(s)
-    monkeypatch.setattr(auto.time, "sleep", fake_sleep)
+    # Delay steps sleep through the runtime clock (RealClock by default).
+    monkeypatch.setattr(clock.time, "sleep", fake_sleep)
 
     model = model_builder(entities, rest_temp=30.0)
     aut = automation_builder(model, steps=[
@@ -0,0 +1,52 @@
+from smauto.lib.dependency import DependencyIndex, entity_dep, rest_dep
+
+
+class DepsCondition:
+    def __init__(self, deps):
+        self.deps = frozenset(deps)
+        self.cond_lambda = "True"
+    def build(self):
+        return self.cond_lambda
+    def evaluate(self):
+        return True, "triggered"
+
+
+def test_notify_wakes_only_dependents(entities, model_builder, automation_builder):
+    model = model_builder(entities, rest_temp=30.0)
+    a = automation_builder(model)
+    a.condition = DepsCondition([entity_dep("sensor", "temp")])
+    b = automation_builder(model)
+    b.condition = DepsCondition([rest_dep("OpenWeather", "temp")])
+    index = DependencyIndex()
+    index.register(a)
+    index.register(b)
+
+    affected = index.notify_entity("sensor", {"temp": 31.0})
+    assert affected == {a}
+    assert a._wake.is_set() and not b._wake.is_set()
+
+    affected = index.notify_rest("OpenWeather", ["temp", "wind"])
+    assert affected == {b}
+    assert index.version(rest_dep("OpenWeather", "temp")) == 1
+    assert index.version(rest_dep("OpenWeather", "wind")) == 1
+
+
+def test_unregister(entities, model_builder, automation_builder):
+    model = model_builder(entities, rest_temp=30.0)
+    a = automation_builder(model)
+    a.condition = DepsCondition([entity_dep("sensor", "temp")])
+    index = DependencyIndex()
+    index.register(a)
+    index.unregister(a)
+    assert index.notify_entity("sensor", ["temp"]) == set()
+
+
+def test_event_driven_only_with_deps(entities, model_builder, automation_builder):
+    model = model_builder(entities, rest_temp=30.0)
+    a = automation_builder(model)
+    a.condition = DepsCondition([entity_dep("sensor", "temp")])
+    assert not a.event_driven  # polling unless opted in
+    a.polling = False
+    assert a.event_driven
+    a.condition = DepsCondition([])
+    assert not a.event_driven  # no recorded inputs -> polling fallback
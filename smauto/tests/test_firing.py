@@ -0,0 +1,70 @@
+from smauto.lib.condition import Condition
+from smauto.lib.firing import FiringGate
+from smauto.lib.optimizer import relax_thresholds
+
+TEMP = "(entities['sensor'].attributes_dict['temp'].value > 30)"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make(model, automation_builder, **kwargs):
+    aut = automation_builder(model)
+    aut.checkOnce = False
+    for k, v in kwargs.items():
+        setattr(aut, k, v)
+    cond = Condition(parent=aut)
+    cond.cond_lambda = TEMP
+    cond.compile()
+    aut.condition = cond
+    aut._condition_built = True
+    aut._gate = aut._build_gate()
+    return aut
+
+
+def run(aut, sensor, values):
+    fired = []
+    for v in values:
+        sensor.attributes_dict["temp"].value = v
+        fired.append(aut._check_trigger())
+    return fired
+
+
+def test_relax_thresholds():
+    assert relax_thresholds("((x > 3) and (y <= 5))", 0.5) == "x > 2.5 and y <= 5.5"
+    assert relax_thresholds("(10 > x)", 1) == "11 > x"
+    assert relax_thresholds("(not (x >= 3))", 1) == "not x >= 4"
+    assert relax_thresholds("(x == 3)", 1) == "x == 3"
+
+
+def test_level_mode_fires_while_true(entities, model_builder, automation_builder):
+    aut = make(model_builder(entities, 0.0), automation_builder)
+    assert aut._gate is None
+    assert run(aut, entities["sensor"], [31, 32, 29, 31]) == [True, True, False, True]
+
+
+def test_edge_mode_fires_on_rising_edge(entities, model_builder, automation_builder):
+    aut = make(model_builder(entities, 0.0), automation_builder, fire="edge")
+    assert run(aut, entities["sensor"], [29, 31, 32, 29, 31]) == [False, True, False, False, True]
+
+
+def test_hysteresis_ignores_noise_around_threshold(entities, model_builder, automation_builder):
+    aut = make(model_builder(entities, 0.0), automation_builder, fire="edge", hysteresis=1)
+    noisy = [29.5, 30.2, 29.8, 30.3, 29.4, 30.1, 28.9, 30.5]
+    assert run(aut, entities["sensor"], noisy) == [False, True, False, False, False, False, False, True]
+
+
+def test_rearm_interval_limits_firing_rate():
+    clock = Clock()
+    gate = FiringGate("level", rearm=10, clock=clock)
+    fired = []
+    for t in range(0, 25, 5):
+        clock.now = t
+        fired.append(gate.update(True))
+    assert fired == [True, False, True, False, True]
+    assert gate.suppressed == 2
@@ -0,0 +1,61 @@
+import io
+import json
+from smauto.lib.log import Logger, LogFormat, LogLevel
+
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_records_below_level_are_not_buffered():
+    stream = io.StringIO()
+    log = Logger(level=LogLevel.WARN, fmt=LogFormat.JSON, stream=stream)
+    log.info("k", "ignored {x}", x=1)
+    log.debug("k", "ignored")
+    assert log.stats()["buffered"] == 0
+    log.warn("k", "kept {x}", x=2)
+    log.flush()
+    assert [(r["level"], r["msg"], r["x"]) for r in lines(stream)] == [("WARN", "kept 2", 2)]
+
+
+def test_rate_limit_applies_per_name_and_reports_suppressed():
+    stream = io.StringIO()
+    log = Logger(fmt=LogFormat.JSON, stream=stream)
+    log.rate_limit("triggered", 60)
+    for _ in range(3):
+        log.info(("triggered", "a"), "Automation <{name}> Triggered!", name="a")
+    log.info(("triggered", "b"), "Automation <{name}> Triggered!", name="b")
+    log._last[("triggered", "a")] -= 60
+    log.info(("triggered", "a"), "Automation <{name}> Triggered!", name="a")
+    log.flush()
+    records = lines(stream)
+    assert [r["key"] for r in records] == ["triggered:a", "triggered:b", "triggered:a"]
+    assert records[-1]["suppressed"] == 2
+
+
+def test_pretty_output_escapes_markup():
+    stream = io.StringIO()
+    log = Logger(stream=stream)
+    log.info("k", "Condition met: {cond}", cond="x[0] > 1")
+    log.error("k", "{error}", error=ValueError("boom"))
+    log.flush()
+    assert stream.getvalue().splitlines() == ["[*] Condition met: x[0] > 1", "[ERROR] boom"]
+
+
+def test_failing_condition_logs_once_per_automation(monkeypatch):
+    from smauto.lib import condition
+    from smauto.lib.log import DEFAULT_RATE_LIMITS, get_logger
+
+    assert get_logger()._rate["condition.error"] == DEFAULT_RATE_LIMITS["condition.error"]
+    stream = io.StringIO()
+    log = Logger(fmt=LogFormat.JSON, stream=stream)
+    log.rate_limit("condition.error", DEFAULT_RATE_LIMITS["condition.error"])
+    monkeypatch.setattr(condition, "get_logger", lambda: log)
+    for name in ("a", "b"):
+        cond = condition.PrimitiveCondition(type("Auto", (), {"name": name})())
+        cond.namespace = lambda: {"rests": {"Weather": {}}}
+        cond.cond_lambda = "rests['Weather']['temp'] > 28"
+        for _ in range(5):
+            assert cond.evaluate() == (False, f"{name}: not triggered.")
+    log.flush()
+    assert [r["key"] for r in lines(stream)] == ["condition.error:a", "condition.error:b"]
@@ -0,0 +1,105 @@
+from smauto.lib.condition import ConditionGroup, PrimitiveCondition
+from smauto.lib.dependency import entity_dep
+from smauto.lib.optimizer import fold_math, prune_unsatisfiable, simplify_condition
+
+TEMP = "entities['sensor'].attributes_dict['temp'].value"
+
+
+def leaf(src):
+    c = PrimitiveCondition(None)
+    c.cond_lambda = src
+    c.deps = frozenset([entity_dep("sensor", "temp")])
+    return c
+
+
+def group(r1, op, r2):
+    g = ConditionGroup(None, r1, op, r2)
+    g.cond_lambda = f"({r1.cond_lambda} {op.lower()} {r2.cond_lambda})"
+    g.deps = r1.deps | r2.deps
+    return g
+
+
+def test_contradictory_bounds_are_unsatisfiable():
+    cond = group(leaf(f"({TEMP} > 30)"), "AND", leaf(f"({TEMP} < 20)"))
+    assert simplify_condition(cond) is False
+    assert cond.cond_lambda == "False"
+    assert cond.deps == frozenset()
+
+
+def test_empty_in_range_is_unsatisfiable():
+    cond = leaf(f"({TEMP} > 5 and {TEMP} < 5)")
+    assert simplify_condition(cond) is False
+
+
+def test_satisfiable_condition_is_untouched():
+    cond = group(leaf(f"({TEMP} > 20)"), "AND", leaf(f"({TEMP} <= 30)"))
+    src = cond.cond_lambda
+    assert simplify_condition(cond) is None
+    assert cond.cond_lambda == src
+
+
+def test_boolean_identities():
+    hot = f"({TEMP} > 30)"
+    cond = group(leaf(hot), "AND", leaf(hot))
+    assert simplify_condition(cond) is None
+    assert cond.cond_lambda == hot
+    cond = group(leaf(hot), "OR", leaf("(3 > 5)"))
+    simplify_condition(cond)
+    assert cond.cond_lambda == hot
+    cond = group(leaf(hot), "XOR", leaf(hot))
+    assert simplify_condition(cond) is False
+    cond = group(leaf(hot), "OR", leaf("(-1.5 <= 2)"))
+    assert simplify_condition(cond) is True
+
+
+def test_self_comparisons_of_inputs_are_not_folded():
+    # A missing input or NaN makes these false at run time.
+    for src in (f"({TEMP} == {TEMP})", f"({TEMP} >= {TEMP})", f"({TEMP} > {TEMP})"):
+        cond = leaf(src)
+        assert simplify_condition(cond) is None
+        assert cond.cond_lambda == src
+
+
+class MathExpression:
+    def __init__(self, *op):
+        self.op = list(op)
+
+class MathTerm(MathExpression):
+    pass
+
+class MathFactor:
+    def __init__(self, op, sign=None):
+        self.op = op
+        self.sign = sign
+
+class MathOperand:
+    def __init__(self, op):
+        self.op = op
+
+class AttrRef:
+    pass
+
+
+def test_fold_math_literal_subtrees():
+    two_times_three = MathTerm(MathFactor(MathOperand(2)), "*", MathFactor(MathOperand(3)))
+    x = MathTerm(MathFactor(MathOperand(AttrRef())))
+    expr = MathExpression(two_times_three, "+", x)
+    assert fold_math(expr) is None
+    assert two_times_three.const_value == 6.0
+    assert not hasattr(x, "const_value")
+
+    neg = MathExpression(MathTerm(MathFactor(MathOperand(4), sign="-")), "-", MathTerm(MathFactor(MathOperand(1))))
+    assert fold_math(neg) == -5.0
+
+
+def test_fold_math_keeps_division_by_zero():
+    expr = MathExpression(MathTerm(MathFactor(MathOperand(1)), "/", MathFactor(MathOperand(0))))
+    assert fold_math(expr) is None
+
+
+def test_prune_unsatisfiable(entities, model_builder, automation_builder):
+    model = model_builder(entities, rest_temp=30.0)
+    dead = automation_builder(model)
+    dead.condition.static_value = False
+    alive = automation_builder(model)
+    assert prune_unsatisfiable([dead, alive]) == [alive]
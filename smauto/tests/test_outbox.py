@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from smauto.lib.outbox import ActionOutbox
+from smauto.lib.runtime import AutomationRuntime
+
+
+def test_writes_are_merged_per_entity_until_flush(entities):
+    outbox = ActionOutbox()
+    fan, ac = entities["fan"], entities["ac"]
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(outbox, "_schedule_flush", lambda: None)
+        outbox.write(fan.attributes_dict["speed"], 1)
+        outbox.write(fan.attributes_dict["speed"], 2)
+        outbox.write(ac.attributes_dict["power"], True)
+        assert fan.publisher.sent == []
+        assert outbox.flush() == 2
+    assert fan.publisher.sent == [{"speed": 2}]
+    assert ac.publisher.sent == [{"power": True}]
+    assert outbox.stats()["merged"] == 1
+
+
+def test_unchanged_values_are_suppressed_unless_forced(entities):
+    outbox = ActionOutbox()
+    speed = entities["fan"].attributes_dict["speed"]
+    outbox.write(speed, 3)
+    outbox.write(speed, 3)
+    outbox.write(speed, 3, force=True)
+    outbox.write(speed, 4)
+    assert entities["fan"].publisher.sent == [{"speed": 3}, {"speed": 3}, {"speed": 4}]
+    assert outbox.stats()["suppressed"] == 1
+
+
+def test_observed_state_replaces_last_published(entities):
+    outbox = ActionOutbox()
+    speed = entities["fan"].attributes_dict["speed"]
+    outbox.write(speed, 3)
+    outbox.observe("fan", {"speed": 0})
+    outbox.write(speed, 3)
+    assert entities["fan"].publisher.sent == [{"speed": 3}, {"speed": 3}]
+
+
+def test_state_changed_without_observe_is_resent(entities):
+    outbox = ActionOutbox()
+    speed = entities["fan"].attributes_dict["speed"]
+    outbox.write(speed, 3)
+    speed.value = 3                      # the fan reports the new speed
+    outbox.write(speed, 3)
+    speed.value = 0                      # someone else turns it down
+    outbox.write(speed, 3)
+    assert entities["fan"].publisher.sent == [{"speed": 3}, {"speed": 3}]
+    assert outbox.stats()["suppressed"] == 1
+
+
+def test_disabled_outbox_does_not_track_reported_state():
+    outbox = ActionOutbox(enabled=False)
+    outbox.observe("fan", {"speed": 0})
+    assert outbox._last == {}
+
+
+@pytest.mark.asyncio
+async def test_runtime_outbox_stops_continuous_republishing(entities, model_builder, automation_builder, steps_runtime):
+    model = model_builder(entities, rest_temp=30.0)
+    autos = []
+    for i in range(2):
+        a = automation_builder(model, steps=[
+            steps_runtime["Action"](entities["fan"].attributes_dict["speed"], 2),
+        ])
+        a.name = f"auto_{i}"
+        a.checkOnce = False
+        a.freq = 100
+        autos.append(a)
+    outbox = ActionOutbox()
+    runtime = AutomationRuntime(autos, share=False, outbox=outbox)
+    await runtime.start()
+    try:
+        await asyncio.sleep(0.1)
+    finally:
+        await runtime.stop()
+    assert entities["fan"].publisher.sent == [{"speed": 2}]
+    assert outbox.stats()["merged"] > 0
+    assert outbox.stats()["suppressed"] > 0
@@ -0,0 +1,59 @@
+import asyncio
+import time
+import pytest
+from smauto.lib.plan import build_execution_plan, DependencyCycleError
+from smauto.lib.automation import Automation
+from smauto.lib.runtime import AutomationRuntime
+
+
+class Recorded(Automation):
+    def _after_trigger(self):
+        self.fired_at = time.monotonic()
+        super()._after_trigger()
+
+
+class Node:
+    def __init__(self, name, after=()):
+        self.name = name
+        self.after = list(after)
+
+
+def test_plan_orders_by_after():
+    a = Node("a")
+    b = Node("b", [a])
+    c = Node("c", [a, b])
+    d = Node("d")
+    stages = build_execution_plan([c, b, a, d])
+    assert [[n.name for n in s] for s in stages] == [["a", "d"], ["b"], ["c"]]
+
+
+def test_plan_rejects_cycles():
+    a = Node("a")
+    b = Node("b", [a])
+    c = Node("c", [b])
+    a.after.append(c)
+    with pytest.raises(DependencyCycleError) as err:
+        build_execution_plan([a, b, c, Node("d", [c])])
+    assert {n.name for n in err.value.cycle} == {"a", "b", "c"}
+    assert "->" in str(err.value)
+
+
+@pytest.mark.asyncio
+async def test_after_chain_reacts_without_polling_delay(entities, model_builder, automation_builder):
+    model = model_builder(entities, rest_temp=30.0)
+    chain = []
+    for i in range(5):
+        a = automation_builder(model, cls=Recorded)
+        a.name = f"stage_{i}"
+        a.freq = 1
+        a.after = chain[-1:]
+        chain.append(a)
+    runtime = AutomationRuntime(list(reversed(chain)), share=False)
+    assert [s[0].name for s in runtime.plan] == [f"stage_{i}" for i in range(5)]
+    await runtime.start()
+    try:
+        await asyncio.sleep(0.2)
+    finally:
+        await runtime.stop()
+    assert all(hasattr(a, "fired_at") for a in chain)
+    assert chain[4].fired_at - chain[0].fired_at < 0.1
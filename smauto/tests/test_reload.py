@@ -0,0 +1,140 @@
+import asyncio
+from textx import metamodel_from_str
+import textx.scoping.providers as scoping_providers
+from smauto.lib.automation import Automation
+from smauto.lib.dependency import entity_dep, notify_entity_update
+from smauto.lib.reload import ModelReloader, ModelDiff
+from smauto.lib.runtime import AutomationRuntime
+
+GRAMMAR = r"""
+Model: entities*=Entity automations*=Rule;
+Entity: 'Entity' name=ID attributes*=Attr 'end';
+Attr: '-' name=ID;
+Rule:
+    'Automation' name=ID
+    'when' reads=[Attr:FQN] '>' limit=NUMBER
+    'set' target=[Attr:FQN] '=' value=NUMBER
+    ('after' after+=[Rule][','])?
+    'end'
+;
+FQN: ID ('.' ID)*;
+"""
+
+
+class Publisher:
+    def __init__(self):
+        self.sent = []
+
+    def publish(self, message):
+        self.sent.append(message)
+
+
+class ReadsCondition:
+    def __init__(self, automation):
+        self.parent = automation
+        self.cond_lambda = None
+        self.deps = frozenset()
+
+    def build(self):
+        a = self.parent
+        self.cond_lambda = f"{a.reads.parent.name}.{a.reads.name} > {a.limit}"
+        self.deps = frozenset([entity_dep(a.reads.parent.name, a.reads.name)])
+
+    def evaluate(self):
+        return (self.parent.reads.value or 0) > self.parent.limit, ""
+
+
+class Rule(Automation):
+    def __init__(self, parent, name, reads, limit, target, value, after):
+        super().__init__(
+            parent, name, ReadsCondition(self), [], 1, True, True, False, 0,
+            after, [], [], evaluation="events",
+        )
+        self.reads = reads
+        self.limit = limit
+        self.target = target
+        self.value = value
+
+    def trigger_actions(self):
+        self.publish(self.target.parent, {self.target.name: self.value})
+
+
+def load(src):
+    mm = metamodel_from_str(GRAMMAR, classes=[Rule], auto_init_attributes=False)
+    mm.register_scope_providers({"*.*": scoping_providers.FQN()})
+    model = mm.model_from_str(src)
+    for entity in model.entities:
+        entity.publisher = Publisher()
+        entity.attributes_dict = {a.name: a for a in entity.attributes}
+        for attr in entity.attributes:
+            attr.value = 0
+    model.entities_dict = {e.name: e for e in model.entities}
+    return model
+
+
+V1 = """
+Entity s - v end
+Entity out - level end
+Automation a when s.v > 1 set out.level = 1 end
+Automation b when s.v > 5 set out.level = 2 end
+"""
+
+V2 = """
+Entity s - v end
+Entity out - level end
+Automation a when s.v > 1 set out.level = 1 end
+Automation b when s.v > 7 set out.level = 2 end
+Automation c when s.v > 1 set out.level = 3 after a end
+"""
+
+V3 = """
+Entity s - v - w end
+Entity out - level end
+Automation a when s.v > 1 set out.level = 1 end
+Automation b when s.v > 7 set out.level = 2 end
+Automation c when s.v > 1 set out.level = 3 after a end
+"""
+
+
+def test_diff_compares_source_text():
+    diff = ModelDiff(load(V1), load(V2))
+    assert diff.automations.unchanged == ["a"]
+    assert diff.automations.changed == ["b"]
+    assert diff.automations.added == ["c"]
+    assert not diff.entities
+    assert not ModelDiff(load(V1), load(V1))
+
+
+def test_reload_restarts_only_changed_automations():
+    model = load(V1)
+
+    async def scenario():
+        runtime = AutomationRuntime(model.automations, model=model, rest=False, share=False)
+        await runtime.start()
+        a, s, out = model.automations[0], model.entities_dict["s"], model.entities_dict["out"]
+        a_task = runtime._automation_tasks[a]
+        reloader = ModelReloader(runtime, V2, loader=load)
+
+        diff = await reloader.reload()
+        assert diff.restarted == ["b", "c"]
+        assert model.automations[0] is a and runtime._automation_tasks[a] is a_task
+        b, c = model.automations[1], model.automations[2]
+        assert b.limit == 7 and c.reads is s.attributes_dict["v"] and c.after == [a]
+        assert a in runtime.automations and b in runtime.automations
+
+        await asyncio.sleep(0.05)
+        s.attributes_dict["v"].value = 8
+        notify_entity_update("s", {"v": 8})
+        await asyncio.sleep(0.05)
+        assert {m["level"] for m in out.publisher.sent} == {1, 2, 3}
+
+        diff = await reloader.reload(V3)
+        assert diff.entities.changed == ["s"] and not diff.automations
+        assert sorted(diff.restarted) == ["a", "b", "c"]
+        assert model.entities_dict["out"] is out
+        assert model.entities_dict["s"] is not s
+        assert model.automations[2].after == [model.automations[0]]
+        assert len(runtime.automations) == 3
+        await runtime.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,93 @@
+import asyncio
+import httpx
+from smauto.lib.clock import VirtualClock, set_clock
+from smauto.lib.rest_cache import ConditionalFetcher, freshness
+from smauto.lib.rest_pool import ClientPool
+
+
+class Src:
+    name = "Weather"
+    url = "https://api.example.com/forecast"
+    method = "GET"
+    headers = {}
+    params = {}
+    auth = None
+    body = None
+    timeout = None
+
+
+class Upstream:
+    def __init__(self):
+        self.version = 1
+        self.max_age = 0
+        self.seen = []
+
+    def __call__(self, request):
+        self.seen.append(dict(request.headers))
+        etag = f'"v{self.version}"'
+        headers = {"etag": etag, "cache-control": f"max-age={self.max_age}"}
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, json={"t": 20 + self.version}, headers=headers)
+
+
+def test_freshness_honours_max_age_age_and_no_cache():
+    assert freshness({"cache-control": "public, max-age=60", "age": "15"}) == 45
+    assert freshness({"cache-control": "no-cache, max-age=60"}) == 0
+    assert freshness({}) == 0
+
+
+def test_304_and_max_age_skip_mapping():
+    upstream = Upstream()
+    now = [0.0]
+    fetcher = ConditionalFetcher(
+        ClientPool(transport=httpx.MockTransport(upstream)), clock=lambda: now[0]
+    )
+    mapped = []
+
+    def mapper(source, data):
+        mapped.append(data)
+        return {"temp": data["t"]}
+
+    async def scenario():
+        results = [await fetcher.poll(Src, mapper)]
+        results.append(await fetcher.poll(Src, mapper))      # 304
+        upstream.version = 2
+        upstream.max_age = 60
+        results.append(await fetcher.poll(Src, mapper))      # new body
+        now[0] = 30.0
+        results.append(await fetcher.poll(Src, mapper))      # fresh: no request
+        return results
+
+    results = asyncio.run(scenario())
+    assert results == [{"temp": 21}, None, {"temp": 22}, None]
+    assert len(mapped) == 2
+    assert len(upstream.seen) == 3
+    assert "if-none-match" not in upstream.seen[0]
+    assert upstream.seen[1]["if-none-match"] == '"v1"'
+    stats = fetcher.stats("Weather")
+    assert stats["fetched"] == 2 and stats["not_modified"] == 1 and stats["hits"] == 1
+    assert stats["bytes_saved"] == 2 * len(b'{"t":21}')
+
+
+def test_freshness_follows_the_installed_clock():
+    upstream = Upstream()
+    upstream.max_age = 60
+    fetcher = ConditionalFetcher(ClientPool(transport=httpx.MockTransport(upstream)))
+    clock = VirtualClock()
+    previous = set_clock(clock)
+
+    async def scenario():
+        await fetcher.fetch(Src)
+        await asyncio.sleep(30)
+        await fetcher.fetch(Src)                             # still fresh
+        await asyncio.sleep(40)
+        await fetcher.fetch(Src)                             # expired
+
+    try:
+        clock.run(scenario())
+    finally:
+        set_clock(previous)
+        clock.close()
+    assert len(upstream.seen) == 2
+    assert fetcher.stats("Weather")["hits"] == 1
@@ -0,0 +1,151 @@
+import asyncio
+import httpx
+import pytest
+from smauto.lib.clock import VirtualClock, set_clock
+from smauto.lib.rest_coalesce import RequestCoalescer, request_key
+from smauto.lib.rest_pool import ClientPool
+
+
+class Mapping:
+    def __init__(self, name, jpath, type=None):
+        self.name = name
+        self.jpath = jpath
+        self.type = type
+
+
+def source(name, jpath, url="https://api.example.com/forecast", headers=None, poll=10):
+    attrs = {
+        "name": name,
+        "url": url,
+        "method": "GET",
+        "headers": headers or {"X-Key": "k"},
+        "params": {"lat": 35, "lon": 25},
+        "auth": None,
+        "body": None,
+        "timeout": None,
+        "poll": poll,
+        "mappings": [Mapping("value", jpath, "number")],
+    }
+    return type(name, (), attrs)
+
+
+class Upstream:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, request):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"t": 21.5, "w": 3.0})
+
+
+def test_request_key_ignores_header_case_and_order():
+    a = source("A", "$.t", headers={"X-Key": "k", "Accept": "json"})
+    b = source("B", "$.w", headers={"accept": "json", "x-key": "k"})
+    c = source("C", "$.t", url="https://api.example.com/other")
+    assert request_key(a) == request_key(b)
+    assert request_key(a) != request_key(c)
+
+
+def test_concurrent_identical_fetches_share_one_request():
+    upstream = Upstream()
+    now = [0.0]
+    coalescer = RequestCoalescer(
+        ClientPool(transport=httpx.MockTransport(upstream)), clock=lambda: now[0]
+    )
+    temp, wind = source("Temp", "$.t"), source("Wind", "$.w")
+    for s in (temp, wind):
+        coalescer.register(s)
+
+    async def scenario():
+        first = await asyncio.gather(coalescer.poll(temp), coalescer.poll(wind))
+        now[0] = 2.0                                   # same interval: reused
+        fanned = await coalescer.poll_group(wind)
+        now[0] = 10.0                                  # next interval: fetched again
+        await coalescer.poll(temp)
+        return first, fanned
+
+    first, fanned = asyncio.run(scenario())
+    assert first == [{"value": 21.5}, {"value": 3.0}]
+    assert fanned == {"Temp": {"value": 21.5}, "Wind": {"value": 3.0}}
+    assert upstream.calls == 2
+    stats = coalescer.stats()
+    assert stats["requests"] == 2 and stats["joined"] == 1 and stats["reused"] == 1
+    assert stats["unique_requests"] == 1 and len(coalescer.groups()) == 1
+
+
+def test_failed_fetch_reaches_every_waiter():
+    calls = []
+
+    async def fetch(source):
+        calls.append(source.name)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    coalescer = RequestCoalescer(fetch=fetch)
+    a, b = source("A", "$.t"), source("B", "$.w")
+
+    async def scenario():
+        return await asyncio.gather(coalescer.fetch(a), coalescer.fetch(b), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert calls == ["A"]
+    assert all(isinstance(r, RuntimeError) for r in results)
+    coalescer.unregister("A")
+    coalescer.unregister("B")
+    assert coalescer.stats()["unique_requests"] == 0
+    with pytest.raises(RuntimeError):
+        asyncio.run(coalescer.fetch(a))
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_fetch():
+    calls = []
+
+    async def fetch(source):
+        calls.append(source.name)
+        await asyncio.sleep(0.02)
+        return {"t": 21.5, "w": 3.0}
+
+    coalescer = RequestCoalescer(fetch=fetch)
+    a, b = source("A", "$.t"), source("B", "$.w")
+
+    async def scenario():
+        leader = asyncio.create_task(coalescer.poll(a))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(coalescer.poll(b))
+        await asyncio.sleep(0.005)
+        leader.cancel()
+        return await asyncio.gather(leader, joiner, return_exceptions=True)
+
+    leader, joiner = asyncio.run(scenario())
+    assert isinstance(leader, asyncio.CancelledError)
+    assert joiner == {"value": 3.0}
+    assert calls == ["A"]
+
+
+def test_reuse_window_follows_the_installed_clock():
+    calls = []
+
+    async def fetch(source):
+        calls.append(source.name)
+        return {"t": 21.5}
+
+    coalescer = RequestCoalescer(fetch=fetch)
+    a = source("A", "$.t", poll=10)
+    clock = VirtualClock()
+    previous = set_clock(clock)
+
+    async def scenario():
+        await coalescer.poll(a)
+        await asyncio.sleep(4)
+        await coalescer.poll(a)                        # within poll / 2: reused
+        await asyncio.sleep(2)
+        await coalescer.poll(a)
+
+    try:
+        clock.run(scenario())
+    finally:
+        set_clock(previous)
+        clock.close()
+    assert calls == ["A", "A"]
+    assert coalescer.stats()["reused"] == 1
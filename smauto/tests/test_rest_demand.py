@@ -0,0 +1,109 @@
+import asyncio
+from smauto.lib.clock import VirtualClock
+from smauto.lib.dependency import rest_dep
+from smauto.lib.rest_demand import DemandPoller
+
+
+class Source:
+    def __init__(self, name, poll=10):
+        self.name = name
+        self.poll = poll
+
+
+class Reader:
+    """Stand-in for an Automation whose condition reads a REST source."""
+
+    def __init__(self, source_name, enabled=True, in_steps=False):
+        deps = frozenset([rest_dep(source_name, "v")])
+        self.condition = type("Cond", (), {"deps": frozenset() if in_steps else deps})()
+        self._step_deps = deps if in_steps else frozenset()
+        self.enabled = enabled
+        self._waiting_for = None
+        self._activation_listeners = []
+
+    def step_deps(self):
+        return self._step_deps
+
+    @property
+    def active(self):
+        return self.enabled and not self._waiting_for
+
+    def enable(self):
+        self.enabled = True
+        for listener in list(self._activation_listeners):
+            listener(self)
+
+
+def run_poller(poller, until, events=()):
+    clock = VirtualClock()
+
+    async def scenario():
+        task = asyncio.create_task(poller.run())
+        now = 0
+        for at, action in events:
+            await asyncio.sleep(at - now)
+            now = at
+            action()
+        await asyncio.sleep(until - now)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    try:
+        clock.run(scenario())
+    finally:
+        clock.close()
+
+
+def test_polls_only_on_demand_and_catches_up_on_enable():
+    times = {"Steady": [], "Moving": []}
+
+    async def fetch(source):
+        now = asyncio.get_running_loop().time()
+        times[source.name].append(round(now, 3))
+        return {"v": 1} if source.name == "Steady" else {"v": len(times["Moving"])}
+
+    steady, moving = Reader("Steady"), Reader("Moving", enabled=False)
+    updates = []
+    poller = DemandPoller(
+        [Source("Steady"), Source("Moving")], [steady, moving], fetch,
+        on_update=lambda source, values: updates.append(source.name),
+        adaptive=True, rng=lambda: 0.5,
+    )
+    run_poller(poller, until=145, events=[(100, moving.enable)])
+    # Jittered start at 1s, then backing off 10 -> 20 -> 40 while unchanged.
+    assert times["Steady"] == [1.0, 11.0, 31.0, 71.0]
+    # Not polled while disabled; polled as soon as it is enabled, every 10s while it moves.
+    assert times["Moving"] == [100.0, 110.0, 120.0, 130.0, 140.0]
+    assert updates.count("Steady") == 1 and updates.count("Moving") == 5
+    stats = poller.stats()
+    assert stats["Steady"]["interval"] == 80 and stats["Moving"]["interval"] == 10
+    assert stats["Moving"]["catch_up"] == 1 and stats["Moving"]["idle"] > 0
+
+
+def test_waiting_on_after_suppresses_polling():
+    polled = []
+
+    async def fetch(source):
+        polled.append(source.name)
+        return {"v": 1}
+
+    reader = Reader("Weather")
+    reader._waiting_for = ["upstream"]
+    poller = DemandPoller([Source("Weather")], [reader], fetch, on_update=None, rng=lambda: 0.0)
+    run_poller(poller, until=35)
+    assert polled == []
+    assert poller.stats()["Weather"]["demanded"] is False
+
+
+def test_sources_read_only_by_steps_are_demanded():
+    polled = []
+
+    async def fetch(source):
+        polled.append(source.name)
+        return {"v": len(polled)}
+
+    reader = Reader("Tariff", in_steps=True)
+    poller = DemandPoller([Source("Tariff")], [reader], fetch, on_update=None, rng=lambda: 0.0)
+    run_poller(poller, until=25)
+    assert polled == ["Tariff"] * 3
+    assert poller.readers["Tariff"] == [reader]
@@ -0,0 +1,65 @@
+import pytest
+from smauto.lib.rest_jpath import (
+    JsonPathError,
+    compile_source,
+    json_path,
+    map_compiled,
+    parse_path,
+)
+
+
+class Mapping:
+    def __init__(self, name, jpath, type=None):
+        self.name = name
+        self.jpath = jpath
+        self.type = type
+
+
+OBJ = {
+    "a": {"b": [10, {"c": 42}]},
+    "hourly": {"time": ["00:00", "01:00", "02:00"], "temperature_2m": [18.5, 19.0, "19.5"]},
+    "devices": [{"id": "d1", "on": True}, {"id": "d2", "on": False}, {"name": "x"}],
+}
+
+
+def test_plain_paths_keep_json_path_semantics():
+    assert json_path("$.a.b[0]", OBJ) == 10
+    assert json_path("$.a.b[1].c", OBJ) == 42
+    assert json_path("$.a.b[-1]['c']", OBJ) == 42
+    assert json_path("$.x.y", OBJ) is None
+    assert json_path("$.a.b[5]", OBJ) is None
+    assert json_path("$.a.b.c", OBJ) is None
+    assert json_path("$", OBJ) is OBJ
+
+
+def test_wildcards_and_slices():
+    assert json_path("$.devices[*].id", OBJ) == ["d1", "d2"]
+    assert json_path("$.hourly.temperature_2m[0:2]", OBJ) == [18.5, 19.0]
+    assert json_path("$.hourly.time[::2]", OBJ) == ["00:00", "02:00"]
+    assert json_path("$.hourly.*[0]", OBJ) == ["00:00", 18.5]
+    assert json_path("$.devices[*].missing", OBJ) is None
+
+
+def test_invalid_path():
+    with pytest.raises(JsonPathError):
+        parse_path("$.a[b")
+
+
+def test_compiled_mappings_cast_values():
+    src = type("S", (), {"mappings": [
+        Mapping("temp", "$.hourly.temperature_2m[2]", "number"),
+        Mapping("temps", "$.hourly.temperature_2m[:]", "number"),
+        Mapping("on", "$.devices[0].on", "bool"),
+        Mapping("ids", "$.devices[*].id", "list"),
+        Mapping("missing", "$.current.missing", "string"),
+        Mapping("raw", "$.a.b[1]"),
+    ]})()
+    compile_source(src)
+    assert map_compiled(src, OBJ) == {
+        "temp": 19.5,
+        "temps": [18.5, 19.0, 19.5],
+        "on": True,
+        "ids": ["d1", "d2"],
+        "missing": None,
+        "raw": {"c": 42},
+    }
@@ -0,0 +1,69 @@
+import asyncio
+import httpx
+from smauto.lib.rest_pool import ClientPool, request_kwargs
+
+
+class RESTAuthBearer:
+    def __init__(self, token):
+        self.token = token
+
+
+class Src:
+    method = "GET"
+    headers = {"X-Test": "1"}
+    params = {"q": "crete"}
+    auth = None
+    body = None
+    timeout = None
+
+    def __init__(self, url):
+        self.url = url
+
+
+def handler(request):
+    if request.url.path == "/text":
+        return httpx.Response(200, text="hello", headers={"content-type": "text/plain"})
+    return httpx.Response(200, json={"path": request.url.path, "q": request.url.params.get("q")})
+
+
+def test_one_client_per_origin_reused_across_requests():
+    pool = ClientPool(transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        a = await pool.fetch(Src("https://api.example.com/a"))
+        b = await pool.fetch(Src("https://api.example.com/b"))
+        c = await pool.fetch(Src("http://other.example.com/text"))
+        assert pool.client_for("https://api.example.com/x") is pool.client_for(
+            "https://api.example.com:443/y"
+        )
+        stats = pool.stats()
+        await pool.aclose()
+        return a, b, c, stats
+
+    a, b, c, stats = asyncio.run(scenario())
+    assert a == {"path": "/a", "q": "crete"} and b["path"] == "/b"
+    assert c == {"_raw": "hello"}
+    assert stats["clients"] == 2
+    assert stats["requests"] == {
+        "https://api.example.com:443": 2, "http://other.example.com:80": 1,
+    }
+    assert pool.stats()["clients"] == 0
+
+
+def test_request_kwargs_translates_auth_and_body():
+    src = Src("https://api.example.com/a")
+    src.method = "post"
+    src.auth = RESTAuthBearer("tok")
+    src.body = {"x": 1}
+    src.timeout = 3
+    kwargs = request_kwargs(src)
+    assert kwargs["method"] == "POST"
+    assert kwargs["headers"] == {"X-Test": "1", "Authorization": "Bearer tok"}
+    assert kwargs["json"] == {"x": 1} and kwargs["timeout"] == 3
+    assert Src.headers == {"X-Test": "1"}
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    import importlib.util
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    assert ClientPool(http2=True).http2 is False
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import httpx
+import pytest
+from smauto.lib import rest_stream
+from smauto.lib.rest_jpath import map_compiled
+from smauto.lib.rest_pool import ClientPool
+from smauto.lib.rest_stream import StreamExtractor, capture_prefix, extract, stream_map
+
+
+class Mapping:
+    def __init__(self, name, jpath, type=None):
+        self.name = name
+        self.jpath = jpath
+        self.type = type
+
+
+class Src:
+    name = "Forecast"
+    url = "https://api.example.com/forecast"
+    method = "GET"
+    headers = {}
+    params = {}
+    auth = None
+    body = None
+    timeout = None
+    stream = True
+    mappings = [
+        Mapping("temp", "$.hourly.temperature_2m[1]", "number"),
+        Mapping("last", "$.hourly.time[-1]", "string"),
+        Mapping("ids", "$.devices[*].id", "list"),
+        Mapping("on", "$.devices[0].state.on", "bool"),
+        Mapping("missing", "$.nope.x", "number"),
+    ]
+
+
+DOC = {
+    "hourly": {
+        "time": [f"t{i}" for i in range(50)],
+        "temperature_2m": [20.5 + i for i in range(50)],
+    },
+    "devices": [{"id": f"d{i}", "state": {"on": i % 2 == 0}} for i in range(5)],
+    "tail": list(range(1000)),
+}
+BODY = json.dumps(DOC).encode()
+
+
+def chunks(body, size=37):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def test_capture_prefix_stops_at_multi_and_negative_steps():
+    assert capture_prefix("$.a.b[2].c") == ("a", "b", 2, "c")
+    assert capture_prefix("$.a[*].id") == ("a",)
+    assert capture_prefix("$.a[-1]") == ("a",)
+    assert capture_prefix("$") == ()
+
+
+def test_streamed_values_match_full_parse():
+    pytest.importorskip("ijson")
+    Src.compiled_mappings = None
+    assert extract(Src, chunks(BODY)) == map_compiled(Src, DOC)
+
+
+def test_stops_reading_once_every_mapping_is_read():
+    pytest.importorskip("ijson")
+
+    class Small(Src):
+        mappings = [Mapping("temp", "$.hourly.temperature_2m[0]", "number")]
+        compiled_mappings = None
+
+    extractor = StreamExtractor(Small)
+    for chunk in chunks(BODY):
+        if extractor.feed(chunk):
+            break
+    extractor.close()
+    assert extractor.complete
+    assert extractor.bytes_read < len(BODY) // 2
+    assert extractor.result() == {"hourly": {"temperature_2m": [20.5]}}
+    assert extractor.values() == {"temp": 20.5}
+
+
+def test_fallback_without_ijson(monkeypatch):
+    monkeypatch.setattr(rest_stream, "ijson", None)
+    Src.compiled_mappings = None
+    assert extract(Src, chunks(BODY)) == map_compiled(Src, DOC)
+
+
+def test_stream_map_over_http():
+    pytest.importorskip("ijson")
+    handler = lambda request: httpx.Response(
+        200, content=BODY, headers={"content-type": "application/json"}
+    )
+    pool = ClientPool(transport=httpx.MockTransport(handler))
+    Src.compiled_mappings = None
+    values = asyncio.run(stream_map(Src, pool, chunk_size=64))
+    assert values == map_compiled(Src, DOC)
+    assert values["temp"] == 21.5 and values["missing"] is None
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+
+
+def delayed(model, entities, automation_builder, steps_runtime, policy, delay=0.05):
+    a = automation_builder(model, steps=[
+        steps_runtime["Delay"](delay),
+        steps_runtime["Action"](entities["fan"].attributes_dict["speed"], 1),
+    ])
+    a.checkOnce = False
+    a.retrigger = policy
+    a.prepare()
+    return a
+
+
+@pytest.mark.asyncio
+async def test_many_delayed_pipelines_in_flight(entities, model_builder, automation_builder, steps_runtime):
+    model = model_builder(entities, rest_temp=30.0)
+    autos = [delayed(model, entities, automation_builder, steps_runtime, "ignore", 0.1) for _ in range(200)]
+    for a in autos:
+        a.poll()
+    assert all(a.pipeline_running for a in autos)
+    await asyncio.sleep(0.2)
+    assert len(entities["fan"].publisher.sent) == 200
+    assert not any(a.pipeline_running for a in autos)
+
+
+@pytest.mark.asyncio
+async def test_retrigger_ignore(entities, model_builder, automation_builder, steps_runtime):
+    a = delayed(model_builder(entities, 30.0), entities, automation_builder, steps_runtime, "ignore")
+    for _ in range(3):
+        a.poll()
+    await asyncio.sleep(0.1)
+    assert entities["fan"].publisher.sent == [{"speed": 1}]
+    assert a.pipeline_stats["started"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retrigger_queue(entities, model_builder, automation_builder, steps_runtime):
+    a = delayed(model_builder(entities, 30.0), entities, automation_builder, steps_runtime, "queue")
+    for _ in range(3):
+        a.poll()
+    assert a.pipeline_stats["queued"] == 2
+    await asyncio.sleep(0.07)
+    assert len(entities["fan"].publisher.sent) == 1
+    await asyncio.sleep(0.15)
+    assert len(entities["fan"].publisher.sent) == 3
+    assert not a.pipeline_running
+
+
+@pytest.mark.asyncio
+async def test_retrigger_queue_is_bounded(entities, model_builder, automation_builder, steps_runtime):
+    a = delayed(model_builder(entities, 30.0), entities, automation_builder, steps_runtime, "queue")
+    for _ in range(a.MAX_QUEUED + 5):
+        a.poll()
+    assert a.pipeline_stats["dropped"] == 4
+    a._queued = 0
+    a._pipeline_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_retrigger_restart(entities, model_builder, automation_builder, steps_runtime):
+    a = delayed(model_builder(entities, 30.0), entities, automation_builder, steps_runtime, "restart")
+    a.poll()
+    await asyncio.sleep(0.03)
+    a.poll()
+    await asyncio.sleep(0.03)
+    assert entities["fan"].publisher.sent == []
+    await asyncio.sleep(0.05)
+    assert entities["fan"].publisher.sent == [{"speed": 1}]
+    assert a.pipeline_stats["restarted"] == 1
@@ -0,0 +1,49 @@
+import random
+import statistics
+import pytest
+from smauto.lib.rolling import RollingWindow, window_mean, window_std, window_min
+
+
+def test_zero_until_full():
+    w = RollingWindow(3)
+    w.append(5.0)
+    w.append(7.0)
+    assert not w.full
+    assert w.mean() == 0 and w.stdev() == 0 and w.min() == 0 and w.max() == 0
+
+
+def test_matches_statistics_over_long_stream():
+    rnd = random.Random(42)
+    size = 50
+    w = RollingWindow(size)
+    samples = []
+    for i in range(5000):
+        v = rnd.gauss(20.0, 5.0) + (i % 97) * 0.01
+        w.append(v)
+        samples.append(v)
+        if w.full and i % 37 == 0:
+            window = samples[-size:]
+            assert w.mean() == pytest.approx(statistics.mean(window), rel=1e-9)
+            assert w.variance() == pytest.approx(statistics.variance(window), rel=1e-6)
+            assert w.stdev() == pytest.approx(statistics.stdev(window), rel=1e-6)
+            assert w.min() == min(window)
+            assert w.max() == max(window)
+
+
+def test_resync_keeps_precision():
+    w = RollingWindow(4)
+    w.RESYNC_PERIOD = 1
+    for v in [1e9, 1e9 + 1, 1e9 + 2, 1e9 + 3] * 10 + [1.0, 2.0, 3.0, 4.0]:
+        w.append(v)
+    assert w.mean() == pytest.approx(2.5)
+    assert w.variance() == pytest.approx(statistics.variance([1.0, 2.0, 3.0, 4.0]))
+
+
+def test_eval_functions_accept_plain_sequences():
+    w = RollingWindow(2)
+    w.extend([1, 3])
+    assert window_mean(w) == 2
+    assert window_mean([1, 2, 3]) == 2
+    assert window_std([1, 2, 3]) == statistics.stdev([1, 2, 3])
+    assert window_min(w) == 1
+    assert window_min(4, 2) == 2
@@ -0,0 +1,133 @@
+import asyncio
+import pytest
+from smauto.lib.clock import VirtualClock
+from smauto.lib.scheduler import TickScheduler
+from smauto.lib.runtime import AutomationRuntime
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Polled:
+    def __init__(self, name, freq, clock, cost=0.0):
+        self.name = name
+        self.freq = freq
+        self.clock = clock
+        self.cost = cost
+        self.polls = []
+
+    def poll(self):
+        self.polls.append(self.clock.now)
+        self.clock.now += self.cost
+
+
+def test_groups_by_freq_and_batches_due_automations():
+    clock = FakeClock()
+    sched = TickScheduler(clock=clock)
+    fast = [Polled(f"fast_{i}", 10, clock) for i in range(3)]
+    slow = Polled("slow", 2, clock)
+    for a in fast + [slow]:
+        sched.add(a)
+    assert set(sched.groups) == {10, 2}
+    batches = []
+    sched.after_batch.append(lambda: batches.append(clock.now))
+    while clock.now < 1.0:
+        sched.run_due()
+        clock.now = sched.next_deadline()
+    assert all(len(a.polls) == 10 for a in fast)
+    assert len(slow.polls) == 2
+    assert fast[0].polls == fast[2].polls
+    assert len(batches) == 10
+
+
+def test_deadlines_do_not_drift_with_evaluation_time():
+    clock = FakeClock()
+    sched = TickScheduler(clock=clock)
+    a = Polled("a", 10, clock, cost=0.03)
+    sched.add(a)
+    for _ in range(20):
+        clock.now = max(clock.now, sched.next_deadline())
+        sched.run_due()
+    assert a.polls[-1] == pytest.approx(1.9)
+    assert a.lateness.max == pytest.approx(0.0)
+
+
+def test_lateness_and_missed_ticks_are_recorded():
+    clock = FakeClock()
+    sched = TickScheduler(clock=clock)
+    a = Polled("a", 10, clock)
+    sched.add(a)
+    sched.run_due()
+    clock.now = 0.35
+    sched.run_due()
+    assert a.lateness.last == pytest.approx(0.25)
+    assert sched.next_deadline() == pytest.approx(0.4)
+    assert sched.stats()["groups"][10]["missed"] == 2
+    assert sched.stats()["lateness"]["a"]["ticks"] == 2
+
+
+def test_remove_drops_empty_group():
+    clock = FakeClock()
+    sched = TickScheduler(clock=clock)
+    a = Polled("a", 5, clock)
+    sched.add(a)
+    sched.remove(a)
+    assert sched.next_deadline() is None
+    assert sched.run_due() == 0
+
+
+def test_group_added_while_sleeping_is_polled_on_time():
+    clock = VirtualClock()
+    sched = TickScheduler(clock=clock.time)
+
+    class Ticked(Polled):
+        def poll(self):
+            self.polls.append(round(clock.time(), 6))
+
+    slow, fast = Ticked("slow", 0.01, None), Ticked("fast", 10, None)
+
+    async def scenario():
+        task = asyncio.create_task(sched.run())
+        sched.add(slow)
+        await asyncio.sleep(1)
+        sched.add(fast)
+        await asyncio.sleep(5.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    try:
+        clock.run(scenario())
+    finally:
+        clock.close()
+    # The slow group sleeps until t=100; the fast one must not wait for it.
+    assert slow.polls == [0.0]
+    assert len(fast.polls) == 51
+    assert fast.polls[0] == 1.0 and fast.polls[-1] == 6.0
+
+
+@pytest.mark.asyncio
+async def test_runtime_ticks_polling_automations(entities, model_builder, automation_builder):
+    model = model_builder(entities, rest_temp=30.0)
+    autos = []
+    for i in range(5):
+        a = automation_builder(model)
+        a.name = f"auto_{i}"
+        a.freq = 50
+        a.checkOnce = False
+        autos.append(a)
+    runtime = AutomationRuntime(autos, share=False)
+    await runtime.start()
+    try:
+        await asyncio.sleep(0.2)
+    finally:
+        await runtime.stop()
+    stats = runtime.scheduler.stats()
+    assert stats["groups"][50]["automations"] == 5
+    for a in autos:
+        assert a.lateness.count >= 5
+        assert a.lateness.mean < 0.05
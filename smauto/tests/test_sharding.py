@@ -0,0 +1,123 @@
+import time
+from smauto.lib.automation import Automation
+from smauto.lib.condition import Condition
+from smauto.lib.rolling import RollingWindow
+from smauto.lib.sharding import ShardedRuntime, _apply_entity_state, automation_inputs, partition
+
+
+class Attr:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+
+class Entity:
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attributes_dict = {k: Attr(k, v) for k, v in attrs.items()}
+
+
+class Model:
+    def __init__(self, entities, automations=()):
+        self.entities_dict = {e.name: e for e in entities}
+        self.restSources = []
+        self.automations = list(automations)
+
+
+class PrebuiltCondition(Condition):
+    def __init__(self, entity, attr, src):
+        super().__init__(None)
+        self.cond_lambda = f"(entities['{entity}'].attributes_dict['{attr}'].value {src})"
+        self.deps = frozenset({("entity", entity, attr)})
+
+    def build(self):
+        return self.compile()
+
+
+def make_automation(model, name, entity, src, enabled=True, after=()):
+    cond = PrebuiltCondition(entity, "value", src)
+    a = Automation(
+        parent=model, name=name, condition=cond, actions=[], freq=10,
+        enabled=enabled, continuous=False, checkOnce=False, delay=0,
+        after=list(after), starts=[], stops=[],
+    )
+    cond.parent = a
+    return a
+
+
+def two_room_model():
+    model = Model([Entity("sensor", value=0), Entity("door", value=0)])
+    a = make_automation(model, "hot", "sensor", "> 30")
+    b = make_automation(model, "door_open", "door", "== 1", enabled=False)
+    a.starts = [b]
+    model.automations = [a, b]
+    return model
+
+
+def test_partition_groups_by_entity_and_after():
+    model = Model([Entity(f"e{i}", value=0) for i in range(4)])
+    autos = [make_automation(model, f"a{i}", f"e{i % 4}", "> 1") for i in range(8)]
+    autos.append(make_automation(model, "chained", "e1", "> 2", after=[autos[1]]))
+    for a in autos:
+        a.build_condition()
+    plan = partition(autos, 4)
+    assert len(plan.shards) == 4
+    for e in range(4):
+        assert len(plan.entity_shards[f"e{e}"]) == 1
+    assert plan.owner["chained"] == plan.owner["a1"]
+
+
+def test_partition_splits_oversized_components():
+    model = Model([Entity("shared", value=0)])
+    autos = [make_automation(model, f"a{i}", "shared", "> 1") for i in range(10)]
+    plan = partition(autos, 2)
+    assert sorted(len(s) for s in plan.shards) == [5, 5]
+
+
+def test_step_inputs_are_forwarded_to_the_owning_shard():
+    model = Model([Entity(f"e{i}", value=0) for i in range(3)])
+    reader = make_automation(model, "reader", "e0", "> 1")
+    power = Attr("value", 0)
+    power.parent = model.entities_dict["e2"]
+    reader.steps = [
+        Automation.ComputeStepRt("p", power),
+        Automation.SwitchStepRt(
+            [("(rests['Weather']['wind'] > 50)", [])], [], deps=[("rest", "Weather", "wind")]
+        ),
+    ]
+    other = make_automation(model, "other", "e2", "> 1")
+    autos = [reader, other, make_automation(model, "third", "e1", "> 1")]
+    assert automation_inputs(reader) == ({"e0", "e2"}, {"Weather"})
+    plan = partition(autos, 3)
+    assert plan.owner["reader"] in plan.entity_shards["e2"]
+    assert plan.rest_shards["Weather"] == {plan.owner["reader"]}
+
+
+def test_forwarded_states_fill_condition_windows():
+    model = Model([Entity("sensor", value=0)])
+    sensor = model.entities_dict["sensor"]
+    sensor.attributes_buff = {"value": RollingWindow(3)}
+    for v in (1, 2, 3, 4):
+        _apply_entity_state(model, "sensor", {"value": v})
+    assert sensor.attributes_dict["value"].value == 4
+    assert list(sensor.attributes_buff["value"]) == [2, 3, 4]
+
+
+def test_sharded_runtime_routes_updates_and_starts():
+    runtime = ShardedRuntime(two_room_model, shards=2)
+    assert runtime.plan.owner["hot"] != runtime.plan.owner["door_open"]
+    assert runtime.plan.cross_shard_links(two_room_model().automations) == 1
+    runtime.start()
+    try:
+        runtime.update_entity("sensor", {"value": 35})
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            enabled = {}
+            for shard in runtime.stats():
+                enabled.update(shard["enabled"])
+            if enabled["door_open"] and not enabled["hot"]:
+                break
+            time.sleep(0.05)
+        assert enabled == {"hot": False, "door_open": True}
+    finally:
+        runtime.stop()
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from smauto.lib.automation import Automation
+from smauto.lib.clock import VirtualClock, get_clock
+from smauto.lib.condition import Condition
+from smauto.lib.rolling import RollingWindow
+from smauto.lib.scheduler import TickScheduler
+from smauto.lib.simulation import Simulation, value_generator
+
+
+def gen(cname, **fields):
+    return type(cname, (), fields)()
+
+
+class Attr:
+    def __init__(self, name, value=0.0, generator=None, noise=None):
+        self.name = name
+        self.value = value
+        self.generator = generator
+        self.noise = noise
+
+
+class Entity:
+    def __init__(self, name, freq=1, *attrs):
+        self.name = name
+        self.freq = freq
+        self.attributes = list(attrs)
+        self.attributes_dict = {a.name: a for a in attrs}
+        self.publisher = None
+        for a in attrs:
+            a.parent = self
+
+
+class Model:
+    def __init__(self, entities, rest_sources=()):
+        self.entities_dict = {e.name: e for e in entities}
+        self.restSources = list(rest_sources)
+        self.automations = []
+
+
+class PrebuiltCondition(Condition):
+    def __init__(self, src, deps):
+        super().__init__(None)
+        self.cond_lambda = src
+        self.deps = frozenset(deps)
+
+    def build(self):
+        return self.compile()
+
+
+def add_automation(model, name, src, deps, steps, **kwargs):
+    cond = PrebuiltCondition(src, deps)
+    a = Automation(
+        parent=model, name=name, condition=cond, actions=[], freq=1,
+        enabled=True, continuous=True, checkOnce=False, delay=0,
+        after=[], starts=[], stops=[], steps=steps, **kwargs,
+    )
+    cond.parent = a
+    model.automations.append(a)
+    return a
+
+
+def test_virtual_clock_skips_waiting():
+    clock = VirtualClock(start=100.0)
+    ticks = []
+
+    async def main():
+        sched = TickScheduler(clock=clock.time)
+        sched.add(type("A", (), {"name": "a", "freq": 2, "poll": lambda self: ticks.append(clock.time())})())
+        task = asyncio.create_task(sched.run())
+        await asyncio.sleep(24 * 3600)
+        task.cancel()
+
+    t0 = time.monotonic()
+    clock.run(main())
+    assert time.monotonic() - t0 < 5
+    assert clock.time() == 100.0 + 24 * 3600
+    assert len(ticks) == 2 * 24 * 3600
+    assert ticks[:3] == [100.0, 100.5, 101.0]
+
+
+def test_value_generators():
+    assert [value_generator(gen("LinearFun", start=1, step=2))(k) for k in range(3)] == [1, 3, 5]
+    assert [value_generator(gen("SawFun", min=0, max=3, step=1))(k) for k in range(5)] == [0, 1, 2, 0, 1]
+    replay = value_generator(gen("ReplayFun", values=[1, 2], times=2))
+    assert [replay(k) for k in range(6)] == [1, 2, 1, 2, 2, 2]
+    bell = value_generator(gen("GaussianFun", value=10, maxValue=5, sigma=2))
+    assert bell(10) == 5 and bell(4) < 0.1
+
+
+def day_model():
+    temp = Attr("temp", generator=gen("SinusFun", dc=20, amplitude=10, step=2 * 3.141592653589793 / 60),
+                noise=gen("GaussianNoise", mu=0, sigma=0.5))
+    sensor = Entity("sensor", 1 / 60, temp)
+    fan = Entity("fan", 1, Attr("on", False))
+    rs = type("RS", (), {"name": "Weather", "data": {}})()
+    model = Model([sensor, fan], [rs])
+    on = Automation.StepActionRt(fan.attributes_dict["on"], True)
+    off = Automation.StepActionRt(fan.attributes_dict["on"], False)
+    add_automation(
+        model, "cool", "(entities['sensor'].attributes_dict['temp'].value > 28)",
+        [("entity", "sensor", "temp")], [on, Automation.DelayStepRt(600), off],
+        fire="edge", hysteresis=1,
+    )
+    add_automation(
+        model, "storm", "(rests['Weather'].get('wind', 0) > 50)",
+        [("rest", "Weather", "wind")], [off], polling=True,
+    )
+    return model
+
+
+def run_day(seed):
+    sim = Simulation(day_model(), seed=seed)
+    sim.add_rest_mock("Weather", [(3 * 3600, {"wind": 80}), (4 * 3600, {"wind": 10})])
+    return sim.run(24 * 3600)
+
+
+def test_day_scenario_is_fast_and_deterministic():
+    t0 = time.monotonic()
+    log = run_day(seed=7)
+    assert time.monotonic() - t0 < 30
+    assert log == run_day(seed=7)
+    assert log != run_day(seed=8)
+    assert get_clock().__class__.__name__ == "RealClock"
+    actions = [(t, p) for t, kind, name, p in log if kind == "action"]
+    turned_on = [t for t, p in actions if p == {"on": True}]
+    assert 20 <= len(turned_on) <= 30
+    # Each Delay parks the pipeline for exactly 10 virtual minutes.
+    offs = {t for t, p in actions if p == {"on": False}}
+    assert all(t + 600 in offs for t in turned_on)
+    assert any(kind == "rest" for _, kind, _, _ in log)
+
+
+def test_simulated_states_fill_condition_windows():
+    sensor = Entity("sensor", 1, Attr("temp", generator=gen("LinearFun", start=0, step=1)))
+    sensor.attributes_buff = {"temp": RollingWindow(5)}
+    fan = Entity("fan", 1, Attr("on", False))
+    model = Model([sensor, fan])
+    add_automation(
+        model, "hot_average", "(mean(entities['sensor'].attributes_buff['temp']) > 10)",
+        [("entity", "sensor", "temp")], [Automation.StepActionRt(fan.attributes_dict["on"], True)],
+        fire="edge", polling=False,
+    )
+    log = Simulation(model).run(20)
+    # Mean of the last five samples k-4..k exceeds 10 from k = 13 on.
+    assert [(t, p) for t, kind, _, p in log if kind == "action"] == [(13.0, {"on": True})]
+    assert list(sensor.attributes_buff["temp"]) == [15, 16, 17, 18, 19]
@@ -0,0 +1,62 @@
+import math
+import random
+from smauto.lib.dispatch import build_interval_table, case_interval
+
+
+def first_match(cases, t):
+    for idx, src in enumerate(cases):
+        try:
+            if eval(src, {}, {"t": t}):
+                return idx
+        except TypeError:
+            pass
+    return None
+
+
+def select(switch, aut, t):
+    steps = switch.select({"t": t}, aut)
+    return steps[0].value if steps else None
+
+
+def make_switch(steps_runtime, entities, cases):
+    attr = entities["fan"].attributes_dict["speed"]
+    return steps_runtime["Switch"](
+        cases=[(src, [steps_runtime["Action"](attr, idx)]) for idx, src in enumerate(cases)],
+        default_steps=[],
+    )
+
+
+def test_case_interval_recognises_range_tests():
+    assert case_interval("((t >= 10) and (t < 20))") is not None
+    assert case_interval("(30 <= ctx['avg'])") is not None
+    assert case_interval("((t >= 10) and (u < 20))") is None
+    assert case_interval("((t >= 10) or (t < 2))") is None
+    assert case_interval("(t != 3)") is None
+
+
+def test_bands_match_sequential_first_match(entities, model_builder, automation_builder, steps_runtime):
+    cases = [f"((t >= {i}) and (t < {i + 1}))" for i in range(0, 50, 2)]
+    cases += ["(t > 20)", "(t == 7)", "(t <= -5)", "((t > 3.5) and (t <= 40))", "(t < 0)"]
+    switch = make_switch(steps_runtime, entities, cases)
+    assert switch._table is not None and switch._table.size == len(cases)
+    aut = automation_builder(model_builder(entities, 30.0))
+    rng = random.Random(4)
+    values = [b + d for b in switch._table.breakpoints for d in (-0.5, -1e-9, 0, 1e-9, 0.5)]
+    values += [rng.uniform(-60, 60) for _ in range(500)] + [math.inf, -math.inf, 7, True]
+    for t in values:
+        assert select(switch, aut, t) == first_match(cases, t), t
+
+
+def test_nan_and_non_numeric_fall_through(entities, model_builder, automation_builder, steps_runtime):
+    cases = ["(t < 1)", "(t < 2)", "(t < 3)", "(t >= 3)", "(t == 'hot')"]
+    switch = make_switch(steps_runtime, entities, cases)
+    assert switch._table.size == 4
+    aut = automation_builder(model_builder(entities, 30.0))
+    assert select(switch, aut, math.nan) is None
+    assert select(switch, aut, "hot") == 4
+    assert select(switch, aut, 2.5) == 2
+
+
+def test_short_or_general_switches_are_not_indexed():
+    assert build_interval_table(["(t < 1)", "(t < 2)"]) is None
+    assert build_interval_table(["(t in [1, 2])", "(t < 1)", "(t < 2)", "(t < 3)", "(t < 4)"]) is None